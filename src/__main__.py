@@ -3,55 +3,41 @@
 
 """This module is the starting point of the application."""
 
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
-from aiogram.fsm.strategy import FSMStrategy
+# Imported before everything else to time the other imports
+from src.startup import startup_profile
+
+# isort: split
+
 from loguru import logger
 
-from src.db.engine import database_close, database_init
-from src.handlers import register_handlers
+from src.app import (  # pylint: disable=ungrouped-imports
+    create_bot,
+    create_dispatcher,
+)
 from src.logs import setup_logging
-from src.middlewares import setup_middlewares
+from src.runners.polling import run_polling
+from src.runners.webhook import run_webhook
+from src.runners.workers import run_workers
 from src.settings import settings
 
-
-def create_bot(token: str) -> Bot:
-    """Create bot instance."""
-    logger.debug("Creating bot")
-    return Bot(
-        token=token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-    )
-
-
-def run_polling(dp: Dispatcher, bot: Bot) -> None:
-    """Start polling."""
-    try:
-        dp.run_polling(bot)
-    finally:
-        logger.info("Stopped")
+startup_profile.mark("imports")
 
 
 def main() -> None:
     """Start application."""
     setup_logging()
+    startup_profile.mark("logging")
 
-    dp = Dispatcher(
-        storage=MemoryStorage(),
-        fsm_strategy=FSMStrategy.CHAT,
-        events_isolation=SimpleEventIsolation(),
-    )
-
-    dp.startup.register(database_init)
-    dp.shutdown.register(database_close)
-
-    setup_middlewares(dp)
-    register_handlers(dp)
-
+    dp = create_dispatcher()
+    startup_profile.mark("dispatcher")
     bot = create_bot(settings.token)
-    run_polling(dp, bot)
+    startup_profile.mark("bot")
+    if settings.worker_processes > 1:
+        run_workers(dp, bot)
+    elif settings.webhook_url:
+        run_webhook(dp, bot)
+    else:
+        run_polling(dp, bot)
 
 
 if __name__ == "__main__":
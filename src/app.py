@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""This module builds the bot and the dispatcher."""
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.strategy import FSMStrategy
+from loguru import logger
+
+from src.client.rate_limit import RateLimiter
+from src.client.session import create_session
+from src.db.engine import database_close, database_init
+from src.handlers import register_handlers
+from src.metrics import start_metrics_server, stop_metrics_server
+from src.middlewares import setup_middlewares
+from src.services.ban_list import start_ban_list, stop_ban_list
+from src.services.broadcast import resume_broadcasts, stop_broadcasts
+from src.services.update_dedup import start_update_dedup, stop_update_dedup
+from src.services.user_service import UserService
+from src.settings import FSMStorageType, settings
+from src.storages.tortoise_storage import TortoiseStorage
+
+
+def create_bot(token: str) -> Bot:
+    """Create bot instance, sending messages within the Telegram rate limits."""
+    logger.debug("Creating bot")
+    bot = Bot(
+        token=token,
+        session=create_session(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    if settings.api_rate_limit > 0:
+        bot.session.middleware(
+            RateLimiter(
+                rate=settings.api_rate_limit,
+                chat_rate=settings.api_chat_rate_limit,
+                group_rate=settings.api_group_rate_limit,
+                burst=settings.api_chat_burst,
+                max_retries=settings.api_max_retries,
+            ),
+        )
+    return bot
+
+
+def create_storage() -> BaseStorage:
+    """Create FSM storage selected in settings."""
+    if settings.fsm_storage == FSMStorageType.DATABASE:
+        logger.debug("Using database FSM storage")
+        return TortoiseStorage(
+            flush_interval=settings.fsm_flush_interval,
+            cache_size=settings.fsm_cache_size,
+        )
+    return MemoryStorage()
+
+
+def create_dispatcher() -> Dispatcher:
+    """Create dispatcher with lifecycle hooks, middlewares and handlers."""
+    dp = Dispatcher(
+        storage=create_storage(),
+        fsm_strategy=FSMStrategy.CHAT,
+        events_isolation=SimpleEventIsolation(),
+    )
+
+    dp.startup.register(database_init)
+    dp.startup.register(UserService.start_writer)
+    dp.startup.register(start_ban_list)
+    dp.startup.register(start_metrics_server)
+    dp.startup.register(resume_broadcasts)
+    dp.startup.register(start_update_dedup)
+    dp.shutdown.register(stop_broadcasts)
+    dp.shutdown.register(stop_update_dedup)
+    dp.shutdown.register(stop_ban_list)
+    dp.shutdown.register(stop_metrics_server)
+    dp.shutdown.register(database_close)
+
+    setup_middlewares(dp)
+    register_handlers(dp)
+
+    return dp
@@ -0,0 +1 @@
+"""Telegram API client module."""
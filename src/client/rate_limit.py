@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+"""This module limits the rate of the messages sent to Telegram."""
+
+import asyncio
+import enum
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Hashable, Iterator, Optional
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from src.logs import hot_log
+from src.metrics import registry
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+# API methods counted by the Telegram flood limits
+RATE_LIMITED_PREFIXES = ("send", "copy", "forward")
+
+send_queue_depth = registry.gauge(
+    "bot_api_send_queue_depth",
+    "Number of sends waiting for the rate limit.",
+    labels=("priority",),
+)
+send_wait_latency = registry.histogram(
+    "bot_api_send_wait_seconds",
+    "Time sends waited for the rate limit.",
+    labels=("priority",),
+)
+retry_after_errors = registry.counter(
+    "bot_api_retry_after_total",
+    "Number of flood control errors returned by Telegram.",
+    labels=("method",),
+)
+
+
+class SendPriority(enum.IntEnum):
+    """Priority of the queued sends, lower values are sent first."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+_priority: ContextVar[SendPriority] = ContextVar(
+    "send_priority",
+    default=SendPriority.NORMAL,
+)
+
+
+@contextmanager
+def send_priority(priority: SendPriority) -> Iterator[None]:
+    """Send the messages of the block with a priority, e.g. LOW for broadcasts.
+
+    Args:
+        priority (SendPriority): Priority of the sends.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` operations per second in bursts of `capacity`.
+
+    Tokens can be reserved ahead of time, the bucket then goes below zero
+    and later reservations wait longer.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of tokens.
+        tokens (float): Tokens currently available.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "_updated_at")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self._updated_at) * self.rate,
+        )
+        self._updated_at = now
+
+    @property
+    def full(self) -> bool:
+        """Whether the bucket is full, so dropping it loses nothing."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+    def delay(self) -> float:
+        """Return the time in seconds until a token is available."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self) -> float:
+        """Take a token and return the time in seconds to wait for it."""
+        delay = self.delay()
+        self.tokens -= 1
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no token for at least `seconds`."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter(BaseRequestMiddleware):  # pylint: disable=too-many-instance-attributes
+    """Bot session middleware sending messages at the rate Telegram allows.
+
+    Sends, the methods starting with send, copy or forward, first wait
+    for the bucket of their chat in arrival order. Then they queue for
+    the global bucket, which serves them by priority and then in arrival
+    order. Other methods are not limited. On a flood control error the
+    chat gets no token for `retry_after` seconds and the send is retried,
+    so the bot keeps sending at the allowed rate without retry storms.
+
+    Attributes:
+        global_bucket (TokenBucket): Bucket shared by all sends.
+        chat_rate (float): Sends per second to a private chat.
+        group_rate (float): Sends per second to a group or channel.
+        burst (int): Sends allowed at once in a chat.
+        max_retries (int): Retries of a send after flood control errors.
+        max_chats (int): Number of chat buckets that triggers dropping
+            the idle ones.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        rate: float,
+        *,
+        chat_rate: float,
+        group_rate: float,
+        burst: int,
+        max_retries: int,
+        max_chats: int = 10_000,
+    ) -> None:
+        self.global_bucket = TokenBucket(rate, max(1.0, rate))
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._chats: dict[Hashable, TokenBucket] = {}
+        self._queue: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._pump: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_chats:
+                self._chats = {
+                    key: bucket
+                    for key, bucket in self._chats.items()
+                    if not bucket.full
+                }
+            # Usernames like "@channel" and negative ids are groups and channels
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            bucket = self._chats[chat_id] = TokenBucket(
+                self.chat_rate if is_private else self.group_rate,
+                self.burst,
+            )
+        return bucket
+
+    async def acquire(
+        self,
+        chat_id: Optional[Hashable],
+        priority: SendPriority = SendPriority.NORMAL,
+    ) -> None:
+        """Wait until a message may be sent.
+
+        Args:
+            chat_id (Optional[Hashable]): Target chat, None for the global
+                limit only.
+            priority (SendPriority): Priority in the global queue.
+        """
+        label = priority.name.lower()
+        started_at = time.monotonic()
+        send_queue_depth.inc(label)
+        try:
+            if chat_id is not None and (delay := self._chat_bucket(chat_id).reserve()):
+                await asyncio.sleep(delay)
+            if not self._queue and not self.global_bucket.delay():
+                self.global_bucket.reserve()
+            else:
+                future = asyncio.get_running_loop().create_future()
+                heapq.heappush(self._queue, (priority, next(self._sequence), future))
+                if self._pump is None or self._pump.done():
+                    self._pump = asyncio.create_task(self._run())
+                await future
+        finally:
+            send_queue_depth.dec(label)
+        send_wait_latency.observe(time.monotonic() - started_at, label)
+
+    async def _run(self) -> None:
+        while self._queue:
+            if delay := self.global_bucket.delay():
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._queue)
+            # Cancelled waiters do not take a token
+            if not future.done():
+                self.global_bucket.reserve()
+                future.set_result(None)
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """Make the request once the rate limits allow it."""
+        api_method = method.__api_method__
+        if not api_method.startswith(RATE_LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        priority = _priority.get()
+        attempt = 0
+        while True:
+            await self.acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as error:
+                retry_after_errors.inc(api_method)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                hot_log.log(
+                    logging.WARNING,
+                    "Flood control on {} in chat {}, retrying in {} seconds",
+                    api_method,
+                    chat_id,
+                    error.retry_after,
+                )
+                bucket = (
+                    self._chat_bucket(chat_id)
+                    if chat_id is not None
+                    else self.global_bucket
+                )
+                bucket.pause(error.retry_after)
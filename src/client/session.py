@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""This module provides the tuned and monitored Bot API HTTP session."""
+
+import time
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import ClientSession, TCPConnector
+
+from src.metrics import Number, registry
+from src.settings import settings
+
+api_latency = registry.histogram(
+    "bot_api_request_duration_seconds",
+    "Time spent in Bot API requests, failed ones included.",
+    labels=("method",),
+)
+api_errors = registry.counter(
+    "bot_api_request_errors_total",
+    "Number of failed Bot API requests by error.",
+    labels=("method", "error"),
+)
+
+
+class InstrumentedSession(AiohttpSession):
+    """Aiohttp session with a tuned connection pool and request metrics.
+
+    The duration of every request is observed per API method and failed
+    requests are counted per method and error class, so the error rate
+    of a method is its error count over its request count. Long polling
+    passes its own timeout, other methods use their timeout from
+    `method_timeouts` or the session timeout.
+
+    Attributes:
+        method_timeouts (dict[str, float]): Timeouts in seconds by API
+            method name, like "sendDocument".
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15.0,
+        dns_cache_ttl: Optional[int] = 300,
+        method_timeouts: Optional[dict[str, float]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the session.
+
+        Args:
+            limit (int): Maximum number of open connections, 0 for no limit.
+            limit_per_host (int): Maximum number of open connections to
+                one host, 0 for no limit.
+            keepalive_timeout (float): Seconds an idle connection is kept.
+            dns_cache_ttl (Optional[int]): Seconds resolved addresses are
+                cached, None to cache them forever.
+            method_timeouts (Optional[dict[str, float]]): Timeouts in
+                seconds by API method name.
+            **kwargs (Any): AiohttpSession arguments, like api or timeout.
+        """
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+        self.method_timeouts = method_timeouts or {}
+
+    @property
+    def connector_settings(self) -> dict[str, Any]:
+        """Arguments the TCP connector of the session is created with."""
+        return dict(self._connector_init)
+
+    async def create_session(self) -> ClientSession:
+        """Create the HTTP session and expose the state of its connections."""
+        session = await super().create_session()
+        registry.register_collector("api_connections", self.stats)
+        return session
+
+    async def close(self) -> None:
+        """Close the HTTP session."""
+        await super().close()
+        registry.unregister_collector("api_connections")
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None,
+    ) -> TelegramType:
+        """Send a request, observing its duration and counting errors."""
+        name = method.__api_method__
+        if timeout is None and name in self.method_timeouts:
+            timeout = self.method_timeouts[name]  # type: ignore[assignment]
+        started_at = time.perf_counter()
+        try:
+            return await super().make_request(bot, method, timeout)
+        except Exception as error:
+            api_errors.inc(name, type(error).__name__)
+            raise
+        finally:
+            api_latency.observe(time.perf_counter() - started_at, name)
+
+    def stats(self) -> dict[str, Number]:
+        """Return connection pool statistics.
+
+        Returns:
+            dict[str, Number]: Connection limit, connections in use and
+                idle kept-alive connections.
+        """
+        # pylint: disable=protected-access
+        connector = self._session.connector if self._session else None
+        if not isinstance(connector, TCPConnector):
+            return {}
+        return {
+            "limit": connector.limit,
+            "in_use": len(connector._acquired),
+            "idle": sum(len(conns) for conns in connector._conns.values()),
+        }
+
+
+def create_session() -> InstrumentedSession:
+    """Create the Bot API session configured in settings."""
+    api = (
+        TelegramAPIServer.from_base(settings.api_server_url)
+        if settings.api_server_url
+        else PRODUCTION
+    )
+    return InstrumentedSession(
+        limit=settings.api_connection_limit,
+        limit_per_host=settings.api_connection_limit_per_host,
+        keepalive_timeout=settings.api_keepalive_timeout,
+        dns_cache_ttl=settings.api_dns_cache_ttl,
+        method_timeouts=settings.api_method_timeouts,
+        api=api,
+        timeout=settings.api_timeout,
+    )
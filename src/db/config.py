@@ -5,6 +5,7 @@ import os
 from typing import Any, List
 
 from loguru import logger
+from tortoise.backends.base.config_generator import expand_db_url
 
 from src.settings import settings
 
@@ -49,15 +50,53 @@ def get_models_modules(
         return []
 
 
-# or use for manual providing models (example: ['src.db.models.user_model'])
-# MODELS_MODULES: List[str] = ["src.<path>.<to>.<model_module_name>"]
+# Resolved once per process, set BOT_DB_MODELS to skip the discovery
+MODELS_MODULES: List[str] = settings.db_models or get_models_modules()
+
+POOL_CREDENTIALS: dict[str, Any] = {
+    "minsize": settings.db_pool_min_size,
+    "maxsize": settings.db_pool_max_size,
+    "max_inactive_connection_lifetime": settings.db_pool_max_inactive_lifetime,
+    "statement_cache_size": settings.db_statement_cache_size,
+    "timeout": settings.db_connect_timeout,
+    "command_timeout": settings.db_command_timeout,
+}
+
+REPLICA_CONNECTION = "replica"
+
+
+def get_replica_connection(db_url: str) -> dict[str, Any]:
+    """Build the config of the read replica connection from its URL.
+
+    PostgreSQL replicas use the monitored client and the pool settings
+    of the primary, other databases are used as configured in the URL.
+
+    Args:
+        db_url (str): Database URL of the replica.
+
+    Returns:
+        dict[str, Any]: Connection config in the credentials form.
+    """
+    connection = expand_db_url(db_url)
+    if connection["engine"] == "tortoise.backends.asyncpg":
+        connection["engine"] = "src.db.pool"
+        connection["credentials"].update(POOL_CREDENTIALS)
+    return connection
 
-# use for automatically detect modules from models directory
-MODELS_MODULES = get_models_modules()
 
 TORTOISE_CONFIG: dict[str, Any] = {
     "connections": {
-        "default": str(settings.db_url),
+        "default": {
+            "engine": "src.db.pool",
+            "credentials": {
+                "host": settings.db_host,
+                "port": settings.db_port,
+                "user": settings.db_user,
+                "password": settings.db_pass,
+                "database": settings.db_base,
+                **POOL_CREDENTIALS,
+            },
+        },
     },
     "apps": {
         "models": {
@@ -66,3 +105,8 @@ TORTOISE_CONFIG: dict[str, Any] = {
         },
     },
 }
+
+if settings.db_replica_url:
+    TORTOISE_CONFIG["connections"][REPLICA_CONNECTION] = get_replica_connection(
+        settings.db_replica_url,
+    )
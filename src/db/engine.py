@@ -2,10 +2,21 @@
 
 """This module is a database initializer."""
 
+import argparse
+from pathlib import Path
+from typing import Optional
+
 from loguru import logger
 from tortoise import Tortoise, connections, run_async
 
+from src.db import transfer
 from src.db.config import TORTOISE_CONFIG
+from src.db.pool import warm_up_pools
+from src.db.profiler import install_query_profiler
+from src.services.user_service import UserService
+from src.services.user_upsert import warm_up_statements
+from src.settings import settings
+from src.startup import startup_profile
 
 
 async def database_init() -> None:
@@ -15,10 +26,17 @@ async def database_init() -> None:
         config=TORTOISE_CONFIG,
     )
     logger.debug("Tortoise inited!")
+    startup_profile.mark("database init")
+    if settings.db_pool_warm_up:
+        await warm_up_pools(warm_up_statements)
+        startup_profile.mark("database warm-up")
+    if settings.db_profile:
+        install_query_profiler()
 
 
 async def database_close() -> None:
-    """Close database."""
+    """Close database, writing pending user changes first."""
+    await UserService.stop_writer()
     logger.debug("Closing Tortoise...")
     await connections.close_all()
     logger.debug("Tortoise closed!")
@@ -29,3 +47,78 @@ def generate_schema() -> None:
     logger.debug("Generating schema...")
     run_async(Tortoise.generate_schemas())
     logger.debug("Schema generated!")
+
+
+def export_users(
+    path: Path,
+    file_format: Optional[transfer.TransferFormat] = None,
+    chunk_size: int = 1000,
+) -> None:
+    """Export the users table to a CSV or NDJSON file."""
+
+    async def run() -> None:
+        await Tortoise.init(config=TORTOISE_CONFIG)
+        count = await transfer.export_users(
+            path,
+            file_format or transfer.TransferFormat.from_path(path),
+            chunk_size,
+        )
+        logger.info("Exported {} users to {}", count, path)
+
+    run_async(run())
+
+
+def import_users(
+    path: Path,
+    file_format: Optional[transfer.TransferFormat] = None,
+    chunk_size: int = 1000,
+) -> None:
+    """Insert or update the users of a CSV or NDJSON file."""
+
+    async def run() -> None:
+        await Tortoise.init(config=TORTOISE_CONFIG)
+        count = await transfer.import_users(
+            path,
+            file_format or transfer.TransferFormat.from_path(path),
+            chunk_size,
+        )
+        logger.info("Imported {} users from {}", count, path)
+
+    run_async(run())
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the users import and export commands."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.db.engine",
+        description="Stream the users table to or from a CSV or NDJSON file.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, description in (
+        ("export", "write all users to a file"),
+        ("import", "insert or update the users of a file"),
+    ):
+        command = commands.add_parser(name, help=description)
+        command.add_argument("path", type=Path, help=".csv, .ndjson or .jsonl file")
+        command.add_argument(
+            "--format",
+            type=transfer.TransferFormat,
+            choices=list(transfer.TransferFormat),
+            help="file format, guessed from the extension by default",
+        )
+        command.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="number of users held in memory at once",
+        )
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_users(args.path, args.format, args.chunk_size)
+    else:
+        import_users(args.path, args.format, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains models for broadcasts."""
+
+import enum
+
+from tortoise import fields, models
+
+from src.db.model_mixins.datetime_model_mixin import DateTimeModelMixin
+
+
+class BroadcastStatus(str, enum.Enum):
+    """Possible broadcast statuses."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FINISHED = "finished"
+    CANCELLED = "cancelled"
+
+
+class BroadcastModel(
+    models.Model,
+    DateTimeModelMixin,
+):
+    """Model for a message sent to every user, with its progress."""
+
+    id = fields.IntField(pk=True)
+    text = fields.TextField()
+    status = fields.CharEnumField(
+        BroadcastStatus,
+        max_length=16,
+        default=BroadcastStatus.PENDING,
+    )
+    last_user_id = fields.BigIntField(default=0)
+    sent = fields.IntField(default=0)
+    failed = fields.IntField(default=0)
+    blocked = fields.IntField(default=0)
+
+    class Meta:
+        """Meta-settings class."""
+
+        table = "broadcasts"
+        description = "Model for a message sent to every user, with its progress."
+
+    def __str__(self) -> str:
+        return (
+            "{class_name}("
+            "id={id}, "
+            "status={status}, "
+            "last_user_id={last_user_id})"
+        ).format(
+            class_name=self.__class__.__name__,
+            id=self.id,
+            status=self.status.value,
+            last_user_id=self.last_user_id,
+        )
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains models for FSM storage."""
+
+from tortoise import fields, models
+
+from src.db.model_mixins.datetime_model_mixin import DateTimeModelMixin
+
+
+class FSMStateModel(
+    models.Model,
+    DateTimeModelMixin,
+):
+    """Model for FSM state and data of a storage key."""
+
+    key = fields.CharField(max_length=255, pk=True)
+    state = fields.CharField(max_length=255, null=True)
+    data = fields.JSONField(default=dict)
+
+    class Meta:
+        """Meta-settings class."""
+
+        table = "fsm_states"
+        description = "Model for FSM state and data of a storage key."
+
+    def __str__(self) -> str:
+        return "{class_name}(key={key}, state={state})".format(
+            class_name=self.__class__.__name__,
+            key=self.key,
+            state=self.state,
+        )
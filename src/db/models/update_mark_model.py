@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains models for handled update marks."""
+
+from tortoise import fields, models
+
+from src.db.model_mixins.datetime_model_mixin import DateTimeModelMixin
+
+
+class UpdateMarkModel(
+    models.Model,
+    DateTimeModelMixin,
+):
+    """Model for the highest update id handled by a bot process."""
+
+    key = fields.CharField(max_length=64, pk=True)
+    update_id = fields.BigIntField()
+
+    class Meta:
+        """Meta-settings class."""
+
+        table = "update_marks"
+        description = "Model for the highest update id handled by a bot process."
+
+    def __str__(self) -> str:
+        return "{class_name}(key={key}, update_id={update_id})".format(
+            class_name=self.__class__.__name__,
+            key=self.key,
+            update_id=self.update_id,
+        )
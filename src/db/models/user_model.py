@@ -25,6 +25,8 @@ class UserModel(
 
         table = "users"
         description = "Model for bot users."
+        # Read by the periodic ban list refresh
+        indexes = (("updated_at",),)
 
     def __str__(self) -> str:
         return (
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""This module provides the monitored asyncpg database client."""
+
+import time
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Generator,
+    Optional,
+    Sequence,
+    TypeVar,
+    cast,
+)
+
+import asyncpg
+from loguru import logger
+from tortoise import connections
+from tortoise.backends.asyncpg import AsyncpgDBClient
+
+from src.metrics import Number, registry
+
+Statement = tuple[str, Sequence[Any]]
+T = TypeVar("T")
+
+pool_wait_latency = registry.histogram(
+    "bot_db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+    labels=("connection",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+
+class PoolMonitor:
+    """Connection usage and wait time statistics of an asyncpg pool.
+
+    Attributes:
+        name (str): Name of the Tortoise connection.
+        pool (asyncpg.Pool): Monitored pool.
+        waiting (int): Number of callers waiting for a connection.
+        acquired (int): Number of acquired connections since start.
+        wait_time_total (float): Total time spent waiting in seconds.
+        wait_time_max (float): Longest wait in seconds.
+    """
+
+    def __init__(self, name: str, pool: asyncpg.Pool) -> None:
+        self.name = name
+        self.pool = pool
+        self.waiting = 0
+        self.acquired = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def timed(self, acquiring: Awaitable[T]) -> T:
+        """Wait for a connection and record the wait time.
+
+        Args:
+            acquiring (Awaitable[T]): Pending acquire of the pool.
+
+        Returns:
+            T: The acquired connection.
+        """
+        started_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            return await acquiring
+        finally:
+            self.waiting -= 1
+            wait_time = time.perf_counter() - started_at
+            self.acquired += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+            pool_wait_latency.observe(wait_time, self.name)
+
+    def stats(self) -> dict[str, Number]:
+        """Return pool usage statistics.
+
+        Returns:
+            dict[str, Number]: Pool bounds, open, idle and used connections,
+                waiting callers and acquire wait times in seconds.
+        """
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "wait_time_avg": (
+                self.wait_time_total / self.acquired if self.acquired else 0.0
+            ),
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+class TimedAcquire:
+    """Acquire of a MonitoredPool, awaited or used with ``async with``."""
+
+    __slots__ = ("_monitor", "_acquire")
+
+    def __init__(self, monitor: PoolMonitor, acquire: Any) -> None:
+        self._monitor = monitor
+        self._acquire = acquire
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        return self._monitor.timed(self._acquire).__await__()
+
+    async def __aenter__(self) -> Any:
+        return await self._monitor.timed(self._acquire.__aenter__())
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._acquire.__aexit__(*exc_info)
+
+
+class MonitoredPool:
+    """Proxy of an asyncpg pool timing the acquired connections.
+
+    asyncpg.Pool has slots, so its acquire method cannot be replaced on
+    the instance. The proxy wraps acquire and forwards everything else.
+
+    Attributes:
+        pool (asyncpg.Pool): Proxied pool.
+        monitor (PoolMonitor): Statistics of the pool.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, monitor: PoolMonitor) -> None:
+        self.pool = pool
+        self.monitor = monitor
+
+    def acquire(self, *, timeout: Optional[float] = None) -> TimedAcquire:
+        """Acquire a connection, see asyncpg.Pool.acquire."""
+        return TimedAcquire(self.monitor, self.pool.acquire(timeout=timeout))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.pool, name)
+
+
+class MonitoredAsyncpgClient(AsyncpgDBClient):
+    """Asyncpg client reporting the usage of its connection pool.
+
+    Attributes:
+        monitor (Optional[PoolMonitor]): Statistics of the pool,
+            None until the pool is created.
+    """
+
+    monitor = None
+
+    async def create_pool(self, **kwargs: Any) -> asyncpg.Pool:
+        """Create the pool and start monitoring it."""
+        pool = await super().create_pool(**kwargs)
+        self.monitor = PoolMonitor(self.connection_name, pool)
+        registry.register_collector(
+            f"db_pool_{self.connection_name}",
+            self.monitor.stats,
+        )
+        return cast(asyncpg.Pool, MonitoredPool(pool, self.monitor))
+
+    async def warm_up(self, statements: Sequence[Statement] = ()) -> int:
+        """Open the minimum number of connections and prepare statements.
+
+        Every statement is executed once on each connection in a
+        transaction that is rolled back, so it lands in the statement
+        cache of the connection without changing any data.
+
+        Args:
+            statements (Sequence[Statement]): Queries and their parameters.
+
+        Returns:
+            int: Number of warmed up connections.
+        """
+        async with self.acquire_connection():
+            pass  # creates the pool with its minimum size
+        pool = self._pool
+        assert pool is not None
+        held = [await pool.acquire() for _ in range(pool.get_min_size())]
+        try:
+            for connection in held:
+                transaction = connection.transaction()
+                await transaction.start()
+                try:
+                    for query, params in statements:
+                        await connection.fetch(query, *params)
+                finally:
+                    await transaction.rollback()
+        finally:
+            for connection in held:
+                await pool.release(connection)
+        return len(held)
+
+
+async def warm_up_pools(
+    statements: Callable[[], Sequence[Statement]] = tuple,
+) -> None:
+    """Warm up the pools of all monitored connections.
+
+    A failure is logged, the pools are then filled on demand.
+
+    Args:
+        statements (Callable[[], Sequence[Statement]]): Returns the queries
+            to prepare on every connection.
+    """
+    try:
+        clients = connections.all()
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Failed to warm up database connections")
+        return
+
+    for client in clients:
+        if not isinstance(client, MonitoredAsyncpgClient):
+            continue
+        try:
+            # Hot statements are writes, replicas only get their pool opened
+            warmed = await client.warm_up(
+                statements() if client.connection_name == "default" else (),
+            )
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception(
+                "Failed to warm up database connection {}",
+                client.connection_name,
+            )
+        else:
+            logger.info("Opened {} connections to {}", warmed, client.connection_name)
+
+
+client_class = MonitoredAsyncpgClient  # pylint: disable=invalid-name
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""This module profiles the queries sent to the database."""
+
+import asyncio
+import time
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from typing import Any, Awaitable, Callable, Coroutine, Optional, Sequence, TypeVar
+
+from loguru import logger
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from src.metrics import registry
+from src.settings import settings
+
+T = TypeVar("T")
+
+QUERY_METHODS = (
+    "execute_insert",
+    "execute_many",
+    "execute_query",
+    "execute_query_dict",
+    "execute_script",
+)
+
+query_latency = registry.histogram(
+    "bot_db_query_duration_seconds",
+    "Time spent in database queries.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+queries_per_update = registry.histogram(
+    "bot_db_queries_per_update",
+    "Number of database queries made while handling an update.",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50),
+)
+background_queries = registry.counter(
+    "bot_db_background_queries_total",
+    "Number of database queries made by background tasks, outside of updates.",
+)
+query_budget_exceeded = registry.counter(
+    "bot_db_query_budget_exceeded_total",
+    "Number of updates that made more queries than the budget.",
+)
+
+
+class UpdateQueries:  # pylint: disable=too-few-public-methods
+    """Queries made while handling an update.
+
+    Attributes:
+        update_id (int): Id of the update.
+        count (int): Number of queries.
+        duration (float): Total time spent in the queries in seconds.
+        closed (bool): Whether the update is handled, later queries
+            made by background tasks started during the update
+            are counted as background queries.
+    """
+
+    __slots__ = ("update_id", "count", "duration", "closed")
+
+    def __init__(self, update_id: int) -> None:
+        self.update_id = update_id
+        self.count = 0
+        self.duration = 0.0
+        self.closed = False
+
+
+current_update: ContextVar[Optional[UpdateQueries]] = ContextVar(
+    "current_update",
+    default=None,
+)
+in_background: ContextVar[bool] = ContextVar("in_background", default=False)
+
+
+def create_untracked_task(coro: Coroutine[Any, Any, T]) -> asyncio.Task[T]:
+    """Start a background task whose queries are not charged to an update.
+
+    A task copies the context it is created in, so without this a task
+    started while an update is handled, like a batched write, would
+    count its queries towards that update. Its queries are counted as
+    background queries instead.
+
+    Args:
+        coro (Coroutine[Any, Any, T]): Coroutine run by the task.
+
+    Returns:
+        asyncio.Task[T]: The started task.
+    """
+    context = copy_context()
+    context.run(current_update.set, None)
+    context.run(in_background.set, True)
+    return asyncio.create_task(coro, context=context)
+
+
+def params_shape(values: Optional[Sequence[Any]]) -> str:
+    """Describe query parameters without their values.
+
+    Args:
+        values (Optional[Sequence[Any]]): Query parameters, one list
+            per row for execute_many.
+
+    Returns:
+        str: Number of parameters, and rows for bulk queries.
+    """
+    if not values:
+        return "no parameters"
+    if isinstance(values[0], (list, tuple)):
+        return f"{len(values)} rows of {len(values[0])} parameters"
+    return f"{len(values)} parameters"
+
+
+def record_query(query: str, values: Optional[Sequence[Any]], duration: float) -> None:
+    """Attribute a query to the current update or to the background, log it when slow.
+
+    Args:
+        query (str): SQL statement.
+        values (Optional[Sequence[Any]]): Query parameters.
+        duration (float): Time spent in the query in seconds.
+    """
+    query_latency.observe(duration)
+    update = current_update.get()
+    if update is not None and not update.closed:
+        update.count += 1
+        update.duration += duration
+    elif update is not None or in_background.get():
+        background_queries.inc()
+    if duration >= settings.db_slow_query:
+        logger.warning(
+            "Slow query in update {} took {:.1f} ms with {}: {}",
+            update.update_id if update is not None else "-",
+            duration * 1000,
+            params_shape(values),
+            query,
+        )
+
+
+def _profiled(method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    @wraps(method)
+    async def wrapper(
+        self: BaseDBAsyncClient,
+        query: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            record_query(
+                query,
+                args[0] if args else kwargs.get("values"),
+                time.perf_counter() - started_at,
+            )
+
+    wrapper.__profiled__ = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def _client_classes(client_class: type) -> list[type]:
+    # The query methods are usually defined by a base class of the client,
+    # like AsyncpgDBClient for the monitored client, and the transaction
+    # wrappers subclass that base rather than the client class
+    classes: dict[type, None] = {}
+    pending = [
+        base
+        for base in client_class.__mro__
+        if issubclass(base, BaseDBAsyncClient) and base is not BaseDBAsyncClient
+    ]
+    while pending:
+        cls = pending.pop()
+        if cls not in classes:
+            classes[cls] = None
+            pending.extend(cls.__subclasses__())
+    return list(classes)
+
+
+def install_query_profiler() -> None:
+    """Profile the queries of all initialized connections.
+
+    The query methods of the client classes, their base classes and
+    the transaction wrappers are wrapped once.
+    """
+    for connection in connections.all():
+        for client_class in _client_classes(type(connection)):
+            for name in QUERY_METHODS:
+                method = client_class.__dict__.get(name)
+                if method is not None and not hasattr(method, "__profiled__"):
+                    setattr(client_class, name, _profiled(method))
+    logger.debug("Query profiler installed")
+
+
+def uninstall_query_profiler() -> None:
+    """Restore the query methods of all initialized connections."""
+    for connection in connections.all():
+        for client_class in _client_classes(type(connection)):
+            for name in QUERY_METHODS:
+                method = client_class.__dict__.get(name)
+                if hasattr(method, "__profiled__"):
+                    setattr(client_class, name, method.__wrapped__)  # type: ignore[union-attr]
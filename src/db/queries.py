@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""This module builds raw queries Tortoise cannot express."""
+
+from typing import Any, Iterable, Optional, Type
+
+from tortoise import connections, models
+from tortoise.backends.asyncpg import AsyncpgDBClient
+
+UPSERT_DIALECTS = ("postgres", "sqlite")
+
+
+def postgres_client(name: str = "default") -> Optional[AsyncpgDBClient]:
+    """Return a connection if it is an asyncpg client, None otherwise."""
+    client = connections.get(name)
+    return client if isinstance(client, AsyncpgDBClient) else None
+
+
+def quote(name: str) -> str:
+    """Quote a table or column name."""
+    return f'"{name}"'
+
+
+def placeholders(dialect: str, start: int, count: int) -> str:
+    """Return `count` comma separated parameter placeholders.
+
+    Args:
+        dialect (str): Dialect of the connection.
+        start (int): Number of the first parameter, used by PostgreSQL.
+        count (int): Number of placeholders.
+
+    Returns:
+        str: Placeholders like '$1, $2' or '?, ?'.
+    """
+    if dialect == "postgres":
+        return ", ".join(f"${index}" for index in range(start, start + count))
+    return ", ".join("?" * count)
+
+
+def build_insert_query(
+    model: Type[models.Model],
+    dialect: str,
+    columns: list[str],
+    rows: int,
+) -> str:
+    """Build a multi-row ``INSERT`` into the table of a model.
+
+    Args:
+        model (Type[models.Model]): Model of the table.
+        dialect (str): Dialect of the connection, 'postgres' or 'sqlite'.
+        columns (list[str]): Inserted columns, in the order of the values.
+        rows (int): Number of inserted rows.
+
+    Returns:
+        str: Parametrized query without a conflict clause.
+    """
+    # pylint: disable=protected-access
+    values = ", ".join(
+        f"({placeholders(dialect, row * len(columns) + 1, len(columns))})"
+        for row in range(rows)
+    )
+    return "INSERT INTO {table} ({columns}) VALUES {values}".format(
+        table=quote(model._meta.db_table),
+        columns=", ".join(quote(column) for column in columns),
+        values=values,
+    )
+
+
+def build_upsert_query(  # pylint: disable=too-many-arguments
+    model: Type[models.Model],
+    dialect: str,
+    columns: list[str],
+    rows: int,
+    *,
+    update_columns: Iterable[str],
+    touch_columns: Iterable[str] = (),
+) -> str:
+    """Build a multi-row ``INSERT ... ON CONFLICT (pk) DO UPDATE``.
+
+    Args:
+        model (Type[models.Model]): Model of the table.
+        dialect (str): Dialect of the connection, 'postgres' or 'sqlite'.
+        columns (list[str]): Inserted columns, in the order of the values.
+        rows (int): Number of inserted rows.
+        update_columns (Iterable[str]): Columns overwritten on conflict.
+        touch_columns (Iterable[str]): Columns overwritten on conflict only
+            when one of `update_columns` changes, like updated_at.
+
+    Returns:
+        str: Parametrized query.
+    """
+    # pylint: disable=protected-access
+    table = quote(model._meta.db_table)
+    update_columns = list(update_columns)
+    updates = [
+        f"{quote(column)} = EXCLUDED.{quote(column)}" for column in update_columns
+    ]
+    if touch_columns:
+        distinct = "IS DISTINCT FROM" if dialect == "postgres" else "IS NOT"
+        changed = " OR ".join(
+            f"{table}.{quote(column)} {distinct} EXCLUDED.{quote(column)}"
+            for column in update_columns
+        )
+        updates.extend(
+            f"{quote(column)} = CASE WHEN {changed} "
+            f"THEN EXCLUDED.{quote(column)} ELSE {table}.{quote(column)} END"
+            for column in touch_columns
+        )
+    return "{insert} ON CONFLICT ({pk}) DO UPDATE SET {updates}".format(
+        insert=build_insert_query(model, dialect, columns, rows),
+        pk=quote(model._meta.db_pk_column),
+        updates=", ".join(updates),
+    )
+
+
+def prepare_params(
+    model: Type[models.Model],
+    instances: Iterable[models.Model],
+    columns: list[str],
+) -> list[Any]:
+    """Convert model instances to flat query parameters.
+
+    Values are converted the same way Tortoise converts them for its own
+    inserts on the model connection, including auto_now timestamps.
+
+    Args:
+        model (Type[models.Model]): Model of the instances.
+        instances (Iterable[models.Model]): Unsaved model instances.
+        columns (list[str]): Columns to take, in query order.
+
+    Returns:
+        list[Any]: Parameters of all rows, row after row.
+    """
+    # pylint: disable=protected-access
+    connection = model._meta.db
+    executor = connection.executor_class(model=model, db=connection)
+    params: list[Any] = []
+    for instance in instances:
+        params.extend(
+            executor.column_map[column](getattr(instance, column), instance)
+            for column in columns
+        )
+    return params
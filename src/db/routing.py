@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""This module routes reads between the primary and the read replica."""
+
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from src.metrics import registry
+
+routed_reads = registry.counter(
+    "bot_db_routed_reads_total",
+    "Number of reads routed to each database.",
+    labels=("target",),
+)
+
+
+class ReplicaRouter:
+    """Route reads to a replica while keeping them consistent with writes.
+
+    A key written through this process is read from the primary for
+    `window` seconds, long enough for the write to reach the replica.
+    Other keys are read from the replica.
+
+    Attributes:
+        replica (Optional[str]): Name of the replica connection,
+            None routes every read to the primary.
+        window (float): Time in seconds a written key stays on the primary.
+    """
+
+    def __init__(self, replica: Optional[str], window: float) -> None:
+        self.replica = replica
+        self.window = window
+        self._written: OrderedDict[Hashable, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._written)
+
+    def db_for_read(self, key: Hashable) -> Optional[BaseDBAsyncClient]:
+        """Return the replica connection to read a key from.
+
+        Args:
+            key (Hashable): Key of the read row, like a user id.
+
+        Returns:
+            Optional[BaseDBAsyncClient]: The replica connection, None if
+                the key must be read from the primary.
+        """
+        if self.replica is None:
+            return None
+
+        written_at = self._written.get(key)
+        if written_at is not None and time.monotonic() - written_at < self.window:
+            routed_reads.inc("primary")
+            return None
+
+        routed_reads.inc("replica")
+        return connections.get(self.replica)
+
+    def mark_written(self, key: Hashable) -> None:
+        """Route the reads of a key to the primary for the next window.
+
+        Args:
+            key (Hashable): Key of the written row, like a user id.
+        """
+        if self.replica is None:
+            return
+
+        now = time.monotonic()
+        self._written[key] = now
+        self._written.move_to_end(key)
+        # Keys are ordered by write time, expired ones are at the front
+        while self._written:
+            oldest_key, written_at = next(iter(self._written.items()))
+            if now - written_at < self.window:
+                break
+            del self._written[oldest_key]
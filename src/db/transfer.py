@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+"""This module streams the users table to and from CSV or NDJSON files."""
+
+import csv
+import enum
+import json
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, Optional
+
+from loguru import logger
+from tortoise import timezone
+
+from src.db.models.user_model import UserModel
+from src.db.queries import postgres_client
+from src.schemas.user_view import USER_FIELDS
+
+Row = tuple[Any, ...]
+
+COLUMNS = USER_FIELDS
+BOOLEAN_COLUMNS = frozenset({"is_blocked", "is_banned"})
+DATETIME_COLUMNS = frozenset({"created_at", "updated_at"})
+# Values written by PostgreSQL COPY and by this module
+TRUE_VALUES = frozenset({"t", "true", "1"})
+STAGING_TABLE = "users_import"
+# Staging column numbering the rows in file order
+STAGING_POSITION = "import_position"
+
+
+class TransferFormat(str, enum.Enum):
+    """Possible file formats."""
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+    @classmethod
+    def from_path(cls, path: Path) -> "TransferFormat":
+        """Guess the format from the file extension.
+
+        Raises:
+            ValueError: If the extension is not .csv, .ndjson or .jsonl.
+        """
+        suffix = path.suffix.lower()
+        if suffix == ".csv":
+            return cls.CSV
+        if suffix in {".ndjson", ".jsonl"}:
+            return cls.NDJSON
+        raise ValueError(f"Unknown format of {path}, use .csv or .ndjson")
+
+
+def chunked(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    """Split rows into lists of at most `size` rows."""
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def decode_value(column: str, value: Any) -> Any:
+    """Convert a value read from a file to its column type.
+
+    Args:
+        column (str): Column name.
+        value (Any): String from CSV or JSON value.
+
+    Returns:
+        Any: Column value. Missing and empty values are NULL, except
+            for flags, which are false, and timestamps, which are now.
+    """
+    if value is None or value == "":
+        if column in BOOLEAN_COLUMNS:
+            return False
+        return timezone.now() if column in DATETIME_COLUMNS else None
+    if column == "id":
+        return int(value)
+    if column in BOOLEAN_COLUMNS:
+        return value if isinstance(value, bool) else value.lower() in TRUE_VALUES
+    if column in DATETIME_COLUMNS:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_value(value: Any) -> Any:
+    """Convert a column value to its JSON representation."""
+    return value.isoformat(sep=" ") if isinstance(value, datetime) else value
+
+
+def read_rows(file: IO[str], file_format: TransferFormat) -> Iterator[Row]:
+    """Yield the rows of a file one by one.
+
+    Args:
+        file (IO[str]): File opened in text mode.
+        file_format (TransferFormat): Format of the file.
+
+    Yields:
+        Row: Column values in the order of COLUMNS.
+    """
+    records: Iterable[dict[str, Any]]
+    if file_format == TransferFormat.CSV:
+        records = csv.DictReader(file)
+    else:
+        records = (json.loads(line) for line in file if line.strip())
+    for record in records:
+        yield tuple(decode_value(column, record.get(column)) for column in COLUMNS)
+
+
+def write_rows(file: IO[str], file_format: TransferFormat, rows: Iterable[Row]) -> None:
+    """Write rows to a file.
+
+    Args:
+        file (IO[str]): File opened in text mode.
+        file_format (TransferFormat): Format of the file.
+        rows (Iterable[Row]): Column values in the order of COLUMNS.
+    """
+    if file_format == TransferFormat.CSV:
+        writer = csv.writer(file)
+        writer.writerows(
+            tuple(
+                ("t" if value else "f")
+                if isinstance(value, bool)
+                else encode_value(value)
+                for value in row
+            )
+            for row in rows
+        )
+        return
+    for row in rows:
+        record = dict(zip(COLUMNS, map(encode_value, row), strict=True))
+        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+async def export_users(
+    path: Path,
+    file_format: TransferFormat,
+    chunk_size: int = 1000,
+) -> int:
+    """Write all users to a file.
+
+    CSV files are written by PostgreSQL with COPY. Other formats and
+    databases read the users in chunks ordered by id. Either way at most
+    one chunk is held in memory.
+
+    Args:
+        path (Path): Destination file, overwritten if it exists.
+        file_format (TransferFormat): Format of the file.
+        chunk_size (int): Number of users read per query.
+
+    Returns:
+        int: Number of exported users.
+    """
+    client = postgres_client()
+    if client is not None and file_format == TransferFormat.CSV:
+        async with client.acquire_connection() as connection:
+            with path.open("wb") as file:
+                status = await connection.copy_from_table(
+                    UserModel._meta.db_table,  # pylint: disable=protected-access
+                    columns=list(COLUMNS),
+                    output=file,
+                    format="csv",
+                    header=True,
+                )
+        return int(status.split()[-1])
+
+    exported = 0
+    last_id: Optional[int] = None
+    with path.open("w", encoding="utf-8", newline="") as file:
+        if file_format == TransferFormat.CSV:
+            csv.writer(file).writerow(COLUMNS)
+        while True:
+            query = (
+                UserModel.all() if last_id is None else UserModel.filter(id__gt=last_id)
+            )
+            rows = await query.order_by("id").limit(chunk_size).values_list(*COLUMNS)
+            if not rows:
+                break
+            write_rows(file, file_format, rows)
+            exported += len(rows)
+            last_id = rows[-1][0]
+            logger.debug("Exported {} users", exported)
+    return exported
+
+
+async def import_users(
+    path: Path,
+    file_format: TransferFormat,
+    chunk_size: int = 1000,
+) -> int:
+    """Insert or update the users of a file.
+
+    On PostgreSQL the rows are sent with the binary COPY protocol into
+    a temporary table and merged into the users table by one upsert,
+    in a single transaction. Other databases get one bulk upsert per
+    chunk. Either way a user listed twice gets the values of its last
+    row. The file is read a chunk at a time.
+
+    Args:
+        path (Path): Source file.
+        file_format (TransferFormat): Format of the file.
+        chunk_size (int): Number of users sent at once.
+
+    Returns:
+        int: Number of imported users.
+    """
+    imported = 0
+    client = postgres_client()
+    with path.open(encoding="utf-8", newline="") as file:
+        chunks = chunked(read_rows(file, file_format), chunk_size)
+        if client is None:
+            update_fields = [column for column in COLUMNS if column != "id"]
+            for chunk in chunks:
+                await UserModel.bulk_create(
+                    [
+                        UserModel(**dict(zip(COLUMNS, row, strict=True)))
+                        for row in chunk
+                    ],
+                    on_conflict=["id"],
+                    update_fields=update_fields,
+                )
+                imported += len(chunk)
+                logger.debug("Imported {} users", imported)
+            return imported
+
+        table = UserModel._meta.db_table  # pylint: disable=protected-access
+        columns = ", ".join(f'"{column}"' for column in COLUMNS)
+        updates = ", ".join(
+            f'"{column}" = EXCLUDED."{column}"' for column in COLUMNS if column != "id"
+        )
+        async with client.acquire_connection() as connection:
+            async with connection.transaction():
+                await connection.execute(
+                    f'CREATE TEMPORARY TABLE "{STAGING_TABLE}" '
+                    f'(LIKE "{table}" INCLUDING DEFAULTS, '
+                    f'"{STAGING_POSITION}" BIGSERIAL) ON COMMIT DROP',
+                )
+                for chunk in chunks:
+                    await connection.copy_records_to_table(
+                        STAGING_TABLE,
+                        records=chunk,
+                        columns=list(COLUMNS),
+                    )
+                    imported += len(chunk)
+                    logger.debug("Copied {} users", imported)
+                await connection.execute(
+                    f'INSERT INTO "{table}" ({columns}) '
+                    f'SELECT DISTINCT ON ("id") {columns} FROM "{STAGING_TABLE}" '
+                    f'ORDER BY "id", "{STAGING_POSITION}" DESC '
+                    f'ON CONFLICT ("id") DO UPDATE SET {updates}',
+                )
+    return imported
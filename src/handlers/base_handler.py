@@ -6,10 +6,10 @@ from aiogram import Dispatcher, types
 from aiogram.filters.command import CommandStart
 from loguru import logger
 
-from src.schemas.user_scheme import UserSchema
+from src.schemas.user_view import UserView
 
 
-async def cmd_start(message: types.Message, user: UserSchema) -> None:
+async def cmd_start(message: types.Message, user: UserView) -> None:
     """Start command handler."""
     logger.info("User {user} start conversation with bot", user=user.id)
     user_mention = user.mention_html()
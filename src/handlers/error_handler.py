@@ -5,14 +5,33 @@
 from aiogram import Dispatcher, types
 from loguru import logger
 
+from src.logs import error_log
+from src.metrics import handler_error_fingerprints, handler_errors
+
 
 async def error_handler(error_event: types.ErrorEvent) -> bool:
-    """Base errors handler."""
-    logger.exception(
-        "Cause exception {e} in update {event}",
-        e=error_event.exception,
-        event=error_event,
+    """Base errors handler.
+
+    The first occurrence of an error is logged with its traceback and
+    the update, repeats are only counted and summarized periodically.
+    """
+    exception = error_event.exception
+    fingerprint, is_first = error_log.record(
+        exception,
+        error_event.update.update_id,
+    )
+    handler_errors.inc(
+        error_event.update.event_type,
+        type(exception).__name__,
     )
+    handler_error_fingerprints.inc(fingerprint, type(exception).__name__)
+    if is_first:
+        logger.exception(
+            "Cause exception {e} in update {event}, fingerprint {fingerprint}",
+            e=exception,
+            event=error_event,
+            fingerprint=fingerprint,
+        )
 
     return True
 
@@ -20,4 +39,6 @@ async def error_handler(error_event: types.ErrorEvent) -> bool:
 def setup_errors(dp: Dispatcher) -> None:
     """Register errors handlers."""
     dp.error.register(error_handler)
+    dp.startup.register(error_log.start)
+    dp.shutdown.register(error_log.stop)
     logger.debug("Errors handlers registered")
@@ -2,39 +2,70 @@
 
 """This module configures logging."""
 
+import asyncio
+import atexit
+import inspect
 import logging
+import queue
 import sys
-from typing import Union
+import threading
+import time
+import zlib
+from types import TracebackType
+from typing import Any, Optional, TextIO
 
 from loguru import logger
 
 from src.settings import settings
+from src.tasks import cancel_task
+
+LEVEL_NAMES = {
+    logging.DEBUG: "DEBUG",
+    logging.INFO: "INFO",
+    logging.WARNING: "WARNING",
+    logging.ERROR: "ERROR",
+    logging.CRITICAL: "CRITICAL",
+}
+
+_MIN_LEVEL_NO = logging.getLevelNamesMapping()[settings.log_level.value]
+
+
+def log_enabled(level_no: int) -> bool:
+    """Return whether messages of a level reach the configured sink.
+
+    Check it before building expensive log arguments on hot paths.
+
+    Args:
+        level_no (int): Numeric level, like logging.DEBUG.
+
+    Returns:
+        bool: True if the level is not filtered out.
+    """
+    return level_no >= _MIN_LEVEL_NO
 
 
 class InterceptHandler(logging.Handler):
-    """Default handler from examples in loguru documentation.
+    """Handler passing standard logging records to loguru.
 
-    This handler intercepts all log requests and
-    passes them to loguru.
+    As in the handler from the loguru documentation, the caller is found
+    by skipping the frames of the logging module, so loguru reports its
+    module, file, function and line. Records below the handler level
+    never reach emit.
 
     For more info see:
     https://loguru.readthedocs.io/en/stable/overview.html#entirely-compatible-with-standard-logging
     """
 
-    def emit(self, record: logging.LogRecord) -> None:  # pragma: no cover
+    def emit(self, record: logging.LogRecord) -> None:
         """Propagates logs to loguru.
 
         :param record: record to log.
         """
-        try:
-            level: Union[str, int] = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back  # type: ignore
+        level = LEVEL_NAMES.get(record.levelno) or record.levelno
+
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
             depth += 1
 
         logger.opt(depth=depth, exception=record.exc_info).log(
@@ -43,23 +74,275 @@ class InterceptHandler(logging.Handler):
         )
 
 
+class BackgroundSink:
+    """Loguru sink writing messages to a stream from a background thread.
+
+    Logging only puts the formatted message into a bounded queue, so it
+    never waits for the stream. The thread writes queued messages in
+    batches. Messages logged while the queue is full are dropped and
+    counted.
+
+    Attributes:
+        stream (TextIO): Stream the messages are written to.
+        max_size (int): Maximum number of queued messages.
+        dropped (int): Number of messages dropped because the queue was full.
+    """
+
+    def __init__(self, stream: TextIO, max_size: int) -> None:
+        self.stream = stream
+        self.max_size = max_size
+        self.dropped = 0
+        self._messages: queue.Queue[Optional[str]] = queue.Queue(maxsize=max_size)
+        self._thread = threading.Thread(
+            target=self._run,
+            name="log-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        """Queue a formatted message."""
+        try:
+            self._messages.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            message = self._messages.get()
+            batch = []
+            while message is not None:
+                batch.append(message)
+                try:
+                    message = self._messages.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.stream.write("".join(batch))
+                self.stream.flush()
+            if message is None:
+                return
+
+    def stop(self) -> None:
+        """Write the queued messages and stop the thread."""
+        if not self._thread.is_alive():
+            return
+        self._messages.put(None)
+        self._thread.join()
+        if self.dropped:
+            self.stream.write(f"{self.dropped} log messages were dropped\n")
+            self.stream.flush()
+
+
+class RateLimitedLog:
+    """Log repeated messages at most once per interval.
+
+    Messages are told apart by their template, the number of messages
+    dropped since the last one is appended to the next logged message.
+    Use it for logs written on every update.
+
+    Attributes:
+        interval (float): Time in seconds between two messages
+            with the same template, 0 logs every message.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._last: dict[str, tuple[float, int]] = {}
+
+    def log(self, level_no: int, message: str, *args: Any) -> None:
+        """Log a message unless the same template was logged recently.
+
+        Args:
+            level_no (int): Numeric level, like logging.DEBUG.
+            message (str): Message template with `{}` placeholders.
+            *args (Any): Template arguments, not formatted when dropped.
+        """
+        self._log(level_no, message, args)
+
+    def debug(self, message: str, *args: Any) -> None:
+        """Log a debug message, see log."""
+        self._log(logging.DEBUG, message, args)
+
+    def _log(self, level_no: int, message: str, args: tuple[Any, ...]) -> None:
+        if not log_enabled(level_no):
+            return
+
+        now = time.monotonic()
+        logged_at, dropped = self._last.get(message, (float("-inf"), 0))
+        if now - logged_at < self.interval:
+            self._last[message] = (logged_at, dropped + 1)
+            return
+
+        self._last[message] = (now, 0)
+        if dropped:
+            message = f"{message} ({dropped} similar messages dropped)"
+        logger.opt(depth=2).log(LEVEL_NAMES.get(level_no, level_no), message, *args)
+
+
+hot_log = RateLimitedLog(interval=settings.log_rate_limit)
+
+
+class ErrorStats:  # pylint: disable=too-few-public-methods
+    """Occurrences of an error since the last summary.
+
+    Attributes:
+        exception (str): Name of the exception class.
+        repeated (int): Number of occurrences not logged in full.
+        update_ids (list[int]): Ids of the first updates not logged in full.
+    """
+
+    __slots__ = ("exception", "repeated", "update_ids")
+
+    def __init__(self, exception: str) -> None:
+        self.exception = exception
+        self.repeated = 0
+        self.update_ids: list[int] = []
+
+
+class ErrorAggregator:
+    """Log the first occurrence of an error in full and then only counts.
+
+    Errors are told apart by a fingerprint of the exception class and
+    the module, function and line of the innermost `frames` frames of
+    the traceback, so it does not depend on where the bot is installed.
+    The first occurrence
+    of a fingerprint is meant to be logged with its traceback, later
+    ones are counted and summarized every `interval` seconds with a few
+    example update ids. A fingerprint without occurrences during a whole
+    interval is forgotten, so it is logged in full again if it comes back.
+
+    Attributes:
+        interval (float): Time in seconds between two summaries,
+            0 logs every occurrence in full.
+        frames (int): Number of traceback frames in the fingerprint,
+            0 for the exception class only.
+        max_examples (int): Number of example update ids per summary.
+    """
+
+    def __init__(self, interval: float, frames: int, max_examples: int = 5) -> None:
+        self.interval = interval
+        self.frames = frames
+        self.max_examples = max_examples
+        self._errors: dict[str, ErrorStats] = {}
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._errors)
+
+    def fingerprint(self, exception: BaseException) -> str:
+        """Return the fingerprint of an exception.
+
+        Args:
+            exception (BaseException): Raised exception.
+
+        Returns:
+            str: Eight hex digits, stable across processes and restarts.
+        """
+        frames: list[str] = []
+        traceback: Optional[TracebackType] = exception.__traceback__
+        while traceback is not None:
+            frame = traceback.tb_frame
+            module = frame.f_globals.get("__name__")
+            frames.append(f"{module}:{frame.f_code.co_name}:{traceback.tb_lineno}")
+            traceback = traceback.tb_next
+        error_type = type(exception)
+        # frames[-0:] would be every frame
+        innermost = frames[-self.frames :] if self.frames > 0 else []
+        key = "|".join(
+            [f"{error_type.__module__}.{error_type.__qualname__}", *innermost],
+        )
+        return f"{zlib.crc32(key.encode()):08x}"
+
+    def record(self, exception: BaseException, update_id: int) -> tuple[str, bool]:
+        """Count an occurrence of an error.
+
+        Args:
+            exception (BaseException): Raised exception.
+            update_id (int): Id of the update that failed.
+
+        Returns:
+            tuple[str, bool]: The fingerprint and whether it is the first
+                occurrence, which should be logged in full.
+        """
+        fingerprint = self.fingerprint(exception)
+        if not self.interval:
+            return fingerprint, True
+        stats = self._errors.get(fingerprint)
+        if stats is None:
+            self._errors[fingerprint] = ErrorStats(type(exception).__name__)
+            return fingerprint, True
+        stats.repeated += 1
+        if len(stats.update_ids) < self.max_examples:
+            stats.update_ids.append(update_id)
+        return fingerprint, False
+
+    def summarize(self) -> int:
+        """Log the errors repeated since the last summary and reset the counts.
+
+        Returns:
+            int: Number of summarized fingerprints.
+        """
+        summarized = 0
+        for fingerprint, stats in list(self._errors.items()):
+            if not stats.repeated:
+                del self._errors[fingerprint]
+                continue
+            logger.warning(
+                "Error {} ({}) repeated {} times, updates {}",
+                fingerprint,
+                stats.exception,
+                stats.repeated,
+                ", ".join(map(str, stats.update_ids)),
+            )
+            stats.repeated = 0
+            stats.update_ids = []
+            summarized += 1
+        return summarized
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.summarize()
+
+    async def start(self) -> None:
+        """Start the periodic summaries."""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic summaries and log the last one."""
+        await cancel_task(self._task)
+        self._task = None
+        self.summarize()
+
+
+error_log = ErrorAggregator(
+    interval=settings.error_summary_interval,
+    frames=settings.error_fingerprint_frames,
+)
+
+
 def setup_logging() -> None:  # pragma: no cover
     """Setup logging."""
     logger.debug("Configuring logging...")
 
-    intercept_handler = InterceptHandler()
+    level = settings.log_level.value
+    intercept_handler = InterceptHandler(level=level)
     logging.basicConfig(handlers=[intercept_handler], level=logging.INFO)
 
-    logging.getLogger("aiogram").setLevel(logging.DEBUG)
-    logging.getLogger("aiogram").handlers = []
-    logging.getLogger("asyncio").setLevel(logging.DEBUG)
-    logging.getLogger("asyncio").handlers = []
+    # Records below the configured level are dropped before they are created
+    for name in ("aiogram", "asyncio"):
+        logging.getLogger(name).setLevel(level)
+        logging.getLogger(name).handlers = []
 
     # set logs output, level and format
     logger.remove()
-    logger.add(
-        sys.stdout,
-        level=settings.log_level.value,
-    )
+    if settings.log_async:
+        sink = BackgroundSink(sys.stdout, max_size=settings.log_buffer_size)
+        logger.add(sink, level=level, colorize=sys.stdout.isatty())
+        atexit.register(logger.remove)
+    else:
+        logger.add(sys.stdout, level=level)
 
     logger.debug("Logging configured!")
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+
+"""This module collects metrics and serves them in Prometheus text format."""
+
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar, Union
+
+from aiohttp import web
+from loguru import logger
+
+from src.settings import settings
+
+Number = Union[int, float]
+Collector = Callable[[], dict[str, Number]]
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=False)
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_number(value: Number) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class of the metrics, one series per set of label values.
+
+    Attributes:
+        name (str): Metric name.
+        documentation (str): Help text of the metric.
+        labels (tuple[str, ...]): Label names, values are passed positionally.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], Number]]:
+        """Yield the name suffix, label values and value of every sample."""
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        """Yield the lines of the metric in Prometheus text format."""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for suffix, values, value in self.samples():
+            names = self.labels + ("le",) * (len(values) - len(self.labels))
+            labels = _format_labels(names, values)
+            yield f"{self.name}{suffix}{labels} {_format_number(value)}"
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], Number] = {}
+
+    def inc(self, *label_values: str, amount: Number = 1) -> None:
+        """Increase the value of a series.
+
+        Args:
+            *label_values (str): Values of the labels.
+            amount (Number): Value to add.
+        """
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> Number:
+        """Return the value of a series."""
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], Number]]:
+        """Yield the value of every series."""
+        for values, value in self._values.items():
+            yield "", values, value
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+
+    type = "gauge"
+
+    def dec(self, *label_values: str, amount: Number = 1) -> None:
+        """Decrease the value of a series."""
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: Number) -> None:
+        """Set the value of a series."""
+        self._values[label_values] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets.
+
+    Attributes:
+        buckets (tuple[float, ...]): Upper bounds of the buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        # Per series: a count per bucket plus one for +Inf, then the sum
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record a value.
+
+        Args:
+            value (float): Observed value, seconds for latencies.
+            *label_values (str): Values of the labels.
+        """
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        """Return the number of observed values of a series."""
+        series = self._series.get(label_values)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], Number]]:
+        """Yield the cumulative buckets, sum and count of every series."""
+        bounds = (*self.buckets, float("inf"))
+        for values, series in self._series.items():
+            cumulative: float = 0
+            for bound, count in zip(bounds, series, strict=False):
+                cumulative += count
+                yield "_bucket", (*values, _format_number(bound)), cumulative
+            yield "_sum", values, series[-1]
+            yield "_count", values, cumulative
+
+
+class MetricsRegistry:
+    """Registry of metrics and stats collectors.
+
+    Collectors are callables returning a dict of current values, like
+    UserCache.stats. Each value is exposed as a gauge named after the
+    collector and the key.
+
+    Attributes:
+        prefix (str): Prefix of the collector gauges.
+    """
+
+    def __init__(self, prefix: str = "bot") -> None:
+        self.prefix = prefix
+        self._metrics: list[Metric] = []
+        self._collectors: dict[str, Collector] = {}
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+    ) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+    ) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def _register(self, metric: T) -> T:
+        self._metrics.append(metric)  # type: ignore[arg-type]
+        return metric
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Expose the values returned by a collector, replacing one with the same name.
+
+        Args:
+            name (str): Collector name, like "user_cache".
+            collector (Collector): Callable returning current values.
+        """
+        self._collectors[name] = collector
+
+    def unregister_collector(self, name: str) -> None:
+        """Stop exposing the values of a collector."""
+        self._collectors.pop(name, None)
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text format."""
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, collector in self._collectors.items():
+            try:
+                values = collector()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to collect {} metrics", name)
+                continue
+            for key, value in values.items():
+                gauge_name = f"{self.prefix}_{name}_{key}"
+                lines.append(f"# TYPE {gauge_name} gauge")
+                lines.append(f"{gauge_name} {_format_number(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry()
+
+handler_latency = registry.histogram(
+    "bot_handler_duration_seconds",
+    "Time spent in handlers, middlewares included.",
+    labels=("event_type", "handler"),
+)
+handlers_in_flight = registry.gauge(
+    "bot_handlers_in_flight",
+    "Number of updates being handled.",
+    labels=("event_type", "handler"),
+)
+handler_errors = registry.counter(
+    "bot_handler_errors_total",
+    "Number of exceptions caught by the error handler.",
+    labels=("event_type", "exception"),
+)
+handler_error_fingerprints = registry.counter(
+    "bot_handler_error_fingerprints_total",
+    "Number of exceptions caught by the error handler by fingerprint.",
+    labels=("fingerprint", "exception"),
+)
+user_service_latency = registry.histogram(
+    "bot_user_service_duration_seconds",
+    "Time spent in UserService calls.",
+    labels=("method",),
+)
+
+
+def timed(
+    histogram: Histogram,
+    *label_values: str,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorate a coroutine function to observe its duration.
+
+    Args:
+        histogram (Histogram): Histogram receiving the durations.
+        *label_values (str): Values of the histogram labels.
+
+    Returns:
+        Callable: Decorator.
+    """
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            started_at = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started_at, *label_values)
+
+        return wrapper
+
+    return decorator
+
+
+async def handle_metrics(_: web.Request) -> web.Response:
+    """Serve the metrics."""
+    return web.Response(body=registry.render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+class MetricsServer:
+    """Small HTTP server exposing the metrics on /metrics.
+
+    Attributes:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        """Start serving the metrics."""
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Serving metrics on http://{}:{}/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        """Stop serving the metrics."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_server: Optional[MetricsServer] = None  # pylint: disable=invalid-name
+
+
+async def start_metrics_server() -> None:
+    """Start the metrics endpoint if a metrics port is configured."""
+    global _server  # pylint: disable=global-statement
+    if not settings.metrics_port or _server is not None:
+        return
+
+    server = MetricsServer(settings.metrics_host, settings.metrics_port)
+    try:
+        await server.start()
+    except OSError:
+        logger.exception("Failed to start metrics server")
+        return
+    _server = server
+
+
+async def stop_metrics_server() -> None:
+    """Stop the metrics endpoint."""
+    global _server  # pylint: disable=global-statement
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -2,16 +2,61 @@
 
 """This module register middlewares."""
 
-from aiogram import Dispatcher
+from aiogram import BaseMiddleware, Dispatcher
 from loguru import logger
 
+from src.middlewares.ban_middleware import BanMiddleware
+from src.middlewares.dedup_middleware import DedupMiddleware
+from src.middlewares.metrics_middleware import MetricsMiddleware
+from src.middlewares.query_profiler_middleware import QueryProfilerMiddleware
 from src.middlewares.user_middleware import UserMiddleware
+from src.services.ban_list import ban_list
+from src.services.update_dedup import update_dedup
+from src.settings import settings
+
+
+def register_before_fsm(dp: Dispatcher, middleware: BaseMiddleware) -> None:
+    """Register an update middleware ahead of the FSM context middleware.
+
+    The dispatcher registers its FSM context middleware when it is
+    created. That middleware takes the events isolation lock and reads
+    the state from the FSM storage, so middlewares dropping updates must
+    run before it.
+
+    Args:
+        dp (Dispatcher): Dispatcher to register the middleware in.
+        middleware (BaseMiddleware): Outer update middleware.
+    """
+    manager = dp.update.outer_middleware
+    if dp.fsm not in manager:
+        manager.register(middleware)
+        return
+    manager.unregister(dp.fsm)
+    manager.register(middleware)
+    manager.register(dp.fsm)
 
 
 def setup_middlewares(dp: Dispatcher) -> None:
     """Setup middlewares."""
     logger.debug("Setup middlewares...")
 
+    # Registered before the FSM context to drop duplicates and the updates
+    # of banned users before any query
+    if settings.dedup_window > 0:
+        register_before_fsm(dp, DedupMiddleware(update_dedup))
+    if settings.ban_gate:
+        register_before_fsm(dp, BanMiddleware(ban_list))
+
+    if settings.db_profile:
+        dp.update.outer_middleware.register(
+            QueryProfilerMiddleware(budget=settings.db_query_budget),
+        )
+
+    # Registered first to measure the other middlewares too
+    for event_type, observer in dp.observers.items():
+        if event_type not in {"update", "error"}:
+            observer.middleware.register(MetricsMiddleware(event_type))
+
     dp.message.middleware.register(UserMiddleware())
     dp.callback_query.middleware.register(UserMiddleware())
 
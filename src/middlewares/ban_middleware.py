@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains ban middleware."""
+
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.dispatcher.middlewares.user_context import EVENT_FROM_USER_KEY
+from aiogram.types import TelegramObject
+from aiogram.types import User as TelegramUser
+
+from src.logs import hot_log
+from src.services.ban_list import BanList, banned_updates
+
+
+class BanMiddleware(BaseMiddleware):  # pylint: disable=too-few-public-methods
+    """Ban middleware.
+
+    Drops the updates of banned users before the FSM context middleware
+    reads their state and UserMiddleware loads them, checking an
+    in-memory set of ids, so they cost no query.
+
+    Attributes:
+        ban_list (BanList): Ids of the banned users.
+    """
+
+    def __init__(self, ban_list: BanList) -> None:
+        self.ban_list = ban_list
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Handle the update unless it comes from a banned user.
+
+        Args:
+            handler (Callable): The handler function to call.
+            event (TelegramObject): The Telegram update.
+            data (dict[str, Any]): Additional data related to the event,
+                with the user resolved by the dispatcher.
+
+        Returns:
+            Any: The result of calling the handler function,
+                UNHANDLED for a banned user.
+        """
+        tg_user: Optional[TelegramUser] = data.get(EVENT_FROM_USER_KEY)
+        if tg_user is not None and tg_user.id in self.ban_list:
+            banned_updates.inc()
+            hot_log.debug("Dropped update of banned user {}", tg_user.id)
+            return UNHANDLED
+        return await handler(event, data)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains duplicate update middleware."""
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+
+from src.logs import hot_log
+from src.services.update_dedup import UpdateDeduplicator, duplicate_updates
+
+
+class DedupMiddleware(BaseMiddleware):  # pylint: disable=too-few-public-methods
+    """Duplicate update middleware.
+
+    Drops the updates that were already received, before the FSM
+    context middleware reads the state or a handler calls the API.
+
+    Attributes:
+        dedup (UpdateDeduplicator): Seen and handled update ids.
+    """
+
+    def __init__(self, dedup: UpdateDeduplicator) -> None:
+        self.dedup = dedup
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Handle the update unless it is a duplicate.
+
+        Args:
+            handler (Callable): The handler function to call.
+            event (TelegramObject): The Telegram update.
+            data (dict[str, Any]): Additional data related to the event.
+
+        Returns:
+            Any: The result of calling the handler function,
+                UNHANDLED for a duplicate.
+        """
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        if self.dedup.seen(event.update_id):
+            duplicate_updates.inc()
+            hot_log.debug("Dropped duplicate update {}", event.update_id)
+            return UNHANDLED
+        try:
+            return await handler(event, data)
+        finally:
+            self.dedup.done(event.update_id)
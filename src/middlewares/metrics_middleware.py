@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains metrics middleware."""
+
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from src.metrics import handler_latency, handlers_in_flight
+
+
+def handler_name(handler: HandlerObject) -> str:
+    """Return the name a handler is reported under."""
+    callback = handler.callback
+    return getattr(callback, "__qualname__", None) or type(callback).__name__
+
+
+class MetricsMiddleware(BaseMiddleware):  # pylint: disable=too-few-public-methods
+    """Metrics middleware.
+
+    Records the number of updates being handled and the time spent
+    in the handler per event type and handler.
+
+    Attributes:
+        event_type (str): Update type of the observer the middleware
+            is registered on.
+    """
+
+    def __init__(self, event_type: str) -> None:
+        self.event_type = event_type
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Measure the handler call.
+
+        Args:
+            handler (Callable): The handler function to call.
+            event (TelegramObject): The Telegram event object.
+            data (dict[str, Any]): Additional data related to the event.
+
+        Returns:
+            Any: The result of calling the handler function.
+        """
+        labels = (self.event_type, handler_name(data["handler"]))
+        handlers_in_flight.inc(*labels)
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_latency.observe(time.perf_counter() - started_at, *labels)
+            handlers_in_flight.dec(*labels)
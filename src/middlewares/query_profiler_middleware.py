@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains query profiler middleware."""
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from loguru import logger
+
+from src.db.profiler import (
+    UpdateQueries,
+    current_update,
+    queries_per_update,
+    query_budget_exceeded,
+)
+from src.logs import hot_log
+
+
+class QueryProfilerMiddleware(BaseMiddleware):  # pylint: disable=too-few-public-methods
+    """Query profiler middleware.
+
+    Counts the database queries made while handling an update and
+    warns about updates making more queries than the budget.
+
+    Attributes:
+        budget (int): Maximum number of queries per update, 0 disables the check.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Attribute the queries of the handler call to the update.
+
+        Args:
+            handler (Callable): The handler function to call.
+            event (TelegramObject): The Telegram update.
+            data (dict[str, Any]): Additional data related to the event.
+
+        Returns:
+            Any: The result of calling the handler function.
+        """
+        update = UpdateQueries(event.update_id if isinstance(event, Update) else 0)
+        token = current_update.set(update)
+        try:
+            return await handler(event, data)
+        finally:
+            current_update.reset(token)
+            update.closed = True
+            queries_per_update.observe(update.count)
+            if self.budget and update.count > self.budget:
+                query_budget_exceeded.inc()
+                logger.warning(
+                    "Update {} made {} queries in {:.1f} ms, over the budget of {}",
+                    update.update_id,
+                    update.count,
+                    update.duration * 1000,
+                    self.budget,
+                )
+            else:
+                hot_log.debug(
+                    "Update {} made {} queries in {:.1f} ms",
+                    update.update_id,
+                    update.count,
+                    update.duration * 1000,
+                )
@@ -46,7 +46,7 @@ class UserMiddleware(BaseMiddleware):  # pylint: disable=too-few-public-methods
         tg_user: Optional[TelegramUser] = getattr(event, "from_user", None)
         if tg_user:
             db_user, _ = await UserService.get_or_create(
-                **tg_user.dict(),
+                **tg_user.model_dump(),
             )
             data["user"] = db_user
 
@@ -0,0 +1 @@
+"""Runners module."""
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""This module receives updates with long polling."""
+
+import asyncio
+import signal
+import time
+from contextlib import suppress
+from typing import AsyncGenerator, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from loguru import logger
+
+from src.metrics import registry
+from src.runners.scheduler import UpdateSink, create_scheduler
+from src.settings import settings
+
+DEFAULT_BACKOFF_CONFIG = BackoffConfig(
+    min_delay=1.0,
+    max_delay=5.0,
+    factor=1.3,
+    jitter=0.1,
+)
+
+poll_latency = registry.histogram(
+    "bot_polling_request_duration_seconds",
+    "Time spent in successful getUpdates requests, long polling included.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+poll_batch_size = registry.histogram(
+    "bot_polling_batch_size",
+    "Number of updates received by a getUpdates request.",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+
+
+async def listen_updates(
+    bot: Bot,
+    allowed_updates: Optional[list[str]] = None,
+    polling_timeout: int = 10,
+    limit: Optional[int] = None,
+    backoff_config: BackoffConfig = DEFAULT_BACKOFF_CONFIG,
+) -> AsyncGenerator[Update, None]:
+    """Yield updates received with long polling.
+
+    Network and server errors are logged and retried with a backoff,
+    the offset is advanced past every yielded update. The duration and
+    the number of updates of every request are observed.
+
+    Args:
+        bot (Bot): Bot instance to poll updates for.
+        allowed_updates (Optional[list[str]]): Update types to receive.
+        polling_timeout (int): Long polling timeout in seconds.
+        limit (Optional[int]): Maximum number of updates per request,
+            from 1 to 100, None for the Telegram default of 100.
+        backoff_config (BackoffConfig): Retry delays after a failed request.
+
+    Yields:
+        Update: Received updates in order.
+    """
+    backoff = Backoff(config=backoff_config)
+    get_updates = GetUpdates(
+        timeout=polling_timeout,
+        limit=limit,
+        allowed_updates=allowed_updates,
+    )
+    request_timeout = int(bot.session.timeout + polling_timeout)
+    while True:
+        started_at = time.perf_counter()
+        try:
+            updates = await bot(get_updates, request_timeout=request_timeout)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error("Failed to fetch updates - {}: {}", type(e).__name__, e)
+            await backoff.asleep()
+            continue
+
+        poll_latency.observe(time.perf_counter() - started_at)
+        poll_batch_size.observe(len(updates))
+        backoff.reset()
+        for update in updates:
+            yield update
+            get_updates.offset = update.update_id + 1
+
+
+async def poll(dp: Dispatcher, bot: Bot, sink: UpdateSink) -> None:
+    """Receive updates with long polling and put them into a sink.
+
+    Only the update types with registered handlers are requested, at
+    most `polling_limit` at a time. Putting an update waits while the
+    sink is full, so no new updates are requested until it has room
+    again. SIGTERM and SIGINT stop polling, then the sink is stopped and
+    the bot session closed.
+
+    Args:
+        dp (Dispatcher): Dispatcher used to resolve the allowed updates.
+        bot (Bot): Bot instance to poll updates for.
+        sink (UpdateSink): Destination of the received updates.
+    """
+    task = asyncio.current_task()
+    if task is not None:
+        with suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+
+    await sink.start()
+    try:
+        user = await bot.me()
+        allowed_updates = dp.resolve_used_update_types()
+        logger.info(
+            "Run polling for bot @{} id={}, update types: {}",
+            user.username,
+            user.id,
+            ", ".join(allowed_updates),
+        )
+        async for update in listen_updates(
+            bot,
+            allowed_updates=allowed_updates,
+            polling_timeout=settings.polling_timeout,
+            limit=settings.polling_limit,
+        ):
+            await sink.put(update)
+    finally:
+        try:
+            await sink.stop()
+        finally:
+            await bot.session.close()
+
+
+def serve_polling(dp: Dispatcher, bot: Bot, sink: UpdateSink) -> None:
+    """Poll updates until the process is stopped."""
+    try:
+        asyncio.run(poll(dp, bot, sink))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        logger.info("Stopped")
+
+
+def run_polling(dp: Dispatcher, bot: Bot) -> None:
+    """Start polling."""
+    serve_polling(
+        dp,
+        bot,
+        create_scheduler(dp, bot),
+    )
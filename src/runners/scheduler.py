@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+"""This module schedules updates per chat in front of the dispatcher."""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from typing import Any, Optional, Protocol, Union
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from loguru import logger
+from pydantic import ValidationError
+
+from src.metrics import Number, registry
+from src.settings import settings
+from src.startup import startup_profile
+
+RawUpdate = dict[str, Any]
+
+
+def resolve_chat_id(update: Union[Update, RawUpdate]) -> int:
+    """Return the id of the chat an update belongs to.
+
+    Updates without a chat, like inline queries, are attributed
+    to the private chat of their user and anything else to chat 0.
+
+    Args:
+        update (Union[Update, RawUpdate]): Parsed or raw update.
+
+    Returns:
+        int: Chat id used for ordering and sharding.
+    """
+    if isinstance(update, Update):
+        context = UserContextMiddleware.resolve_event_context(update)
+        if context.chat is not None:
+            return context.chat.id
+        return context.user.id if context.user is not None else 0
+
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return int(chat["id"])
+        user = event.get("from") or event.get("user")
+        if user:
+            return int(user["id"])
+    return 0
+
+
+class UpdateSink(Protocol):
+    """Destination of the updates received by the bot."""
+
+    def submit(self, update: RawUpdate) -> bool:
+        """Accept a raw update without waiting, False if it is refused."""
+
+    async def put(self, update: Update) -> None:
+        """Accept an update, waiting while the sink is full."""
+
+    async def start(self) -> None:
+        """Prepare to accept updates."""
+
+    async def stop(self) -> None:
+        """Finish the accepted updates and stop."""
+
+
+class UpdateScheduler:  # pylint: disable=too-many-instance-attributes
+    """Feed updates to the dispatcher in chat order with bounded concurrency.
+
+    Every chat has its own FIFO queue and at most one of its updates is
+    handled at a time, while `max_in_flight` updates of different chats
+    are handled concurrently. Chats take turns, so a slow chat never
+    blocks the others. Once `high_water` updates are pending, `submit`
+    refuses new updates and `put` waits, which slows the poller down or
+    makes Telegram redeliver webhook updates later.
+
+    Starting the scheduler runs the dispatcher startup handlers and stopping
+    it runs the shutdown handlers once the pending updates are handled.
+
+    Attributes:
+        dispatcher (Dispatcher): Dispatcher that handles the updates.
+        bot (Bot): Bot instance the updates belong to.
+        max_in_flight (int): Maximum number of updates handled at once.
+        high_water (int): Number of pending updates that applies backpressure.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        max_in_flight: int,
+        high_water: int,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.max_in_flight = max_in_flight
+        self.high_water = high_water
+        self._chats: dict[int, deque[tuple[float, Union[Update, RawUpdate]]]] = {}
+        self._ready: Optional[asyncio.Queue[int]] = None
+        self._writable: Optional[asyncio.Event] = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._pending = 0
+        self._in_flight = 0
+        self._processed = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    @property
+    def workflow_data(self) -> dict[str, Any]:
+        """Contextual data passed to the dispatcher lifecycle handlers."""
+        return {
+            **self.dispatcher.workflow_data,
+            "dispatcher": self.dispatcher,
+            "bot": self.bot,
+        }
+
+    def stats(self) -> dict[str, Number]:
+        """Return queue depth and wait time statistics.
+
+        Returns:
+            dict[str, Number]: Pending and in-flight updates,
+                chats with pending updates, the deepest chat queue,
+                handled updates and queue wait times in seconds.
+        """
+        return {
+            "pending": self._pending,
+            "in_flight": self._in_flight,
+            "chats": len(self._chats),
+            "max_chat_depth": max(map(len, self._chats.values()), default=0),
+            "processed": self._processed,
+            "wait_time_avg": (
+                self._wait_time_total / self._processed if self._processed else 0.0
+            ),
+            "wait_time_max": self._wait_time_max,
+        }
+
+    def submit(self, update: Union[Update, RawUpdate]) -> bool:
+        """Schedule an update without waiting.
+
+        Args:
+            update (Union[Update, RawUpdate]): Parsed or raw update.
+
+        Returns:
+            bool: False if the high-water mark is reached or the scheduler
+                is not started.
+        """
+        if self._ready is None or self._pending >= self.high_water:
+            return False
+
+        chat_id = resolve_chat_id(update)
+        chat_queue = self._chats.get(chat_id)
+        if chat_queue is None:
+            chat_queue = self._chats[chat_id] = deque()
+            self._ready.put_nowait(chat_id)
+        chat_queue.append((time.monotonic(), update))
+
+        self._pending += 1
+        if self._writable is not None and self._pending >= self.high_water:
+            self._writable.clear()
+        return True
+
+    async def put(self, update: Union[Update, RawUpdate]) -> None:
+        """Schedule an update, waiting while the high-water mark is reached.
+
+        Args:
+            update (Union[Update, RawUpdate]): Parsed or raw update.
+
+        Raises:
+            RuntimeError: If the scheduler is not started.
+        """
+        while True:
+            if self._ready is None or self._writable is None:
+                raise RuntimeError("Update scheduler is not started")
+            if self.submit(update):
+                return
+            await self._writable.wait()
+
+    async def _process(self, update: Union[Update, RawUpdate]) -> None:
+        if isinstance(update, Update):
+            parsed = update
+        else:
+            try:
+                parsed = Update.model_validate(update, context={"bot": self.bot})
+            except ValidationError:
+                logger.exception("Dropped invalid update {}", update.get("update_id"))
+                return
+        try:
+            result = await self.dispatcher.feed_update(self.bot, parsed)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to process update {}", parsed.update_id)
+            return
+        if isinstance(result, TelegramMethod):
+            await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+
+    async def _work(self, ready: asyncio.Queue[int]) -> None:
+        while True:
+            chat_id = await ready.get()
+            chat_queue = self._chats[chat_id]
+            enqueued_at, update = chat_queue.popleft()
+            wait_time = time.monotonic() - enqueued_at
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+            self._in_flight += 1
+            if not startup_profile.done:
+                startup_profile.mark("waiting for updates")
+            try:
+                await self._process(update)
+                if not startup_profile.done:
+                    startup_profile.finish()
+            finally:
+                self._in_flight -= 1
+                self._processed += 1
+                self._pending -= 1
+                if self._writable is not None and self._pending < self.high_water:
+                    self._writable.set()
+                if chat_queue:
+                    ready.put_nowait(chat_id)
+                else:
+                    del self._chats[chat_id]
+                # Every chat with pending updates holds one unfinished item,
+                # so ready.join() returns once all updates are handled.
+                ready.task_done()
+
+    async def start(self) -> None:
+        """Run the startup handlers and start the workers."""
+        startup_profile.mark("runner")
+        await self.dispatcher.emit_startup(**self.workflow_data)
+        startup_profile.mark("startup handlers")
+        ready: asyncio.Queue[int] = asyncio.Queue()
+        self._ready = ready
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._workers = [
+            asyncio.create_task(self._work(ready)) for _ in range(self.max_in_flight)
+        ]
+        registry.register_collector("scheduler", self.stats)
+        logger.debug("Update scheduler started with {} workers", self.max_in_flight)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Handle the pending updates, stop the workers and run the shutdown handlers.
+
+        Args:
+            timeout (float): Time in seconds to wait for pending updates.
+        """
+        ready, self._ready = self._ready, None
+        if ready is not None:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(ready.join(), timeout=timeout)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._writable = None
+        registry.unregister_collector("scheduler")
+        logger.debug("Update scheduler stopped, {}", self.stats())
+        await self.dispatcher.emit_shutdown(**self.workflow_data)
+
+
+def create_scheduler(dp: Dispatcher, bot: Bot) -> UpdateScheduler:
+    """Create the update scheduler configured in settings."""
+    return UpdateScheduler(
+        dispatcher=dp,
+        bot=bot,
+        max_in_flight=settings.update_workers,
+        high_water=settings.max_pending_updates,
+    )
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""This module runs the bot with a webhook server."""
+
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from loguru import logger
+from yarl import URL
+
+from src.runners.scheduler import UpdateSink, create_scheduler
+from src.settings import settings
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Webhook request handler acknowledging updates before processing.
+
+    Every verified update is submitted to an UpdateSink and Telegram gets
+    an empty 200 response right away. When the sink refuses the update
+    the response is 503, so Telegram delivers it again later.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        queue: UpdateSink,
+        secret_token: Optional[str] = None,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+        )
+        self.queue = queue
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Verify, queue and acknowledge an update."""
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""),
+            bot,
+        ):
+            return web.Response(body="Unauthorized", status=401)
+
+        update = await request.json(loads=bot.session.json_loads)
+        if not self.queue.submit(update):
+            logger.warning("Update queue is full, refusing update")
+            return web.Response(body="Too many pending updates", status=503)
+        return web.Response()
+
+    __call__ = handle
+
+
+def create_webhook_app(
+    dp: Dispatcher,
+    bot: Bot,
+    sink: UpdateSink,
+) -> web.Application:
+    """Create the webhook application.
+
+    The application starts the sink and registers the webhook with
+    Telegram on startup, and stops the sink before the bot session
+    is closed on shutdown.
+
+    Args:
+        dp (Dispatcher): Dispatcher used to resolve the allowed updates.
+        bot (Bot): Bot instance the webhook belongs to.
+        sink (UpdateSink): Destination of the received updates.
+
+    Returns:
+        web.Application: Configured aiohttp application.
+    """
+    webhook_url = URL(settings.webhook_url or "")
+
+    async def on_startup(_: object) -> None:
+        await sink.start()
+        logger.info("Set webhook {}", webhook_url.with_query(None))
+        await bot.set_webhook(
+            url=str(webhook_url),
+            secret_token=settings.webhook_secret,
+            max_connections=settings.webhook_max_connections,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+
+    async def on_shutdown(_: object) -> None:
+        try:
+            await sink.stop()
+        finally:
+            await bot.session.close()
+
+    app = web.Application()
+    # Registered before the request handler, which closes the bot session
+    # on shutdown, so the queued updates can still be answered.
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    QueuedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        queue=sink,
+        secret_token=settings.webhook_secret,
+    ).register(app, path=webhook_url.path or "/")
+    return app
+
+
+def serve_webhook(dp: Dispatcher, bot: Bot, sink: UpdateSink) -> None:
+    """Serve the webhook until the process is stopped."""
+    try:
+        web.run_app(
+            create_webhook_app(dp, bot, sink),
+            host=settings.webhook_host,
+            port=settings.webhook_port,
+            print=None,
+        )
+    finally:
+        logger.info("Stopped")
+
+
+def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    """Start webhook server."""
+    serve_webhook(
+        dp,
+        bot,
+        create_scheduler(dp, bot),
+    )
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""This module runs the bot in several worker processes."""
+
+import asyncio
+import json
+import multiprocessing
+import queue
+import signal
+from multiprocessing.context import SpawnProcess
+from typing import Any, TypeAlias
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from loguru import logger
+
+from src.metrics import start_metrics_server, stop_metrics_server
+from src.runners.polling import serve_polling
+from src.runners.scheduler import create_scheduler, resolve_chat_id
+from src.runners.webhook import serve_webhook
+from src.settings import settings
+from src.startup import startup_profile
+
+ShardQueue: TypeAlias = "multiprocessing.Queue[str | None]"
+
+
+def shard_for(update: dict[str, Any], shards: int) -> int:
+    """Return the index of the worker an update is routed to.
+
+    Args:
+        update (dict[str, Any]): Raw update received from Telegram.
+        shards (int): Number of workers.
+
+    Returns:
+        int: Worker index, the same for all updates of a chat.
+    """
+    return resolve_chat_id(update) % shards
+
+
+async def _consume(updates: ShardQueue) -> None:
+    # pylint: disable=import-outside-toplevel
+    from src.app import create_bot, create_dispatcher
+
+    dp = create_dispatcher()
+    startup_profile.mark("dispatcher")
+    bot = create_bot(settings.token)
+    startup_profile.mark("bot")
+    scheduler = create_scheduler(dp, bot)
+    loop = asyncio.get_running_loop()
+    await scheduler.start()
+    try:
+        while (payload := await loop.run_in_executor(None, updates.get)) is not None:
+            await scheduler.put(json.loads(payload))
+    finally:
+        try:
+            await scheduler.stop()
+        finally:
+            await bot.session.close()
+
+
+def run_worker(index: int, updates: ShardQueue) -> None:
+    """Process the updates of one shard until a None sentinel is received.
+
+    Args:
+        index (int): Worker index, used in logs.
+        updates (multiprocessing.Queue): Serialized updates of the shard.
+    """
+    # pylint: disable=import-outside-toplevel
+    from src.logs import setup_logging
+
+    # The supervisor handles signals and stops the workers with a sentinel.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    setup_logging()
+    startup_profile.mark("logging")
+    if settings.metrics_port:
+        # The supervisor serves its own metrics on the configured port
+        settings.metrics_port += index + 1
+    # Every worker sends through its own global bucket: share the rate
+    settings.api_rate_limit /= settings.worker_processes
+    settings.broadcast_resume = settings.broadcast_resume and index == 0
+    logger.info("Worker {} started", index)
+    asyncio.run(_consume(updates))
+    logger.info("Worker {} stopped", index)
+
+
+class ShardRouter:
+    """Route updates to worker processes by chat id.
+
+    Each worker runs its own Dispatcher and database pool. All updates
+    of a chat are routed to the same worker, so per-chat ordering and
+    FSMStrategy.CHAT keep working as in a single process.
+
+    In-memory state is not shared between the workers. FSM records are
+    keyed by chat, so the in-memory layer of TortoiseStorage only ever
+    sees its own chats. A user writing in chats of two workers is cached
+    by both: a change made by one worker reaches the cache of the other
+    after user_cache_ttl seconds, and its ban list after
+    ban_refresh_interval seconds.
+
+    The router serves the metrics of the receiving process, such as
+    the polling stats, on `metrics_port`, the workers on the following
+    ports.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        max_pending (int): Maximum number of updates queued per worker.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: list[ShardQueue] = []
+        self._processes: list[SpawnProcess] = []
+
+    def _route(self, update: dict[str, Any]) -> tuple[ShardQueue, str]:
+        return self._queues[shard_for(update, self.workers)], json.dumps(update)
+
+    def submit(self, update: dict[str, Any]) -> bool:
+        """Route an update without waiting.
+
+        Args:
+            update (dict[str, Any]): Raw update received from Telegram.
+
+        Returns:
+            bool: False if the queue of the worker is full.
+        """
+        shard_queue, payload = self._route(update)
+        try:
+            shard_queue.put_nowait(payload)
+        except queue.Full:
+            return False
+        return True
+
+    async def put(self, update: Update) -> None:
+        """Route an update, waiting while the queue of the worker is full.
+
+        Args:
+            update (Update): Update received from Telegram.
+        """
+        shard_queue, payload = self._route(
+            update.model_dump(mode="json", exclude_unset=True, by_alias=True),
+        )
+        await asyncio.get_running_loop().run_in_executor(None, shard_queue.put, payload)
+
+    async def start(self) -> None:
+        """Start the metrics endpoint and the worker processes."""
+        await start_metrics_server()
+        self._queues = [
+            self._context.Queue(maxsize=self.max_pending) for _ in range(self.workers)
+        ]
+        self._processes = [
+            self._context.Process(
+                target=run_worker,
+                args=(index, shard_queue),
+                name=f"worker-{index}",
+            )
+            for index, shard_queue in enumerate(self._queues)
+        ]
+        for process in self._processes:
+            process.start()
+        logger.info("Started {} worker processes", self.workers)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Let the workers finish their queued updates and stop them.
+
+        The metrics endpoint is stopped after the workers.
+
+        Args:
+            timeout (float): Time in seconds to wait for every worker.
+        """
+        loop = asyncio.get_running_loop()
+        for shard_queue in self._queues:
+            await loop.run_in_executor(None, shard_queue.put, None)
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning("Worker {} did not stop, terminating", process.name)
+                process.terminate()
+        self._processes = []
+        self._queues = []
+        logger.info("Worker processes stopped")
+        await stop_metrics_server()
+
+
+def run_workers(dp: Dispatcher, bot: Bot) -> None:
+    """Receive updates in this process and handle them in worker processes.
+
+    Updates come from the webhook when it is configured and from long
+    polling otherwise. The dispatcher of this process only resolves
+    the allowed update types, every worker builds its own.
+    """
+    router = ShardRouter(
+        workers=settings.worker_processes,
+        max_pending=settings.max_pending_updates,
+    )
+    if settings.webhook_url:
+        serve_webhook(dp, bot, router)
+    else:
+        serve_polling(dp, bot, router)
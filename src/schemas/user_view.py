@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the lightweight user view used while handling updates."""
+
+from datetime import datetime
+from typing import Any, Optional
+
+from aiogram.utils import markdown
+from aiogram.utils.link import create_tg_link
+
+from src.db.models.user_model import UserModel
+
+__all__ = [
+    "USER_FIELDS",
+    "TRACKED_FIELDS",
+    "UserView",
+]
+
+USER_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "username",
+    "is_blocked",
+    "is_banned",
+    "created_at",
+    "updated_at",
+)
+# Fields handlers may change, written back by UserService.update
+TRACKED_FIELDS = ("first_name", "last_name", "username", "is_blocked", "is_banned")
+
+
+class UserView:  # pylint: disable=too-many-instance-attributes
+    """User passed to the handlers, built from trusted values without validation.
+
+    It is a plain slotted object rather than a pydantic model: creating
+    one costs a few attribute stores, so a view is built for every update. The
+    values come from the database or from the user cache, which were
+    validated when the user was created. The tracked fields are compared
+    with a snapshot taken when the view was built or last saved, so
+    assigning them costs nothing extra.
+
+    Attributes:
+        id (int): Telegram id of the user.
+        first_name (Optional[str]): First name of the user.
+        last_name (Optional[str]): Last name of the user.
+        username (Optional[str]): Username of the user.
+        is_blocked (bool): Whether the user blocked the bot.
+        is_banned (bool): Whether the user is banned.
+        created_at (Optional[datetime]): Creation time of the user.
+        updated_at (Optional[datetime]): Last update time of the user.
+    """
+
+    __slots__ = (*USER_FIELDS, "_snapshot")
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        id: int,  # pylint: disable=redefined-builtin
+        *,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        username: Optional[str] = None,
+        is_blocked: bool = False,
+        is_banned: bool = False,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+    ) -> None:
+        self.id = id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.username = username
+        self.is_blocked = is_blocked
+        self.is_banned = is_banned
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self._snapshot = (first_name, last_name, username, is_blocked, is_banned)
+
+    @classmethod
+    def from_model(cls, user: UserModel) -> "UserView":
+        """Build a view of a database row."""
+        return cls(
+            user.id,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            username=user.username,
+            is_blocked=user.is_blocked,
+            is_banned=user.is_banned,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the field values, e.g. to cache them."""
+        return {field: getattr(self, field) for field in USER_FIELDS}
+
+    @property
+    def changed_fields(self) -> frozenset[str]:
+        """Names of the tracked fields changed since the view was built or saved."""
+        current = (
+            self.first_name,
+            self.last_name,
+            self.username,
+            self.is_blocked,
+            self.is_banned,
+        )
+        if current == self._snapshot:
+            return frozenset()
+        return frozenset(
+            field
+            for field, old, new in zip(
+                TRACKED_FIELDS,
+                self._snapshot,
+                current,
+                strict=True,
+            )
+            if old != new
+        )
+
+    def mark_clean(self) -> None:
+        """Forget the changed fields, e.g. after they have been saved."""
+        self._snapshot = (
+            self.first_name,
+            self.last_name,
+            self.username,
+            self.is_blocked,
+            self.is_banned,
+        )
+
+    @property
+    def full_name(self) -> str:
+        """A property that returns the full name of the user."""
+        return f"{self.first_name} {self.last_name}".strip()
+
+    @property
+    def url(self) -> str:
+        """A property that returns the URL of the user."""
+        return create_tg_link("user", id=self.id)
+
+    def mention_html(self) -> str:
+        """Return the HTML formatted mention of the user."""
+        name = f"@{self.username}" if self.username is not None else self.full_name
+        return markdown.hlink(name, self.url)
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(id={self.id!r}, username={self.username!r}, "
+            f"first_name={self.first_name!r}, last_name={self.last_name!r})"
+        )
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""This module keeps the ids of the banned users in memory."""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional, cast
+
+from loguru import logger
+from tortoise import timezone
+
+from src.db.models.user_model import UserModel
+from src.db.queries import postgres_client, quote
+from src.metrics import Number, registry
+from src.settings import settings
+from src.tasks import cancel_task
+
+# Rows fetched at once by the PostgreSQL cursor
+CURSOR_PREFETCH = 10_000
+
+banned_updates = registry.counter(
+    "bot_banned_updates_total",
+    "Number of updates from banned users dropped before handling.",
+)
+
+
+class BanList:
+    """Set of the banned user ids, synchronized with the users table.
+
+    The ids are loaded on startup by one query, read through a server
+    side cursor on PostgreSQL so the rows never pile up in memory. Bans
+    made by UserService.update are applied at once. Every `interval`
+    seconds the users changed since the previous refresh are read to
+    pick up the bans made by other processes, each refresh overlapping
+    the previous one by `interval` to allow for late commits.
+
+    Attributes:
+        interval (float): Time in seconds between two refreshes,
+            0 disables them.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._ids: set[int] = set()
+        self._since: Optional[datetime] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._ids
+
+    def set(self, user_id: int, is_banned: bool) -> None:
+        """Ban or unban a user.
+
+        Args:
+            user_id (int): Telegram id of the user.
+            is_banned (bool): Whether the user is banned.
+        """
+        if is_banned:
+            self._ids.add(user_id)
+        else:
+            self._ids.discard(user_id)
+
+    async def load(self) -> int:
+        """Replace the ids with the banned users of the database.
+
+        Returns:
+            int: Number of banned users.
+        """
+        started_at = timezone.now()
+        ids: set[int] = set()
+        client = postgres_client()
+        if client is None:
+            banned = await UserModel.filter(is_banned=True).values_list("id", flat=True)
+            ids.update(cast(list[int], banned))
+        else:
+            query = "SELECT {id} FROM {table} WHERE {is_banned}".format(
+                id=quote("id"),
+                table=quote(UserModel._meta.db_table),  # pylint: disable=protected-access
+                is_banned=quote("is_banned"),
+            )
+            async with client.acquire_connection() as connection:
+                async with connection.transaction():
+                    async for record in connection.cursor(
+                        query,
+                        prefetch=CURSOR_PREFETCH,
+                    ):
+                        ids.add(record[0])
+        self._ids = ids
+        self._since = started_at - timedelta(seconds=self.interval)
+        logger.debug("Loaded {} banned users", len(ids))
+        return len(ids)
+
+    async def refresh(self) -> int:
+        """Apply the bans changed since the previous refresh.
+
+        Returns:
+            int: Number of read users.
+        """
+        if self._since is None:
+            return await self.load()
+        started_at = timezone.now()
+        changes = await UserModel.filter(updated_at__gt=self._since).values_list(
+            "id",
+            "is_banned",
+        )
+        for user_id, is_banned in changes:
+            self.set(user_id, is_banned)
+        self._since = started_at - timedelta(seconds=self.interval)
+        return len(changes)
+
+    def stats(self) -> dict[str, Number]:
+        """Return the number of banned users."""
+        return {"size": len(self._ids)}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to refresh the banned users")
+
+    async def start(self) -> None:
+        """Load the ids, expose their number and start the periodic refresh."""
+        await self.load()
+        registry.register_collector("banned_users", self.stats)
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic refresh and stop exposing the number of ids."""
+        registry.unregister_collector("banned_users")
+        await cancel_task(self._task)
+        self._task = None
+
+
+ban_list = BanList(interval=settings.ban_refresh_interval)
+
+
+async def start_ban_list() -> None:
+    """Load the banned users, if the ban gate is enabled."""
+    if settings.ban_gate:
+        await ban_list.start()
+
+
+async def stop_ban_list() -> None:
+    """Stop refreshing the banned users."""
+    await ban_list.stop()
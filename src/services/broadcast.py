@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""This module sends messages to every user in the background."""
+
+import asyncio
+import logging
+from contextlib import suppress
+from typing import cast
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+from loguru import logger
+from tortoise import timezone
+
+from src.client.rate_limit import SendPriority, send_priority
+from src.db.models.broadcast_model import BroadcastModel, BroadcastStatus
+from src.db.models.user_model import UserModel
+from src.db.profiler import create_untracked_task
+from src.logs import hot_log
+from src.metrics import registry
+from src.services.user_service import UserService
+from src.settings import settings
+
+broadcast_messages = registry.counter(
+    "bot_broadcast_messages_total",
+    "Number of broadcast messages by result.",
+    labels=("result",),
+)
+
+CHECKPOINT_FIELDS = ["last_user_id", "sent", "failed", "blocked", "updated_at"]
+
+
+class Broadcaster:
+    """Send broadcasts to all active users, resuming them after restarts.
+
+    Users are read in pages ordered by id, starting after the last user
+    of the previous page, so every page costs one indexed query however
+    large the table is. Blocked and banned users are skipped. The
+    messages of a page are sent with at most `concurrency` in flight and
+    a low priority, so the rate limiter serves replies to live updates
+    first. Users who blocked the bot are marked in bulk and the progress
+    is saved after every page. A broadcast interrupted by a crash or a
+    redeploy resumes after the last saved page, so at most one page is
+    sent twice.
+
+    Attributes:
+        page_size (int): Number of users read per query.
+        concurrency (int): Maximum number of messages sent at once.
+    """
+
+    def __init__(self, page_size: int, concurrency: int) -> None:
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self._tasks: dict[int, asyncio.Task[BroadcastModel]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def start(self, bot: Bot, text: str) -> BroadcastModel:
+        """Create a broadcast and send it in the background.
+
+        Args:
+            bot (Bot): Bot sending the messages.
+            text (str): HTML text of the message.
+
+        Returns:
+            BroadcastModel: The created broadcast.
+        """
+        broadcast = await BroadcastModel.create(text=text)
+        self._launch(bot, broadcast)
+        return broadcast
+
+    async def resume(self, bot: Bot) -> None:
+        """Continue the broadcasts that were not finished."""
+        for broadcast in await BroadcastModel.filter(
+            status__in=[BroadcastStatus.PENDING, BroadcastStatus.RUNNING],
+        ).order_by("id"):
+            logger.info("Resuming broadcast {}", broadcast)
+            self._launch(bot, broadcast)
+
+    async def cancel(self, broadcast_id: int) -> None:
+        """Stop a broadcast for good."""
+        await self._stop_task(broadcast_id)
+        await BroadcastModel.filter(id=broadcast_id).update(
+            status=BroadcastStatus.CANCELLED,
+            updated_at=timezone.now(),
+        )
+
+    async def stop(self) -> None:
+        """Interrupt the running broadcasts, they resume on the next start."""
+        for broadcast_id in list(self._tasks):
+            await self._stop_task(broadcast_id)
+
+    async def join(self) -> None:
+        """Wait until the running broadcasts finish."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks.values()))
+
+    async def _stop_task(self, broadcast_id: int) -> None:
+        task = self._tasks.pop(broadcast_id, None)
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def _launch(self, bot: Bot, broadcast: BroadcastModel) -> None:
+        if broadcast.id in self._tasks:
+            return
+        task = create_untracked_task(self._run_logged(bot, broadcast))
+        self._tasks[broadcast.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(broadcast.id, None))
+
+    async def _run_logged(self, bot: Bot, broadcast: BroadcastModel) -> BroadcastModel:
+        try:
+            return await self.run(bot, broadcast)
+        except asyncio.CancelledError:
+            logger.info("Broadcast {} interrupted", broadcast)
+            raise
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Broadcast {} failed", broadcast)
+            return broadcast
+
+    async def run(self, bot: Bot, broadcast: BroadcastModel) -> BroadcastModel:
+        """Send a broadcast from its last checkpoint to the last user.
+
+        Args:
+            bot (Bot): Bot sending the messages.
+            broadcast (BroadcastModel): Broadcast to send.
+
+        Returns:
+            BroadcastModel: The finished broadcast with its counters.
+        """
+        broadcast.status = BroadcastStatus.RUNNING
+        await broadcast.save(update_fields=["status", "updated_at"])
+
+        with send_priority(SendPriority.LOW):
+            while user_ids := await self._next_page(broadcast.last_user_id):
+                blocked = await self._send_page(bot, broadcast, user_ids)
+                if blocked:
+                    await UserModel.filter(id__in=blocked).update(
+                        is_blocked=True,
+                        updated_at=timezone.now(),
+                    )
+                    for user_id in blocked:
+                        UserService.cache.invalidate(user_id)
+                broadcast.last_user_id = user_ids[-1]
+                await broadcast.save(update_fields=CHECKPOINT_FIELDS)
+
+        broadcast.status = BroadcastStatus.FINISHED
+        await broadcast.save(update_fields=["status", "updated_at"])
+        logger.info(
+            "Broadcast {} finished: {} sent, {} failed, {} blocked",
+            broadcast.id,
+            broadcast.sent,
+            broadcast.failed,
+            broadcast.blocked,
+        )
+        return broadcast
+
+    async def _next_page(self, after_id: int) -> list[int]:
+        user_ids = (
+            await UserModel.filter(
+                id__gt=after_id,
+                is_blocked=False,
+                is_banned=False,
+            )
+            .order_by("id")
+            .limit(self.page_size)
+            .values_list("id", flat=True)
+        )
+        return cast(list[int], user_ids)
+
+    async def _send_page(
+        self,
+        bot: Bot,
+        broadcast: BroadcastModel,
+        user_ids: list[int],
+    ) -> list[int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        blocked: list[int] = []
+
+        async def send(user_id: int) -> None:
+            async with semaphore:
+                try:
+                    await bot.send_message(chat_id=user_id, text=broadcast.text)
+                except TelegramForbiddenError:
+                    blocked.append(user_id)
+                    broadcast.blocked += 1
+                    broadcast_messages.inc("blocked")
+                except TelegramAPIError as error:
+                    broadcast.failed += 1
+                    broadcast_messages.inc("failed")
+                    hot_log.log(
+                        logging.WARNING,
+                        "Broadcast {} to user {} failed: {}",
+                        broadcast.id,
+                        user_id,
+                        error,
+                    )
+                else:
+                    broadcast.sent += 1
+                    broadcast_messages.inc("sent")
+
+        await asyncio.gather(*(send(user_id) for user_id in user_ids))
+        return blocked
+
+
+broadcaster = Broadcaster(
+    page_size=settings.broadcast_page_size,
+    concurrency=settings.broadcast_concurrency,
+)
+
+
+async def resume_broadcasts(bot: Bot) -> None:
+    """Resume the unfinished broadcasts, if enabled."""
+    if settings.broadcast_resume:
+        await broadcaster.resume(bot)
+
+
+async def stop_broadcasts() -> None:
+    """Interrupt the running broadcasts."""
+    await broadcaster.stop()
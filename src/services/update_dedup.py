@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""This module remembers the handled updates to drop redelivered ones."""
+
+import asyncio
+import multiprocessing
+from contextlib import suppress
+from datetime import timedelta
+from typing import Optional
+
+from aiogram import Bot
+from loguru import logger
+from tortoise import timezone
+
+from src.db.models.update_mark_model import UpdateMarkModel
+from src.metrics import registry
+from src.settings import settings
+
+duplicate_updates = registry.counter(
+    "bot_duplicate_updates_total",
+    "Number of redelivered updates dropped before handling.",
+)
+
+
+class UpdateWindow:
+    """Set of the last `size` update ids, the oldest id is forgotten first.
+
+    Attributes:
+        size (int): Number of remembered update ids.
+    """
+
+    __slots__ = ("size", "_ids", "_ring", "_next")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._ids: set[int] = set()
+        self._ring: list[Optional[int]] = [None] * size
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, update_id: int) -> bool:
+        return update_id in self._ids
+
+    def add(self, update_id: int) -> bool:
+        """Remember an update id.
+
+        Args:
+            update_id (int): Id of the update.
+
+        Returns:
+            bool: False if the id was already remembered.
+        """
+        if update_id in self._ids:
+            return False
+        forgotten = self._ring[self._next]
+        if forgotten is not None:
+            self._ids.discard(forgotten)
+        self._ring[self._next] = update_id
+        self._next = (self._next + 1) % self.size
+        self._ids.add(update_id)
+        return True
+
+
+class UpdateDeduplicator:  # pylint: disable=too-many-instance-attributes
+    """Recognize the updates Telegram delivers more than once.
+
+    Update ids are checked against a window of the last seen ids, so a
+    redelivered update is recognized without any query. With `persist`
+    set, the highest handled update id is also saved every `interval`
+    seconds, one row per process, and loaded on startup: updates up to
+    it are dropped after a restart. Updates being handled when the
+    process died may be dropped as well. Telegram picks update ids at
+    random after a week without updates, so a mark older than `mark_ttl`
+    seconds is ignored.
+
+    Attributes:
+        window (UpdateWindow): Last seen update ids.
+        persist (bool): Whether the high-water mark is saved.
+        interval (float): Time in seconds between two saves.
+        mark_ttl (float): Age in seconds after which a saved mark is ignored.
+        floor (int): Update id loaded on startup, lower ids are duplicates.
+        handled (int): Highest handled update id.
+    """
+
+    def __init__(
+        self,
+        window_size: int,
+        persist: bool,
+        interval: float,
+        mark_ttl: float,
+    ) -> None:
+        self.window = UpdateWindow(window_size)
+        self.persist = persist
+        self.interval = interval
+        self.mark_ttl = mark_ttl
+        self.floor = 0
+        self.handled = 0
+        self._key: Optional[str] = None
+        self._saved = 0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def seen(self, update_id: int) -> bool:
+        """Check whether an update was already received and remember it.
+
+        Args:
+            update_id (int): Id of the update.
+
+        Returns:
+            bool: True if the update is a duplicate.
+        """
+        return update_id <= self.floor or not self.window.add(update_id)
+
+    def done(self, update_id: int) -> None:
+        """Record a handled update."""
+        self.handled = max(self.handled, update_id)
+
+    async def load(self, key: str) -> None:
+        """Load the saved mark of a process.
+
+        Args:
+            key (str): Key of the mark, unique per bot and process.
+        """
+        self._key = key
+        mark = await UpdateMarkModel.get_or_none(key=key)
+        if mark is None:
+            return
+        if mark.updated_at < timezone.now() - timedelta(seconds=self.mark_ttl):
+            logger.info("Ignoring outdated {}", mark)
+            return
+        self.floor = self._saved = mark.update_id
+        self.handled = max(self.handled, mark.update_id)
+        logger.debug("Loaded {}", mark)
+
+    async def save(self) -> None:
+        """Save the highest handled update id if it changed."""
+        if self._key is None or self.handled <= self._saved:
+            return
+        handled = self.handled
+        await UpdateMarkModel.update_or_create(
+            key=self._key,
+            defaults={"update_id": handled},
+        )
+        self._saved = handled
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to save the update mark")
+
+    async def start(self, bot: Bot) -> None:
+        """Load the mark of this process and start saving it, if enabled."""
+        if not self.persist or self._task is not None:
+            return
+        await self.load(f"{bot.id}:{multiprocessing.current_process().name}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and save the mark."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        await self.save()
+
+
+update_dedup = UpdateDeduplicator(
+    window_size=max(settings.dedup_window, 1),
+    persist=settings.dedup_persist,
+    interval=settings.dedup_flush_interval,
+    mark_ttl=settings.dedup_mark_ttl,
+)
+
+
+async def start_update_dedup(bot: Bot) -> None:
+    """Load the saved update mark, if enabled."""
+    await update_dedup.start(bot)
+
+
+async def stop_update_dedup() -> None:
+    """Save the update mark."""
+    await update_dedup.stop()
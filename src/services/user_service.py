@@ -2,12 +2,121 @@
 
 """This module provides user service."""
 
-from typing import Any
+import time
+from collections import OrderedDict
+from typing import Any, Optional
 
 from loguru import logger
+from tortoise import timezone
 
+from src.db.config import REPLICA_CONNECTION
 from src.db.models.user_model import UserModel
-from src.schemas.user_scheme import CreateUserSchema, UserSchema
+from src.db.routing import ReplicaRouter
+from src.logs import hot_log
+from src.metrics import Number, registry, timed, user_service_latency
+from src.schemas import user_scheme
+from src.schemas.user_view import UserView
+from src.services.ban_list import ban_list
+from src.services.user_upsert import PROFILE_FIELDS, UserUpsertBatcher, upsert_user
+from src.services.user_writer import UserWriteBehind
+from src.settings import settings
+
+
+class UserCache:
+    """Bounded in-process cache of users keyed by Telegram id.
+
+    Entries are evicted in least recently used order once `max_size`
+    is reached and expire `ttl` seconds after they were stored.
+    The cache keeps plain field values, so every hit builds a new
+    UserView and handlers never share a mutable object.
+
+    Attributes:
+        max_size (int): Maximum number of cached users, 0 disables the cache.
+        ttl (float): Time to live of an entry in seconds.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that went to the database.
+        evictions (int): Number of entries dropped because the cache was full.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._users: OrderedDict[int, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: int) -> Optional[dict[str, Any]]:
+        """Return the cached field values of a user or None.
+
+        Args:
+            user_id (int): Telegram id of the user.
+
+        Returns:
+            Optional[dict[str, Any]]: Cached field values,
+                None if the user is missing or the entry has expired.
+        """
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            del self._users[user_id]
+            return None
+
+        self._users.move_to_end(user_id)
+        return values
+
+    def set(self, user_id: int, values: dict[str, Any]) -> None:
+        """Store the field values of a user, evicting the oldest entries.
+
+        Args:
+            user_id (int): Telegram id of the user.
+            values (dict[str, Any]): Field values of the user.
+        """
+        if self.max_size <= 0:
+            return
+
+        self._users[user_id] = (time.monotonic() + self.ttl, values)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user from the cache.
+
+        Args:
+            user_id (int): Telegram id of the user.
+        """
+        self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Drop all users and reset the counters."""
+        self._users.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, Number]:
+        """Return the cache counters.
+
+        Returns:
+            dict[str, int]: Current size, hits, misses and evictions.
+        """
+        return {
+            "size": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def mark_user_written(user_id: int) -> None:
+    """Read a user written by the write-behind buffer from the primary."""
+    UserService.router.mark_written(user_id)
 
 
 class UserService:  # pylint: disable=too-few-public-methods
@@ -18,50 +127,135 @@ class UserService:  # pylint: disable=too-few-public-methods
     as updating user information.
 
     Attributes:
-        None
+        cache (UserCache): Cache of recently seen users in front of the database.
+        batcher (Optional[UserUpsertBatcher]): Coalesces concurrent database
+            lookups into batched upserts, None if batching is disabled.
+        writer (Optional[UserWriteBehind]): Buffers user changes and writes
+            them in bulk in the background, None if updates are written
+            immediately.
+        router (ReplicaRouter): Routes user reads to the read replica,
+            if one is configured, unless the user was written recently.
 
     Methods:
         get_or_create: Method to get an existing user or create a new user based
             on the provided data.
         update: Method to update the information of an existing user.
+        start_writer: Method to start the write-behind flush task.
+        stop_writer: Method to stop the write-behind flush task
+            and write the pending changes.
 
     Note:
         This class is designed to handle user-related operations in the application.
     """
 
+    cache = UserCache(
+        max_size=settings.user_cache_size,
+        ttl=settings.user_cache_ttl,
+    )
+    batcher: Optional[UserUpsertBatcher] = (
+        UserUpsertBatcher(
+            window=settings.user_batch_window,
+            max_size=settings.user_batch_max_size,
+        )
+        if settings.user_batch_max_size > 1
+        else None
+    )
+    writer: Optional[UserWriteBehind] = (
+        UserWriteBehind(
+            interval=settings.user_flush_interval,
+            max_rows=settings.user_flush_max_rows,
+            on_written=mark_user_written,
+        )
+        if settings.user_write_behind
+        else None
+    )
+    router = ReplicaRouter(
+        replica=REPLICA_CONNECTION if settings.db_replica_url else None,
+        window=settings.db_replica_window,
+    )
+
     @classmethod
+    @timed(user_service_latency, "get_or_create")
     async def get_or_create(
         cls,
         **user_data: dict[str, Any],
-    ) -> tuple[UserSchema, bool]:
+    ) -> tuple[UserView, bool]:
         """Method to get an existing user or create a new user based on the provided data.
 
         Args:
             **user_data (dict[str, Any]): Keyword arguments representing user data.
 
         Returns:
-            tuple[UserSchema, bool]: A tuple containing the UserSchema object representing the user
+            tuple[UserView, bool]: A tuple containing the UserView object representing the user
             and a boolean indicating whether the user was created (True) or retrieved (False).
 
         Note:
-            This method logs the user data, creates a CreateUserSchema instance,
-            and then calls the UserModel's get_or_create method to interact with the database.
-            It returns a UserSchema object created from the database user and a flag indicating
+            The user is served from the cache while its Telegram profile fields
+            (first name, last name and username) match the cached copy.
+            Otherwise this method validates the data with CreateUserSchema and
+            reads the user from the read replica, if one is configured.
+            A missing or outdated user is upserted on the primary instead
+            by one statement that also refreshes its profile, batched with
+            concurrent calls when batching is enabled. Then it applies the changes still waiting
+            in the write-behind buffer and caches the result.
+            It returns a UserView object and a flag indicating
             if the user was newly created or not.
         """
-        logger.debug("Get or create user {}", user_data)
-        crete_user_schema = CreateUserSchema(**user_data)
-        db_user, is_created = await UserModel.get_or_create(
-            **crete_user_schema.model_dump(),
+        user_id = user_data.get("id")
+        cached = cls.cache.get(user_id) if isinstance(user_id, int) else None
+        if cached is not None and all(
+            cached[field] == user_data.get(field) for field in PROFILE_FIELDS
+        ):
+            cls.cache.hits += 1
+            return UserView(**cached), False
+
+        cls.cache.misses += 1
+        hot_log.debug("Get or create user {}", user_data)
+        crete_user_schema = user_scheme.CreateUserSchema(**user_data)
+        db_user, is_created = await cls._get_or_create_in_db(
+            crete_user_schema.model_dump(),
         )
-        return await UserSchema.from_tortoise_orm(db_user), is_created
+        values = UserView.from_model(db_user).as_dict()
+        if cls.writer is not None and (pending := cls.writer.pending(db_user.id)):
+            values.update(pending)
+        cls.cache.set(db_user.id, values)
+        return UserView(**values), is_created
+
+    @classmethod
+    async def _get_or_create_in_db(
+        cls,
+        values: dict[str, Any],
+    ) -> tuple[UserModel, bool]:
+        replica = cls.router.db_for_read(values["id"])
+        if replica is not None:
+            db_user = await UserModel.filter(id=values["id"]).using_db(replica).first()
+            if db_user is not None and all(
+                getattr(db_user, field) == values.get(field) for field in PROFILE_FIELDS
+            ):
+                return db_user, False
+
+        if cls.batcher is not None:
+            db_user, is_created = await cls.batcher.get_or_create(values)
+        else:
+            db_user, is_created = await upsert_user(values)
+        if is_created:
+            cls.router.mark_written(db_user.id)
+        return db_user, is_created
 
     @classmethod
-    async def update(cls, user: UserSchema) -> None:
+    @timed(user_service_latency, "update")
+    async def update(cls, user: UserView) -> None:
         """Method to update the information of an existing user.
 
+        Only the fields changed on the view since it was loaded are written,
+        with a single ``UPDATE ... WHERE id`` statement. Nothing is sent to
+        the database when no field has changed. In write-behind mode the
+        changes are buffered and written later in bulk instead.
+        A write drops the user from the cache and a changed ban is
+        applied to the ban list at once.
+
         Args:
-            user (UserSchema): The user object containing the updated information.
+            user (UserView): The user object containing the updated information.
 
         Returns:
             None
@@ -69,10 +263,37 @@ class UserService:  # pylint: disable=too-few-public-methods
         Raises:
             None
         """
-        logger.debug("Update user {}", user)
-        db_user = await UserModel.get(id=user.id)
+        changed_fields = user.changed_fields
+        if not changed_fields:
+            return
+
+        hot_log.debug("Update user {} fields {}", user.id, changed_fields)
+        values = {field: getattr(user, field) for field in changed_fields}
+        if cls.writer is not None:
+            # Reads move to the primary once the flush writes the changes
+            cls.writer.add(user.id, values)
+        else:
+            values["updated_at"] = timezone.now()
+            await UserModel.filter(id=user.id).update(**values)
+            cls.router.mark_written(user.id)
+        if "is_banned" in values:
+            ban_list.set(user.id, user.is_banned)
+        cls.cache.invalidate(user.id)
+        user.mark_clean()
+
+    @classmethod
+    async def start_writer(cls) -> None:
+        """Method to start the write-behind flush task, if enabled."""
+        if cls.writer is not None:
+            logger.debug("Starting user writer...")
+            cls.writer.start()
+
+    @classmethod
+    async def stop_writer(cls) -> None:
+        """Method to stop the write-behind flush task and write pending changes."""
+        if cls.writer is not None:
+            logger.debug("Stopping user writer...")
+            await cls.writer.stop()
 
-        for attr in user.model_fields:
-            setattr(db_user, attr, getattr(user, attr))
 
-        await db_user.save()
+registry.register_collector("user_cache", UserService.cache.stats)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+"""This module provides batched user upserts."""
+
+import asyncio
+from operator import itemgetter
+from typing import Any, Optional
+
+from src.db.models.user_model import UserModel
+from src.db.profiler import create_untracked_task
+from src.db.queries import (
+    UPSERT_DIALECTS,
+    build_insert_query,
+    build_upsert_query,
+    prepare_params,
+    quote,
+)
+from src.logs import hot_log
+
+# Telegram profile fields, refreshed by the upsert
+PROFILE_FIELDS = ("first_name", "last_name", "username")
+
+
+def build_profile_upsert_query(dialect: str, columns: list[str], rows: int) -> str:
+    """Build the user upsert refreshing the profile of existing users.
+
+    The updated_at column only changes with the profile.
+
+    Args:
+        dialect (str): Dialect of the connection, 'postgres' or 'sqlite'.
+        columns (list[str]): Inserted columns, in the order of the values.
+        rows (int): Number of upserted users.
+
+    Returns:
+        str: Parametrized query returning the rows.
+    """
+    upsert_query = build_upsert_query(
+        UserModel,
+        dialect,
+        columns,
+        rows,
+        update_columns=PROFILE_FIELDS,
+        touch_columns=["updated_at"],
+    )
+    return f"{upsert_query} RETURNING *"
+
+
+def build_returning_upsert_query(columns: list[str], rows: int) -> str:
+    """Build the PostgreSQL user upsert returning the rows and a created flag.
+
+    Args:
+        columns (list[str]): Inserted columns, in the order of the values.
+        rows (int): Number of upserted users.
+
+    Returns:
+        str: Parametrized query.
+    """
+    upsert_query = build_profile_upsert_query("postgres", columns, rows)
+    return f'{upsert_query}, (xmax = 0) AS "created"'
+
+
+def warm_up_statements() -> list[tuple[str, list[Any]]]:
+    """Return the hot user statements to prepare on new connections.
+
+    Returns:
+        list[tuple[str, list[Any]]]: The single user upsert with placeholder
+            values, or nothing if the connection is not PostgreSQL.
+    """
+    # pylint: disable=protected-access
+    if UserModel._meta.db.capabilities.dialect != "postgres":
+        return []
+    columns = list(UserModel._meta.fields_db_projection.values())
+    params = prepare_params(UserModel, [UserModel(id=0, first_name="")], columns)
+    return [(build_returning_upsert_query(columns, 1), params)]
+
+
+async def upsert_users(
+    users: list[dict[str, Any]],
+) -> dict[int, tuple[UserModel, bool]]:
+    """Get or create several users, refreshing the profile of existing ones.
+
+    On PostgreSQL one ``INSERT ... ON CONFLICT (id) DO UPDATE ... RETURNING``
+    resolves the whole batch, `xmax = 0` tells the inserted rows apart.
+    SQLite has no `xmax`, so the inserted ids are returned by an
+    ``ON CONFLICT DO NOTHING`` insert and the profiles are refreshed by
+    the upsert afterwards. Other dialects fall back to
+    UserModel.get_or_create for every user, without a refresh. The
+    users are written in id order, so concurrent batches lock their
+    rows in the same order and cannot deadlock.
+
+    Args:
+        users (list[dict[str, Any]]): Field values of the users,
+            ids must be unique.
+
+    Returns:
+        dict[int, tuple[UserModel, bool]]: The user and a flag telling
+            whether it was created, by user id.
+    """
+    # pylint: disable=protected-access
+    users = sorted(users, key=itemgetter("id"))
+    connection = UserModel._meta.db
+    dialect = connection.capabilities.dialect
+    if dialect not in UPSERT_DIALECTS:
+        return {
+            values["id"]: await UserModel.get_or_create(**values) for values in users
+        }
+
+    columns = list(UserModel._meta.fields_db_projection.values())
+    pk = quote(UserModel._meta.db_pk_column)
+    params = prepare_params(
+        UserModel,
+        (UserModel(**values) for values in users),
+        columns,
+    )
+
+    if dialect == "postgres":
+        rows = await connection.execute_query_dict(
+            build_returning_upsert_query(columns, len(users)),
+            params,
+        )
+        results = {}
+        for row in rows:
+            is_created = row.pop("created")
+            results[row["id"]] = (UserModel._init_from_db(**row), is_created)
+        return results
+
+    insert_query = build_insert_query(UserModel, dialect, columns, len(users))
+    created_rows = await connection.execute_query_dict(
+        f"{insert_query} ON CONFLICT ({pk}) DO NOTHING RETURNING {pk}",
+        params,
+    )
+    created_ids = {row["id"] for row in created_rows}
+    rows = await connection.execute_query_dict(
+        build_profile_upsert_query(dialect, columns, len(users)),
+        params,
+    )
+    return {
+        row["id"]: (UserModel._init_from_db(**row), row["id"] in created_ids)
+        for row in rows
+    }
+
+
+async def upsert_user(values: dict[str, Any]) -> tuple[UserModel, bool]:
+    """Get or create a user, refreshing its profile, without batching.
+
+    Args:
+        values (dict[str, Any]): Field values of the user.
+
+    Returns:
+        tuple[UserModel, bool]: The user and a flag telling
+            whether it was created.
+
+    Raises:
+        LookupError: If the upsert returned no row for the user.
+    """
+    results = await upsert_users([values])
+    if values["id"] not in results:
+        raise LookupError(f"User {values['id']} missing from upsert result")
+    return results[values["id"]]
+
+
+class UserUpsertBatcher:
+    """Coalesce concurrent get-or-create calls into batched upserts.
+
+    The first request after an idle period is flushed on the next loop
+    iteration, so a lone update pays no extra latency. While a flush
+    is running, new requests are collected for up to `window` seconds or
+    until `max_size` distinct users are pending, then written together
+    with upsert_users. Requests for the same user within a batch share
+    the database row, written with the profile of the latest request.
+
+    Attributes:
+        window (float): Maximum time in seconds a request waits for a batch.
+        max_size (int): Maximum number of users in a batch.
+    """
+
+    def __init__(self, window: float, max_size: int) -> None:
+        self.window = window
+        self.max_size = max_size
+        self._pending: dict[
+            int,
+            tuple[dict[str, Any], list[asyncio.Future[tuple[UserModel, bool]]]],
+        ] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._flushes: set[asyncio.Task[None]] = set()
+
+    async def get_or_create(self, values: dict[str, Any]) -> tuple[UserModel, bool]:
+        """Queue a user for the next batch and wait for its row.
+
+        Args:
+            values (dict[str, Any]): Field values of the user.
+
+        Returns:
+            tuple[UserModel, bool]: The user and a flag telling
+                whether it was created.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[tuple[UserModel, bool]] = loop.create_future()
+        pending = self._pending.get(values["id"])
+        if pending is None:
+            pending = self._pending[values["id"]] = (dict(values), [])
+        else:
+            pending[0].update(values)
+        pending[1].append(future)
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            if self._flushes:
+                self._flush_handle = loop.call_later(self.window, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = create_untracked_task(self._write(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(
+        self,
+        batch: dict[
+            int,
+            tuple[dict[str, Any], list[asyncio.Future[tuple[UserModel, bool]]]],
+        ],
+    ) -> None:
+        hot_log.debug("Upsert batch of {} users", len(batch))
+        try:
+            results = await upsert_users([values for values, _ in batch.values()])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            for _, waiters in batch.values():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            return
+
+        for user_id, (_, waiters) in batch.items():
+            for waiter in waiters:
+                if waiter.done():
+                    continue
+                if user_id in results:
+                    waiter.set_result(results[user_id])
+                else:
+                    waiter.set_exception(
+                        LookupError(f"User {user_id} missing from upsert result"),
+                    )
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""This module provides write-behind persistence of user changes."""
+
+import asyncio
+from contextlib import suppress
+from typing import Any, Callable, Optional
+
+from loguru import logger
+from tortoise import timezone
+
+from src.db.models.user_model import UserModel
+from src.db.profiler import create_untracked_task
+
+
+class UserWriteBehind:  # pylint: disable=too-many-instance-attributes
+    """Buffer user changes in memory and write them in bulk.
+
+    Changes are merged per user, so repeated writes to the same user
+    between two flushes cost a single row update. A background task
+    flushes the buffer every `interval` seconds, or as soon as `max_rows`
+    users are pending, with one UserModel.bulk_update per set of
+    changed fields.
+
+    Attributes:
+        interval (float): Time in seconds between two flushes.
+        max_rows (int): Number of pending users that triggers a flush.
+        on_written (Optional[Callable[[int], None]]): Called with the id
+            of every user once its changes are written.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_rows: int,
+        on_written: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self.interval = interval
+        self.max_rows = max_rows
+        self.on_written = on_written
+        self._changes: dict[int, dict[str, Any]] = {}
+        # Changes taken out of the buffer by the running flush
+        self._flushing: dict[int, dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+    def add(self, user_id: int, values: dict[str, Any]) -> None:
+        """Merge changed field values of a user into the buffer.
+
+        Args:
+            user_id (int): Telegram id of the user.
+            values (dict[str, Any]): Changed field values.
+        """
+        self._changes.setdefault(user_id, {}).update(values)
+        if self._wakeup is not None and len(self._changes) >= self.max_rows:
+            self._wakeup.set()
+
+    def pending(self, user_id: int) -> Optional[dict[str, Any]]:
+        """Return the changes of a user that are not written yet.
+
+        Changes being written by a running flush are included until
+        the write completes.
+
+        Args:
+            user_id (int): Telegram id of the user.
+
+        Returns:
+            Optional[dict[str, Any]]: Pending field values or None.
+        """
+        flushing = self._flushing.get(user_id)
+        changes = self._changes.get(user_id)
+        if flushing is None or changes is None:
+            return changes or flushing
+        return {**flushing, **changes}
+
+    async def flush(self) -> int:
+        """Write all pending changes to the database.
+
+        Changes that failed to be written are merged back into the buffer
+        unless the user has been changed again in the meantime.
+
+        Returns:
+            int: Number of written users.
+        """
+        async with self._lock:
+            changes, self._changes = self._changes, {}
+            if not changes:
+                return 0
+            self._flushing = changes
+            try:
+                written = await self._write(changes)
+            finally:
+                self._flushing = {}
+            logger.debug("Flushed {} users", written)
+            return written
+
+    async def _write(self, changes: dict[int, dict[str, Any]]) -> int:
+        groups: dict[frozenset[str], list[UserModel]] = {}
+        now = timezone.now()
+        for user_id, values in changes.items():
+            groups.setdefault(frozenset(values), []).append(
+                UserModel(id=user_id, updated_at=now, **values),
+            )
+
+        written = 0
+        for fields, users in groups.items():
+            try:
+                await UserModel.bulk_update(
+                    users,
+                    fields=[*fields, "updated_at"],
+                )
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to write {} users", len(users))
+                for user in users:
+                    for field, value in changes[user.id].items():
+                        self._changes.setdefault(user.id, {}).setdefault(
+                            field,
+                            value,
+                        )
+            else:
+                written += len(users)
+                if self.on_written is not None:
+                    for user in users:
+                        self.on_written(user.id)
+        return written
+
+    async def _run(self, wakeup: asyncio.Event) -> None:
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(wakeup.wait(), timeout=self.interval)
+            wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush task."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = create_untracked_task(self._run(self._wakeup))
+
+    async def stop(self) -> None:
+        """Stop the background flush task and write the remaining changes."""
+        if self._task is not None:
+            # Never interrupt a running flush, its changes are already
+            # taken out of the buffer.
+            async with self._lock:
+                self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            self._wakeup = None
+        await self.flush()
@@ -8,6 +8,7 @@ from tempfile import gettempdir
 from typing import Optional
 
 from loguru import logger
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from yarl import URL
 
@@ -25,6 +26,13 @@ class LogLevel(str, enum.Enum):
     FATAL = "FATAL"
 
 
+class FSMStorageType(str, enum.Enum):
+    """Possible FSM storages."""
+
+    MEMORY = "memory"
+    DATABASE = "database"
+
+
 class Settings(BaseSettings):
     """Application settings.
 
@@ -38,10 +46,98 @@ class Settings(BaseSettings):
     environment: str = "dev"
     log_level: LogLevel = LogLevel.DEBUG
 
+    # Logging vars (log lines are written by a background thread when
+    # log_async is set, repeated hot path logs are limited to one per
+    # log_rate_limit seconds, 0 disables the limit)
+    log_async: bool = True
+    log_buffer_size: int = 10_000
+    log_rate_limit: float = 1.0
+
+    # Error aggregation vars (the first occurrence of an error is logged
+    # in full, repeats are summarized every error_summary_interval
+    # seconds, 0 logs every error in full, errors are told apart by
+    # their innermost frames)
+    error_summary_interval: float = 60.0
+    error_fingerprint_frames: int = 3
+
+    # Startup profile vars (the durations of the startup phases are logged
+    # after the first update, set BOT_STARTUP_PROFILE in the environment
+    # rather than in .env to time every import as well)
+    startup_profile: bool = False
+
     # Bot vars
     token: str = ""
     webhook_url: Optional[str] = None
 
+    # Outgoing message rate limit vars (messages per second to all chats,
+    # to a private chat and to a group, a rate limit of 0 disables it)
+    api_rate_limit: float = 30.0
+    api_chat_rate_limit: float = 1.0
+    api_group_rate_limit: float = 20 / 60
+    api_chat_burst: int = 3
+    api_max_retries: int = 3
+
+    # Bot API session vars (a local Bot API server URL like
+    # "http://localhost:8081", connection limits of 0 disable them,
+    # keep-alive, DNS cache and timeouts in seconds, timeouts by method
+    # override api_timeout, example: {"sendDocument": 120})
+    api_server_url: Optional[str] = None
+    api_connection_limit: int = 100
+    api_connection_limit_per_host: int = 0
+    api_keepalive_timeout: float = 15.0
+    api_dns_cache_ttl: int = 300
+    api_timeout: float = 60.0
+    api_method_timeouts: dict[str, float] = {}
+
+    # Webhook server vars (the route path is taken from webhook_url)
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: Optional[str] = None
+    webhook_max_connections: int = 40
+
+    # Update processing vars (more than one process enables chat sharding,
+    # update_workers limits the updates handled at once per process)
+    worker_processes: int = 1
+    update_workers: int = 16
+    max_pending_updates: int = 1000
+
+    # Long polling vars (timeout in seconds, updates per request from 1
+    # to 100)
+    polling_timeout: int = Field(default=10, ge=0)
+    polling_limit: int = Field(default=100, ge=1, le=100)
+
+    # Update deduplication vars (update ids remembered per process, 0
+    # disables the check, with dedup_persist the highest handled update
+    # id is saved every dedup_flush_interval seconds and used after a
+    # restart unless older than dedup_mark_ttl seconds)
+    dedup_window: int = 10_000
+    dedup_persist: bool = False
+    dedup_flush_interval: float = 5.0
+    dedup_mark_ttl: float = 86_400.0
+
+    # Ban gate vars (updates of banned users are dropped without queries,
+    # users changed by other processes are read every ban_refresh_interval
+    # seconds, 0 disables the refresh)
+    ban_gate: bool = True
+    ban_refresh_interval: float = 60.0
+
+    # Metrics vars (port 0 disables the endpoint, worker processes
+    # listen on consecutive ports starting from metrics_port)
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+
+    # Broadcast vars (users read per query, messages sent at once, only
+    # the first worker process resumes unfinished broadcasts)
+    broadcast_page_size: int = 500
+    broadcast_concurrency: int = 10
+    broadcast_resume: bool = True
+
+    # FSM storage vars (flush interval in seconds, the database storage
+    # is cached in memory and must not be shared by several bot instances)
+    fsm_storage: FSMStorageType = FSMStorageType.MEMORY
+    fsm_flush_interval: float = 1.0
+    fsm_cache_size: int = 10_000
+
     # Database vars
     db_host: str = "localhost"
     db_port: int = 5432
@@ -49,6 +145,43 @@ class Settings(BaseSettings):
     db_pass: str = "postgres"
     db_base: str = "schedule_bot"
     db_echo: bool = False
+    # Model modules, discovered in the models directory when not set
+    # (example: ["src.db.models.user_model"])
+    db_models: Optional[list[str]] = None
+
+    # Database pool vars (lifetime and timeouts in seconds, no command
+    # timeout by default, a statement cache size of 0 disables it)
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_max_inactive_lifetime: float = 300.0
+    db_pool_warm_up: bool = True
+    db_statement_cache_size: int = 100
+    db_connect_timeout: float = 60.0
+    db_command_timeout: Optional[float] = None
+
+    # Read replica vars (reads of a user go to the primary for
+    # db_replica_window seconds after it was written)
+    db_replica_url: Optional[str] = None
+    db_replica_window: float = 5.0
+
+    # Query profiler vars (slow query threshold in seconds,
+    # a query budget of 0 disables the per-update check)
+    db_profile: bool = False
+    db_slow_query: float = 0.1
+    db_query_budget: int = 0
+
+    # User cache vars (size 0 disables the cache, ttl in seconds)
+    user_cache_size: int = 10_000
+    user_cache_ttl: float = 300.0
+
+    # User upsert batching vars (max size below 2 disables batching)
+    user_batch_window: float = 0.005
+    user_batch_max_size: int = 100
+
+    # User write-behind vars (flush interval in seconds)
+    user_write_behind: bool = False
+    user_flush_interval: float = 1.0
+    user_flush_max_rows: int = 500
 
     model_config = SettingsConfigDict(
         env_file=Path(__file__).parent.parent / ".env",
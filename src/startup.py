@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""This module profiles the startup of the application."""
+
+import os
+import sys
+import time
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import ModuleSpec
+from types import ModuleType
+from typing import Any, Optional, Sequence
+
+# Keep this module free of third party imports, it is imported before
+# everything else to time the other imports.
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+REPORT_LIMIT = 10
+
+
+class _TimedLoader(Loader):
+    """Loader wrapper measuring the execution time of a module."""
+
+    def __init__(self, loader: Loader, timer: "ImportTimer") -> None:
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec: ModuleSpec) -> Optional[ModuleType]:
+        """Create the module with the wrapped loader."""
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        """Execute the module with the wrapped loader and record its duration."""
+        self._timer.enter()
+        started_at = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.leave(module.__name__, time.perf_counter() - started_at)
+
+
+class ImportTimer(MetaPathFinder):
+    """Meta path finder recording the import time of every module.
+
+    The specs are found by the other finders, only their loaders are
+    wrapped. Like ``python -X importtime`` the self time of a module
+    excludes the time spent importing the modules it imports.
+
+    Attributes:
+        self_times (dict[str, float]): Self import time of every module in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.self_times: dict[str, float] = {}
+        self._nested: list[float] = []
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Optional[Sequence[str]],
+        target: Optional[ModuleType] = None,
+    ) -> Optional[ModuleSpec]:
+        """Find the spec with the next finders and wrap its loader."""
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self)
+            return spec
+        return None
+
+    def enter(self) -> None:
+        """Start timing a module."""
+        self._nested.append(0.0)
+
+    def leave(self, name: str, duration: float) -> None:
+        """Record the duration of a module, nested imports excluded."""
+        nested = self._nested.pop()
+        self.self_times[name] = duration - nested
+        if self._nested:
+            self._nested[-1] += duration
+
+    def install(self) -> None:
+        """Time the imports from now on."""
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        """Stop timing the imports."""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def by_package(self) -> dict[str, float]:
+        """Return the import time of every top level package, slowest first."""
+        totals: dict[str, float] = {}
+        for name, duration in self.self_times.items():
+            package = name.partition(".")[0]
+            totals[package] = totals.get(package, 0.0) + duration
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+class StartupProfile:
+    """Durations of the startup phases up to the first processed update.
+
+    Every mark closes a phase started by the previous mark, the first one
+    starts when this module is imported. Marks are cheap and always
+    recorded, the report is logged when the startup_profile setting is
+    enabled. Import times are recorded per module when BOT_STARTUP_PROFILE
+    is set in the environment, since .env is read after the imports.
+
+    Attributes:
+        phases (dict[str, float]): Duration of every phase in seconds.
+        imports (Optional[ImportTimer]): Import times, if recorded.
+        done (bool): Whether the first update has been processed.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.imports: Optional[ImportTimer] = None
+        self.done = False
+        self._started_at = self._last_mark = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        """Time in seconds from the start to the last mark."""
+        return self._last_mark - self._started_at
+
+    def time_imports(self) -> None:
+        """Record the import time of every module imported from now on."""
+        if self.imports is None:
+            self.imports = ImportTimer()
+            self.imports.install()
+
+    def mark(self, phase: str) -> None:
+        """Close a phase, marks of an already closed phase are ignored.
+
+        Args:
+            phase (str): Name of the phase ending now.
+        """
+        if self.done or phase in self.phases:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark
+        self._last_mark = now
+
+    def finish(self, phase: str = "first update") -> None:
+        """Close the last phase and log the report if enabled.
+
+        Args:
+            phase (str): Name of the last phase.
+        """
+        if self.done:
+            return
+        # pylint: disable=import-outside-toplevel
+        from loguru import logger
+
+        from src.settings import settings
+
+        self.mark(phase)
+        self.done = True
+        if self.imports is not None:
+            self.imports.uninstall()
+        if settings.startup_profile:
+            logger.info("Startup profile:\n{}", self.report())
+
+    def report(self) -> str:
+        """Return the phase durations and the slowest imports as text."""
+        width = max(map(len, [*self.phases, "total"]))
+        lines = [
+            f"  {phase:<{width}} {duration * 1000:9.1f} ms"
+            for phase, duration in self.phases.items()
+        ]
+        lines.append(f"  {'total':<{width}} {self.total * 1000:9.1f} ms")
+        if self.imports is not None:
+            packages = list(self.imports.by_package().items())
+            lines.append("Slowest packages to import:")
+            lines.extend(
+                f"  {package} {duration * 1000:.1f} ms"
+                for package, duration in packages[:REPORT_LIMIT]
+            )
+            lines.append("Slowest modules to import:")
+            slowest = sorted(
+                self.imports.self_times.items(),
+                key=lambda item: item[1],
+                reverse=True,
+            )
+            lines.extend(
+                f"  {name} {duration * 1000:.1f} ms"
+                for name, duration in slowest[:REPORT_LIMIT]
+            )
+        return "\n".join(lines)
+
+
+startup_profile = StartupProfile()
+if os.environ.get("BOT_STARTUP_PROFILE", "").lower() in TRUE_VALUES:
+    startup_profile.time_imports()
@@ -0,0 +1 @@
+"""Storages module."""
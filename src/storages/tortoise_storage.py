@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""This module provides FSM storage backed by the project database."""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any, Optional, cast
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from loguru import logger
+
+from src.db.models.fsm_model import FSMStateModel
+from src.db.profiler import create_untracked_task
+from src.db.queries import UPSERT_DIALECTS, build_upsert_query, prepare_params
+
+Record = tuple[Optional[str], dict[str, Any]]
+
+
+class TortoiseStorage(BaseStorage):
+    """FSM storage keeping state and data in the FSMStateModel table.
+
+    Reads go through an in-memory layer, so a conversation costs one
+    query when it is first seen and none afterwards. Writes only update
+    the memory layer and mark the key as dirty; a background task writes
+    the dirty keys every `flush_interval` seconds with one upsert, and
+    keys without state and data are deleted. The remaining changes are
+    written when the storage is closed on dispatcher shutdown.
+
+    This is a single-process storage: the memory layer is authoritative
+    for the keys it holds and never reads them again, so the table must
+    not be shared by bot processes handling the same chats. Worker
+    sharding keeps every chat in one worker and works with it.
+
+    Attributes:
+        flush_interval (float): Time in seconds between two writes.
+        cache_size (int): Number of clean keys kept in memory.
+        key_builder (KeyBuilder): Builds the row key of a storage key.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 1.0,
+        cache_size: int = 10_000,
+        key_builder: Optional[KeyBuilder] = None,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._records: OrderedDict[str, Record] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flush_task: Optional[asyncio.Task[None]] = None
+        self._lock = asyncio.Lock()
+
+    async def _get(self, key: StorageKey) -> tuple[str, Record]:
+        row_key = self.key_builder.build(key)
+        cached = self._records.get(row_key)
+        if cached is not None:
+            self._records.move_to_end(row_key)
+            return row_key, cached
+
+        row = await FSMStateModel.get_or_none(key=row_key)
+        loaded: Record = (
+            (row.state, cast(dict[str, Any], row.data))
+            if row is not None
+            else (None, {})
+        )
+        # Another call may have written the key while the row was loading.
+        record = self._records.setdefault(row_key, loaded)
+        self._evict()
+        return row_key, record
+
+    def _set(self, row_key: str, record: Record) -> None:
+        self._records[row_key] = record
+        self._records.move_to_end(row_key)
+        self._dirty.add(row_key)
+        if self._flush_task is None:
+            self._flush_task = create_untracked_task(self._run())
+
+    def _evict(self) -> None:
+        overflow = len(self._records) - len(self._dirty) - self.cache_size
+        if overflow <= 0:
+            return
+        # Least recently used keys come first, dirty ones are skipped.
+        evicted = []
+        for row_key in self._records:
+            if row_key not in self._dirty:
+                evicted.append(row_key)
+                if len(evicted) == overflow:
+                    break
+        for row_key in evicted:
+            del self._records[row_key]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Set the state of a key."""
+        row_key, (_, data) = await self._get(key)
+        self._set(row_key, (state.state if isinstance(state, State) else state, data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Get the state of a key."""
+        _, (state, _) = await self._get(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        """Set the data of a key."""
+        row_key, (state, _) = await self._get(key)
+        self._set(row_key, (state, data.copy()))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        """Get the data of a key."""
+        _, (_, data) = await self._get(key)
+        return data.copy()
+
+    async def flush(self) -> None:
+        """Write the dirty keys to the database."""
+        async with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            records = {row_key: self._records[row_key] for row_key in dirty}
+            deleted = [
+                key for key, (state, data) in records.items() if not (state or data)
+            ]
+            rows = [
+                FSMStateModel(key=key, state=state, data=data)
+                for key, (state, data) in records.items()
+                if state or data
+            ]
+            try:
+                if deleted:
+                    await FSMStateModel.filter(key__in=deleted).delete()
+                if rows:
+                    await self._upsert(rows)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to write {} FSM keys", len(dirty))
+                self._dirty |= dirty
+            self._evict()
+
+    @staticmethod
+    async def _upsert(rows: list[FSMStateModel]) -> None:
+        # pylint: disable=protected-access
+        connection = FSMStateModel._meta.db
+        dialect = connection.capabilities.dialect
+        if dialect not in UPSERT_DIALECTS:
+            for row in rows:
+                await FSMStateModel.update_or_create(
+                    key=row.key,
+                    defaults={"state": row.state, "data": row.data},
+                )
+            return
+
+        columns = list(FSMStateModel._meta.fields_db_projection.values())
+        await connection.execute_query(
+            build_upsert_query(
+                FSMStateModel,
+                dialect,
+                columns,
+                len(rows),
+                update_columns=["state", "data", "updated_at"],
+            ),
+            prepare_params(FSMStateModel, rows, columns),
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stop the background task and write the remaining changes."""
+        if self._flush_task is not None:
+            async with self._lock:
+                self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self.flush()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains helpers for background tasks."""
+
+import asyncio
+from contextlib import suppress
+from typing import Any, Optional
+
+
+async def cancel_task(task: Optional[asyncio.Task[Any]]) -> None:
+    """Cancel a background task and wait until it is done.
+
+    Args:
+        task (Optional[asyncio.Task[Any]]): Task to cancel, None is ignored.
+    """
+    if task is None:
+        return
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+"""Throughput benchmark of the update pipeline.
+
+Run it with `python -m tests.benchmark --help`.
+"""
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""This module is the command line of the benchmark."""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from tests.benchmark.runner import run_benchmark
+from tests.benchmark.updates import Distribution
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.benchmark",
+        description="Feed synthetic updates through the dispatcher "
+        "and report throughput, latency, queries and memory as JSON.",
+    )
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument(
+        "--chats",
+        type=int,
+        default=0,
+        help="number of group chats, 0 sends messages to private chats",
+    )
+    parser.add_argument(
+        "--distribution",
+        type=Distribution,
+        choices=list(Distribution),
+        default=Distribution.ZIPF,
+    )
+    parser.add_argument(
+        "--command-ratio",
+        type=float,
+        default=1.0,
+        help="share of /start commands, other messages match no handler",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="report the peak of Python allocations, slows the run down",
+    )
+    parser.add_argument("--output", type=Path, help="write the report to a file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the benchmark and print the report."""
+    args = parse_args(argv)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    report = asyncio.run(
+        run_benchmark(
+            updates=args.updates,
+            users=args.users,
+            chats=args.chats,
+            distribution=args.distribution,
+            command_ratio=args.command_ratio,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            trace_memory=args.trace_memory,
+        ),
+    )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""This module runs updates through the real dispatcher and measures them."""
+
+import asyncio
+import math
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Iterable
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.types import Update
+from tortoise import Tortoise, connections
+
+from tests.benchmark.session import RecordingSession
+from tests.benchmark.updates import Distribution, generate_updates
+
+from src.app import create_dispatcher
+from src.db.config import MODELS_MODULES
+from src.db.profiler import (
+    UpdateQueries,
+    background_queries,
+    current_update,
+    install_query_profiler,
+    uninstall_query_profiler,
+)
+from src.services.user_service import UserService
+
+DB_URL = "sqlite://:memory:"
+
+
+def percentile(sorted_values: list[float], rank: float) -> float:
+    """Return the nearest-rank percentile of sorted values.
+
+    It is the smallest value such that at least `rank` percent
+    of the values are lower or equal to it.
+    """
+    if not sorted_values:
+        return 0.0
+    index = math.ceil(len(sorted_values) * rank / 100) - 1
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
+
+
+async def feed_updates(
+    updates: Iterable[Update],
+    concurrency: int,
+) -> tuple[list[float], list[int], int, int]:
+    """Feed updates to the dispatcher built by create_dispatcher.
+
+    Args:
+        updates (Iterable[Update]): Updates to feed.
+        concurrency (int): Number of updates handled at once.
+
+    Returns:
+        tuple[list[float], list[int], int, int]: Latency in seconds and
+            number of queries of every update, the number of queries made
+            by background tasks, like batched writes, and the number of
+            API calls.
+    """
+    dp = create_dispatcher()
+    session = RecordingSession()
+    bot = Bot(
+        token="42:BENCHMARK",
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    latencies: list[float] = []
+    queries: list[int] = []
+    pending = iter(updates)
+
+    async def work() -> None:
+        for update in pending:
+            profile = UpdateQueries(update.update_id)
+            token = current_update.set(profile)
+            started_at = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            finally:
+                latencies.append(time.perf_counter() - started_at)
+                current_update.reset(token)
+                profile.closed = True
+                queries.append(profile.count)
+
+    background = background_queries.get()
+    await UserService.start_writer()
+    try:
+        await asyncio.gather(*(work() for _ in range(concurrency)))
+    finally:
+        await UserService.stop_writer()
+    background = int(background_queries.get() - background)
+    return latencies, queries, background, len(session.calls)
+
+
+async def measure(
+    updates: list[Update],
+    concurrency: int,
+    trace_memory: bool,
+) -> dict[str, Any]:
+    """Feed updates on a fresh in-memory SQLite database and measure them.
+
+    Args:
+        updates (list[Update]): Updates to feed.
+        concurrency (int): Number of updates handled at once.
+        trace_memory (bool): Whether to trace Python allocations.
+
+    Returns:
+        dict[str, Any]: Throughput, latency, query and memory results.
+    """
+    await Tortoise.init(db_url=DB_URL, modules={"models": MODELS_MODULES})
+    await Tortoise.generate_schemas()
+    install_query_profiler()
+    UserService.cache.clear()
+    if trace_memory:
+        tracemalloc.start()
+    started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    try:
+        latencies, queries, background, api_calls = await feed_updates(
+            updates,
+            concurrency,
+        )
+        duration = time.perf_counter() - started_at
+        cpu_time = time.process_time() - cpu_started_at
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        uninstall_query_profiler()
+        await connections.close_all()
+
+    latencies.sort()
+    return {
+        "duration_seconds": duration,
+        "updates_per_second": len(latencies) / duration if duration else 0.0,
+        "cpu_ms_per_update": cpu_time / len(latencies) * 1000 if latencies else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 50) * 1000,
+            "p90": percentile(latencies, 90) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": (latencies[-1] if latencies else 0.0) * 1000,
+        },
+        "queries_per_update": statistics.fmean(queries) if queries else 0.0,
+        "queries_max": max(queries, default=0),
+        "background_queries": background,
+        "background_queries_per_update": (
+            background / len(latencies) if latencies else 0.0
+        ),
+        "api_calls": api_calls,
+        "user_cache": UserService.cache.stats(),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": traced_peak / 2**20 if traced_peak is not None else None,
+    }
+
+
+async def run_benchmark(  # pylint: disable=too-many-arguments
+    updates: int,
+    users: int,
+    *,
+    chats: int = 0,
+    distribution: Distribution = Distribution.ZIPF,
+    command_ratio: float = 1.0,
+    concurrency: int = 16,
+    seed: int = 0,
+    trace_memory: bool = False,
+) -> dict[str, Any]:
+    """Run the benchmark on an in-memory SQLite database.
+
+    Args:
+        updates (int): Number of updates.
+        users (int): Number of distinct users.
+        chats (int): Number of group chats, 0 for private chats.
+        distribution (Distribution): Distribution of users over updates.
+        command_ratio (float): Share of updates handled by a command handler.
+        concurrency (int): Number of updates handled at once.
+        seed (int): Seed of the update generator.
+        trace_memory (bool): Whether to trace Python allocations, which
+            reports their peak but slows the run down.
+
+    Returns:
+        dict[str, Any]: Report with the parameters and the results.
+    """
+    generated = list(
+        generate_updates(
+            updates,
+            users,
+            chats=chats,
+            distribution=distribution,
+            command_ratio=command_ratio,
+            seed=seed,
+        ),
+    )
+    return {
+        "parameters": {
+            "updates": updates,
+            "users": users,
+            "chats": chats,
+            "distribution": distribution.value,
+            "command_ratio": command_ratio,
+            "concurrency": concurrency,
+            "seed": seed,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": sys.platform,
+        },
+        "results": await measure(generated, concurrency, trace_memory),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident memory of the process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux and in bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
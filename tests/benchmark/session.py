@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the fake bot session of the benchmark."""
+
+import datetime
+from typing import Any, AsyncGenerator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, Message
+
+
+class RecordingSession(BaseSession):
+    """Bot session recording the API calls instead of sending them.
+
+    Methods with a `chat_id` are answered with a sent message,
+    the others with True.
+
+    Attributes:
+        calls (list[TelegramMethod]): Recorded API calls.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.calls: list[TelegramMethod[Any]] = []
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: Optional[int] = None,
+    ) -> TelegramType:
+        """Record an API call and return a fake result."""
+        self.calls.append(method)
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return True  # type: ignore[return-value]
+        return Message(  # type: ignore[return-value]
+            message_id=len(self.calls),
+            date=datetime.datetime.now(datetime.timezone.utc),
+            chat=Chat(id=chat_id, type="private"),
+            text=getattr(method, "text", None),
+        )
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream nothing."""
+        yield b""
+
+    async def close(self) -> None:
+        """Nothing to close."""
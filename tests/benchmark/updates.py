@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""This module generates the synthetic updates of the benchmark."""
+
+import datetime
+import enum
+import itertools
+import random
+from typing import Iterator
+
+from aiogram.types import Chat, Message, Update, User
+
+
+class Distribution(str, enum.Enum):
+    """Possible distributions of users over updates."""
+
+    UNIFORM = "uniform"
+    ZIPF = "zipf"
+
+
+def pick_ids(
+    rng: random.Random,
+    count: int,
+    population: int,
+    distribution: Distribution,
+) -> list[int]:
+    """Pick ids from 1 to `population`.
+
+    With the zipf distribution the id of rank k is picked with
+    a probability proportional to 1 / k, so a few users are very active.
+
+    Args:
+        rng (random.Random): Random generator.
+        count (int): Number of picked ids.
+        population (int): Number of distinct ids.
+        distribution (Distribution): Distribution of the picks.
+
+    Returns:
+        list[int]: Picked ids.
+    """
+    ids = range(1, population + 1)
+    if distribution == Distribution.UNIFORM:
+        return rng.choices(ids, k=count)
+    weights = list(itertools.accumulate(1 / rank for rank in ids))
+    return rng.choices(ids, cum_weights=weights, k=count)
+
+
+def generate_updates(  # pylint: disable=too-many-arguments
+    count: int,
+    users: int,
+    *,
+    chats: int,
+    distribution: Distribution,
+    command_ratio: float,
+    seed: int,
+) -> Iterator[Update]:
+    """Generate message updates.
+
+    Args:
+        count (int): Number of updates.
+        users (int): Number of distinct users.
+        chats (int): Number of group chats, 0 sends every message
+            to the private chat of its user.
+        distribution (Distribution): Distribution of users over updates.
+        command_ratio (float): Share of /start commands, the other
+            messages match no handler.
+        seed (int): Seed of the random generator.
+
+    Yields:
+        Update: Generated updates.
+    """
+    rng = random.Random(seed)
+    date = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    user_ids = pick_ids(rng, count, users, distribution)
+    for update_id, user_id in enumerate(user_ids, start=1):
+        user = User(id=user_id, is_bot=False, first_name=f"User {user_id}")
+        if chats:
+            chat = Chat(id=-rng.randint(1, chats), type="group")
+        else:
+            chat = Chat(id=user_id, type="private")
+        text = "/start" if rng.random() < command_ratio else "hello"
+        yield Update(
+            update_id=update_id,
+            message=Message(
+                message_id=update_id,
+                date=date,
+                chat=chat,
+                from_user=user,
+                text=text,
+            ),
+        )
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains shared test fixtures."""
+
+from typing import AsyncIterator
+
+import pytest_asyncio
+from tortoise import Tortoise, connections
+
+from src.db.config import MODELS_MODULES
+
+
+def reset_connections() -> None:
+    """Forget connections and config left over by a previous Tortoise.init."""
+    # pylint: disable=protected-access
+    connections._clear_storage()
+    connections._db_config = None
+    Tortoise._inited = False
+
+
+@pytest_asyncio.fixture(scope="function")
+async def sqlite_database() -> AsyncIterator[None]:
+    """In-memory SQLite database with the project models."""
+    reset_connections()
+    await Tortoise.init(
+        db_url="sqlite://:memory:",
+        modules={"models": MODELS_MODULES},
+    )
+    await Tortoise.generate_schemas()
+    yield
+    await connections.close_all()
+    reset_connections()
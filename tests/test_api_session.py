@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains Bot API session tests against a stub API server."""
+
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from pytest_mock import MockFixture
+
+from src.client import session as session_module
+from src.client.session import (
+    InstrumentedSession,
+    api_errors,
+    api_latency,
+    create_session,
+)
+from src.metrics import registry
+
+TOKEN = "42:TEST"
+
+
+async def handle_method(request: web.Request) -> web.Response:
+    """Answer Bot API methods like Telegram does."""
+    method = request.match_info["method"]
+    if method == "getMe":
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {"id": 42, "is_bot": True, "first_name": "Stub"},
+            },
+        )
+    if method == "sendMessage":
+        return web.json_response(
+            {
+                "ok": False,
+                "error_code": 403,
+                "description": "Forbidden: bot was blocked by the user",
+            },
+            status=403,
+        )
+    await asyncio.sleep(1)
+    return web.json_response({"ok": True, "result": True})
+
+
+@pytest_asyncio.fixture(name="api_server")
+async def api_server_fixture() -> AsyncIterator[TestServer]:
+    """Local stub Bot API server."""
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle_method)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest_asyncio.fixture(name="bot")
+async def bot_fixture(api_server: TestServer) -> AsyncIterator[Bot]:
+    """Bot sending its requests to the stub server."""
+    session = InstrumentedSession(
+        api=TelegramAPIServer.from_base(str(api_server.make_url(""))),
+        limit=5,
+        keepalive_timeout=30.0,
+        method_timeouts={"deleteWebhook": 0.1},
+    )
+    bot = Bot(token=TOKEN, session=session)
+    yield bot
+    await bot.session.close()
+
+
+class TestInstrumentedSession:
+    """Instrumented session tests."""
+
+    @pytest.mark.asyncio
+    async def test_observes_request_duration(self, bot: Bot) -> None:
+        """Successful requests are timed per method and keep their connection."""
+        # Given
+        requests = api_latency.count("getMe")
+        # When
+        me = await bot.get_me()
+        # Then
+        assert me.first_name == "Stub"
+        assert api_latency.count("getMe") == requests + 1
+        assert "bot_api_connections_idle 1" in registry.render()
+
+    @pytest.mark.asyncio
+    async def test_counts_errors_by_class(self, bot: Bot) -> None:
+        """Failed requests are timed and counted with their error class."""
+        # Given
+        errors = api_errors.get("sendMessage", "TelegramForbiddenError")
+        requests = api_latency.count("sendMessage")
+        # When
+        with pytest.raises(TelegramForbiddenError):
+            await bot.send_message(chat_id=1, text="Hello")
+        # Then
+        assert api_errors.get("sendMessage", "TelegramForbiddenError") == errors + 1
+        assert api_latency.count("sendMessage") == requests + 1
+
+    @pytest.mark.asyncio
+    async def test_method_timeout(self, bot: Bot) -> None:
+        """A method with its own timeout fails after it."""
+        # Given
+        errors = api_errors.get("deleteWebhook", "TelegramNetworkError")
+        # When
+        with pytest.raises(TelegramNetworkError):
+            await bot.delete_webhook()
+        # Then
+        assert api_errors.get("deleteWebhook", "TelegramNetworkError") == errors + 1
+
+    def test_session_from_settings(self, mocker: MockFixture) -> None:
+        """The session uses the connection settings and the local API server."""
+        # Given
+        mocker.patch.multiple(
+            session_module.settings,
+            api_server_url="http://localhost:8081",
+            api_connection_limit=20,
+            api_dns_cache_ttl=60,
+            api_timeout=30.0,
+        )
+        # When
+        session = create_session()
+        # Then
+        assert session.api.base == "http://localhost:8081/bot{token}/{method}"
+        assert session.timeout == 30.0
+        assert session.connector_settings["limit"] == 20
+        assert session.connector_settings["ttl_dns_cache"] == 60
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains ban gate tests."""
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update, User
+from pytest_mock import MockFixture
+from tortoise import timezone
+
+from src import middlewares
+from src.db.models.user_model import UserModel
+from src.metrics import registry
+from src.middlewares.ban_middleware import BanMiddleware
+from src.services import user_service
+from src.services.ban_list import BanList, banned_updates
+from src.services.user_service import UserService
+
+
+@pytest.mark.usefixtures("sqlite_database", "users")
+class TestBanList:
+    """Ban list tests."""
+
+    @pytest_asyncio.fixture
+    async def users(self) -> None:
+        """Users 1 to 5, users 2 and 4 banned."""
+        await UserModel.bulk_create(
+            [
+                UserModel(id=user_id, is_banned=user_id % 2 == 0)
+                for user_id in range(1, 6)
+            ],
+        )
+
+    @pytest.mark.asyncio
+    async def test_loads_banned_users(self) -> None:
+        """Only the banned users are loaded."""
+        # Given
+        ban_list = BanList(interval=60.0)
+        # When
+        loaded = await ban_list.load()
+        # Then
+        assert loaded == 2
+        assert [user_id in ban_list for user_id in range(1, 6)] == [
+            False,
+            True,
+            False,
+            True,
+            False,
+        ]
+
+    @pytest.mark.asyncio
+    async def test_refresh_reads_changed_users(self) -> None:
+        """Bans made by another process are picked up by the refresh."""
+        # Given
+        ban_list = BanList(interval=60.0)
+        await ban_list.load()
+        await UserModel.filter(id=1).update(is_banned=True, updated_at=timezone.now())
+        await UserModel.filter(id=2).update(is_banned=False, updated_at=timezone.now())
+        # When
+        await ban_list.refresh()
+        # Then
+        assert 1 in ban_list
+        assert 2 not in ban_list
+        assert 4 in ban_list
+
+    @pytest.mark.asyncio
+    async def test_size_is_exposed_while_started(self) -> None:
+        """The number of banned users is a metric between start and stop."""
+        # Given
+        ban_list = BanList(interval=0)
+        # When
+        await ban_list.start()
+        started = registry.render()
+        await ban_list.stop()
+        # Then
+        assert "bot_banned_users_size 2" in started
+        assert "bot_banned_users_size" not in registry.render()
+
+    @pytest.mark.asyncio
+    async def test_user_service_update_applies_ban(self, mocker: MockFixture) -> None:
+        """A ban written by UserService is applied without a refresh."""
+        # Given
+        ban_list = mocker.patch.object(user_service, "ban_list", BanList(interval=0))
+        user, _ = await UserService.get_or_create(id=42, is_bot=False, first_name="J")
+        UserService.cache.clear()
+        # When
+        user.is_banned = True
+        await UserService.update(user=user)
+        # Then
+        assert 42 in ban_list
+
+
+class TestBanMiddleware:
+    """Ban middleware tests."""
+
+    @pytest.mark.asyncio
+    async def test_drops_banned_users(self, mocker: MockFixture) -> None:
+        """Updates of banned users never reach the handler."""
+        # Given
+        ban_list = BanList(interval=0)
+        ban_list.set(7, True)
+        middleware = BanMiddleware(ban_list)
+        handler = mocker.AsyncMock(return_value="handled")
+        banned = banned_updates.get()
+
+        async def feed(user_id: int) -> object:
+            user = User(id=user_id, is_bot=False, first_name="User")
+            return await middleware(
+                handler,
+                Update(update_id=user_id),
+                {"event_from_user": user},
+            )
+
+        # When
+        results = [await feed(7), await feed(8)]
+        # Then
+        assert results == [UNHANDLED, "handled"]
+        handler.assert_awaited_once()
+        assert banned_updates.get() == banned + 1
+
+    @pytest.mark.asyncio
+    async def test_banned_user_never_reads_fsm_state(self, mocker: MockFixture) -> None:
+        """An update of a banned user is dropped before the FSM storage is read."""
+        # Given
+        ban_list = BanList(interval=0)
+        ban_list.set(7, True)
+        mocker.patch.multiple(middlewares.settings, ban_gate=True, dedup_window=0)
+        mocker.patch.object(middlewares, "ban_list", ban_list)
+        storage = MemoryStorage()
+        get_state = mocker.spy(storage, "get_state")
+        dp = Dispatcher(storage=storage)
+        middlewares.setup_middlewares(dp)
+        bot = Bot(token="42:TEST")
+
+        async def feed(user_id: int) -> None:
+            message = {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+                "text": "hi",
+            }
+            await dp.feed_update(
+                bot,
+                Update.model_validate({"update_id": user_id, "message": message}),
+            )
+
+        # When
+        await feed(7)
+        await feed(8)
+        # Then
+        assert get_state.await_count == 1
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains benchmark harness tests."""
+
+from typing import Iterator
+
+import pytest
+
+from tests.benchmark.__main__ import parse_args
+from tests.benchmark.runner import percentile, run_benchmark
+from tests.benchmark.updates import Distribution, generate_updates
+from tests.conftest import reset_connections
+
+
+@pytest.fixture
+def clean_connections() -> Iterator[None]:
+    """Forget Tortoise state before and after the benchmark."""
+    reset_connections()
+    yield
+    reset_connections()
+
+
+class TestBenchmark:
+    """Benchmark harness tests."""
+
+    def test_updates_are_reproducible(self) -> None:
+        """The same seed generates the same updates."""
+        # When
+        first, second = (
+            list(
+                generate_updates(
+                    20,
+                    5,
+                    chats=2,
+                    distribution=Distribution.ZIPF,
+                    command_ratio=0.5,
+                    seed=1,
+                ),
+            )
+            for _ in range(2)
+        )
+        # Then
+        assert first == second
+        for update in first:
+            assert update.message is not None
+            assert update.message.from_user is not None
+            assert update.message.chat.type == "group"
+            assert 1 <= update.message.from_user.id <= 5
+
+    def test_percentile(self) -> None:
+        """Percentiles are taken from sorted values."""
+        # Given
+        values = [float(value) for value in range(1, 101)]
+        # Then
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile(values, 100) == 100.0
+        assert percentile(values, 0) == 1.0
+        assert percentile([], 50) == 0.0
+
+    def test_arguments_have_defaults(self) -> None:
+        """The benchmark runs without arguments."""
+        # When
+        args = parse_args([])
+        # Then
+        assert args.updates > 0
+        assert args.distribution == Distribution.ZIPF
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("clean_connections")
+    async def test_report(self) -> None:
+        """Updates go through the dispatcher and are reported."""
+        # When
+        report = await run_benchmark(updates=50, users=10, concurrency=4)
+        # Then
+        results = report["results"]
+        assert report["parameters"]["updates"] == 50
+        assert results["api_calls"] == 50
+        assert results["updates_per_second"] > 0
+        assert results["latency_ms"]["p50"] <= results["latency_ms"]["p99"]
+        assert 0 < results["queries_per_update"] <= results["queries_max"]
+        assert results["background_queries"] > 0
+        assert results["background_queries_per_update"] == pytest.approx(
+            results["background_queries"] / 50,
+        )
+        assert results["peak_rss_mb"] > 0
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains broadcast tests."""
+
+import asyncio
+from typing import Any, cast
+
+import pytest
+import pytest_asyncio
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendMessage
+from pytest_mock import MockFixture
+
+from src.db.models.broadcast_model import BroadcastModel, BroadcastStatus
+from src.db.models.user_model import UserModel
+from src.services.broadcast import Broadcaster
+
+
+def telegram_error(error_class: type, chat_id: int) -> Exception:
+    """Build a Telegram API error of a send to a chat."""
+    return error_class(SendMessage(chat_id=chat_id, text="News"), "error")
+
+
+@pytest.mark.usefixtures("sqlite_database", "users")
+class TestBroadcaster:
+    """Broadcaster tests."""
+
+    @pytest_asyncio.fixture
+    async def users(self) -> None:
+        """Users 1 to 7, user 3 blocked and user 5 banned."""
+        await UserModel.bulk_create(
+            [
+                UserModel(id=user_id, is_blocked=user_id == 3, is_banned=user_id == 5)
+                for user_id in range(1, 8)
+            ],
+        )
+
+    @pytest.mark.asyncio
+    async def test_sends_to_active_users_in_pages(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Every active user gets the message, one query per page."""
+        # Given
+        bot = mocker.Mock(send_message=mocker.AsyncMock())
+        broadcast = await BroadcastModel.create(text="News")
+        filter_spy = mocker.spy(UserModel, "filter")
+        # When
+        await Broadcaster(page_size=2, concurrency=2).run(bot, broadcast)
+        # Then
+        sent_to = sorted(
+            call.kwargs["chat_id"] for call in bot.send_message.call_args_list
+        )
+        assert sent_to == [1, 2, 4, 6, 7]
+        assert filter_spy.call_count == 4
+        saved = await BroadcastModel.get(id=broadcast.id)
+        assert saved.status == BroadcastStatus.FINISHED
+        assert (saved.sent, saved.failed, saved.blocked) == (5, 0, 0)
+        assert saved.last_user_id == 7
+
+    @pytest.mark.asyncio
+    async def test_marks_blocking_users(self, mocker: MockFixture) -> None:
+        """Users answering with 403 are marked as blocked, other errors are counted."""
+
+        # Given
+        async def send_message(chat_id: int, **_: Any) -> None:
+            if chat_id == 2:
+                raise telegram_error(TelegramForbiddenError, chat_id)
+            if chat_id == 4:
+                raise telegram_error(TelegramBadRequest, chat_id)
+
+        bot = mocker.Mock(send_message=send_message)
+        broadcast = await BroadcastModel.create(text="News")
+        # When
+        await Broadcaster(page_size=10, concurrency=10).run(bot, broadcast)
+        # Then
+        assert (broadcast.sent, broadcast.failed, broadcast.blocked) == (3, 1, 1)
+        blocked = await UserModel.filter(is_blocked=True).values_list("id", flat=True)
+        assert cast(list[int], blocked) == [2, 3]
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_checkpoint(self, mocker: MockFixture) -> None:
+        """An unfinished broadcast continues after its last saved user."""
+        # Given
+        bot = mocker.Mock(send_message=mocker.AsyncMock())
+        await BroadcastModel.create(
+            text="News",
+            status=BroadcastStatus.RUNNING,
+            last_user_id=4,
+            sent=3,
+        )
+        await BroadcastModel.create(text="Old", status=BroadcastStatus.FINISHED)
+        broadcaster = Broadcaster(page_size=10, concurrency=10)
+        # When
+        await broadcaster.resume(bot)
+        await broadcaster.join()
+        # Then
+        sent_to = [call.kwargs["chat_id"] for call in bot.send_message.call_args_list]
+        assert sorted(sent_to) == [6, 7]
+        resumed = await BroadcastModel.get(text="News")
+        assert resumed.status == BroadcastStatus.FINISHED
+        assert resumed.sent == 5
+
+    @pytest.mark.asyncio
+    async def test_stop_keeps_broadcast_resumable(self, mocker: MockFixture) -> None:
+        """An interrupted broadcast keeps its status and checkpoint."""
+        # Given
+        sent = asyncio.Event()
+
+        async def send_message(chat_id: int, **_: Any) -> None:
+            if chat_id == 2:
+                sent.set()
+                await asyncio.Event().wait()
+
+        bot = mocker.Mock(send_message=send_message)
+        broadcaster = Broadcaster(page_size=1, concurrency=1)
+        broadcast = await broadcaster.start(bot, "News")
+        await sent.wait()
+        # When
+        await broadcaster.stop()
+        # Then
+        saved = await BroadcastModel.get(id=broadcast.id)
+        assert saved.status == BroadcastStatus.RUNNING
+        assert saved.last_user_id == 1
+        assert len(broadcaster) == 0
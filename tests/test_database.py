@@ -2,6 +2,8 @@
 
 """This module is a database tests."""
 
+import copy
+
 import pytest
 from loguru import logger
 from pytest_mock import MockFixture
@@ -76,10 +78,10 @@ class TestDatabase:
     ) -> None:
         """Database URL in the configuration is invalid."""
         # Given
-        invalid_config = TORTOISE_CONFIG.copy()
+        invalid_config = copy.deepcopy(TORTOISE_CONFIG)
         invalid_config["connections"]["default"] = "invalid_url"
         # When
-        mocker.patch("src.db.config.TORTOISE_CONFIG", invalid_config)
+        mocker.patch("src.db.engine.TORTOISE_CONFIG", invalid_config)
         # Then
         with pytest.raises(ConfigurationError):
             await database_init()
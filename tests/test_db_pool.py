@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains database pool tests."""
+
+import asyncio
+from typing import Optional
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.db.config import TORTOISE_CONFIG
+from src.db.pool import MonitoredPool, PoolMonitor, warm_up_pools
+from src.services.user_upsert import warm_up_statements
+from src.settings import settings
+
+
+class FakePool:
+    """Pool with two connections answering acquire after a delay."""
+
+    def __init__(self) -> None:
+        self.idle = 2
+
+    async def acquire(self, *, timeout: Optional[float] = None) -> object:
+        """Connect after a delay."""
+        await asyncio.wait_for(asyncio.sleep(0.01), timeout)
+        self.idle -= 1
+        return object()
+
+    def get_size(self) -> int:
+        """Open connections."""
+        return 2
+
+    def get_idle_size(self) -> int:
+        """Idle connections."""
+        return self.idle
+
+    def get_min_size(self) -> int:
+        """Minimum size."""
+        return 1
+
+    def get_max_size(self) -> int:
+        """Maximum size."""
+        return 5
+
+
+class TestDatabasePool:
+    """Database pool tests."""
+
+    def test_pool_is_configured_from_settings(self) -> None:
+        """The default connection uses the credentials form with pool settings."""
+        # Given
+        default = TORTOISE_CONFIG["connections"]["default"]
+        # Then
+        assert default["engine"] == "src.db.pool"
+        assert default["credentials"]["minsize"] == settings.db_pool_min_size
+        assert default["credentials"]["maxsize"] == settings.db_pool_max_size
+        assert (
+            default["credentials"]["statement_cache_size"]
+            == settings.db_statement_cache_size
+        )
+
+    @pytest.mark.asyncio
+    async def test_monitor_reports_usage_and_wait_time(self) -> None:
+        """Acquired connections and wait times are reported."""
+        # Given
+        fake_pool = FakePool()
+        monitor = PoolMonitor("default", fake_pool)  # type: ignore[arg-type]
+        pool = MonitoredPool(fake_pool, monitor)  # type: ignore[arg-type]
+        # When
+        await asyncio.gather(pool.acquire(), pool.acquire(timeout=1))
+        stats = monitor.stats()
+        # Then
+        assert stats["size"] == 2
+        assert stats["in_use"] == 2
+        assert stats["idle"] == 0
+        assert stats["waiting"] == 0
+        assert stats["acquired"] == 2
+        assert stats["wait_time_max"] >= 0.01
+        assert stats["wait_time_avg"] >= 0.01
+
+    @pytest.mark.asyncio
+    async def test_failed_warm_up_does_not_raise(self, mocker: MockFixture) -> None:
+        """The pools are filled on demand when warming them up fails."""
+        # Given
+        mocker.patch("src.db.pool.connections.all", side_effect=OSError)
+        # When, Then
+        await warm_up_pools()
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("sqlite_database")
+    async def test_no_statements_are_prepared_on_sqlite(self) -> None:
+        """Statements are only prepared on PostgreSQL connections."""
+        # Then
+        assert not warm_up_statements()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains logging tests."""
+
+import io
+import logging
+from typing import Any
+
+from loguru import logger
+from pytest_mock import MockFixture
+
+from src import logs
+from src.logs import (
+    BackgroundSink,
+    ErrorAggregator,
+    InterceptHandler,
+    RateLimitedLog,
+)
+
+
+def raise_error(value: str) -> Exception:
+    """Raise and catch an error, returning it with its traceback."""
+    try:
+        if value == "key":
+            raise KeyError(value)
+        raise ValueError(value)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return error
+
+
+class TestLogging:
+    """Logging tests."""
+
+    def test_background_sink_writes_messages_in_order(self) -> None:
+        """Queued messages are written when the sink is stopped at the latest."""
+        # Given
+        stream = io.StringIO()
+        sink = BackgroundSink(stream, max_size=100)
+        # When
+        for index in range(10):
+            sink.write(f"{index}\n")
+        sink.stop()
+        # Then
+        assert stream.getvalue() == "".join(f"{index}\n" for index in range(10))
+        assert sink.dropped == 0
+
+    def test_background_sink_drops_messages_when_full(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Logging never waits for a full queue, the message is dropped."""
+        # Given
+        stream = io.StringIO()
+        sink = BackgroundSink(stream, max_size=1)
+        messages = sink._messages  # pylint: disable=protected-access
+        mocker.patch.object(messages, "put_nowait", side_effect=logs.queue.Full)
+        # When
+        sink.write("lost\n")
+        mocker.stopall()
+        sink.stop()
+        # Then
+        assert sink.dropped == 1
+        assert stream.getvalue() == "1 log messages were dropped\n"
+
+    def test_rate_limited_log_drops_repeated_messages(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """A template is logged once per interval with the dropped count."""
+        # Given
+        mocker.patch.object(logs, "_MIN_LEVEL_NO", logging.DEBUG)
+        monotonic = mocker.patch.object(logs.time, "monotonic", return_value=100.0)
+        messages: list[str] = []
+        handler_id = logger.add(messages.append, format="{message}", level="DEBUG")
+        rate_limited = RateLimitedLog(interval=1.0)
+        # When
+        for user_id in range(3):
+            rate_limited.debug("User {}", user_id)
+        monotonic.return_value = 101.5
+        rate_limited.debug("User {}", 3)
+        logger.remove(handler_id)
+        # Then
+        assert messages == ["User 0\n", "User 3 (2 similar messages dropped)\n"]
+
+    def test_rate_limited_log_skips_filtered_levels(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Nothing is logged or tracked below the configured level."""
+        # Given
+        mocker.patch.object(logs, "_MIN_LEVEL_NO", logging.INFO)
+        opt = mocker.patch.object(logger, "opt")
+        rate_limited = RateLimitedLog(interval=0)
+        # When
+        rate_limited.debug("User {}", 1)
+        # Then
+        opt.assert_not_called()
+        assert not rate_limited._last  # pylint: disable=protected-access
+
+    def test_intercept_handler_keeps_record_location(self) -> None:
+        """Standard records are logged with the location of their caller."""
+        # Given
+        records: list[dict[str, Any]] = []
+
+        def sink(message: Any) -> None:
+            records.append(message.record)
+
+        handler_id = logger.add(sink, level="DEBUG")
+        std_logger = logging.getLogger("tests.intercept")
+        std_logger.propagate = False
+        std_logger.addHandler(InterceptHandler())
+        std_logger.setLevel(logging.DEBUG)
+        # When
+        std_logger.info("Hello %s", "world")
+        logger.remove(handler_id)
+        # Then
+        assert len(records) == 1
+        record = records[0]
+        assert record["message"] == "Hello world"
+        assert record["level"].name == "INFO"
+        assert record["name"] == __name__
+        assert record["file"].path == __file__
+        assert record["function"] == "test_intercept_handler_keeps_record_location"
+
+
+class TestErrorAggregator:
+    """Error aggregation tests."""
+
+    def test_fingerprints_errors_by_type_and_frames(self) -> None:
+        """The same error raised twice shares a fingerprint, the message aside."""
+        # Given
+        aggregator = ErrorAggregator(interval=60.0, frames=3)
+        # When
+        first = aggregator.fingerprint(raise_error("one"))
+        second = aggregator.fingerprint(raise_error("two"))
+        other = aggregator.fingerprint(raise_error("key"))
+        # Then
+        assert first == second
+        assert first != other
+        assert len(first) == 8
+
+    def test_zero_frames_fingerprints_the_class_only(self) -> None:
+        """Without frames errors of a class share a fingerprint wherever raised."""
+        # Given
+        aggregator = ErrorAggregator(interval=60.0, frames=0)
+
+        def raise_elsewhere() -> Exception:
+            try:
+                raise ValueError("elsewhere")
+            except ValueError as error:
+                return error
+
+        # When
+        fingerprints = {
+            aggregator.fingerprint(raise_error("one")),
+            aggregator.fingerprint(raise_elsewhere()),
+        }
+        # Then
+        assert len(fingerprints) == 1
+        assert aggregator.fingerprint(raise_error("key")) not in fingerprints
+
+    def test_fingerprint_ignores_install_path(self) -> None:
+        """The same code installed at another path keeps its fingerprint."""
+        # Given
+        aggregator = ErrorAggregator(interval=60.0, frames=1)
+        source = "def fail():\n    raise ValueError('x')\n"
+        fingerprints = set()
+        # When
+        for path in ("/srv/bot/src/jobs.py", "/home/dev/bot/src/jobs.py"):
+            namespace: dict[str, Any] = {"__name__": "src.jobs"}
+            exec(compile(source, path, "exec"), namespace)  # pylint: disable=exec-used
+            try:
+                namespace["fail"]()
+            except ValueError as error:
+                fingerprints.add(aggregator.fingerprint(error))
+        # Then
+        assert len(fingerprints) == 1
+
+    def test_repeats_are_summarized(self) -> None:
+        """Only the first occurrence is logged in full, repeats are counted."""
+        # Given
+        aggregator = ErrorAggregator(interval=60.0, frames=3, max_examples=2)
+        messages: list[str] = []
+        handler_id = logger.add(messages.append, format="{message}", level="DEBUG")
+        # When
+        results = [
+            aggregator.record(raise_error("db"), update_id) for update_id in range(4)
+        ]
+        summarized = aggregator.summarize()
+        # Then
+        fingerprint = results[0][0]
+        assert [is_first for _, is_first in results] == [True, False, False, False]
+        assert summarized == 1
+        assert messages == [
+            f"Error {fingerprint} (ValueError) repeated 3 times, updates 1, 2\n",
+        ]
+        # When the error stays quiet for an interval
+        assert aggregator.summarize() == 0
+        logger.remove(handler_id)
+        # Then it is forgotten and logged in full again
+        assert len(aggregator) == 0
+        assert aggregator.record(raise_error("db"), 5) == (fingerprint, True)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains metrics tests."""
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.handlers.error_handler import setup_errors
+from src.metrics import (
+    MetricsRegistry,
+    handle_metrics,
+    handler_errors,
+    handler_latency,
+    handlers_in_flight,
+    timed,
+)
+from src.middlewares.metrics_middleware import MetricsMiddleware
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "text": "hi",
+    },
+}
+
+
+class TestMetrics:
+    """Metrics tests."""
+
+    def test_counter_and_gauge_are_rendered(self) -> None:
+        """Series are rendered with their labels, label values are escaped."""
+        # Given
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests.", labels=("path",))
+        gauge = registry.gauge("temperature", "Temperature.")
+        # When
+        counter.inc('/a"b')
+        counter.inc('/a"b', amount=2)
+        gauge.set(value=1.5)
+        # Then
+        assert registry.render().splitlines() == [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{path="/a\\"b"} 3',
+            "# HELP temperature Temperature.",
+            "# TYPE temperature gauge",
+            "temperature 1.5",
+        ]
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        """Histogram buckets count every value below their bound."""
+        # Given
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "latency_seconds",
+            "Latency.",
+            labels=("handler",),
+            buckets=(0.1, 1.0),
+        )
+        # When
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "start")
+        # Then
+        assert registry.render().splitlines()[2:] == [
+            'latency_seconds_bucket{handler="start",le="0.1"} 2',
+            'latency_seconds_bucket{handler="start",le="1.0"} 3',
+            'latency_seconds_bucket{handler="start",le="+Inf"} 4',
+            'latency_seconds_sum{handler="start"} 3.65',
+            'latency_seconds_count{handler="start"} 4',
+        ]
+        assert histogram.count("start") == 4
+
+    def test_collectors_are_rendered_as_gauges(self) -> None:
+        """Collector values are exposed and failing collectors are skipped."""
+        # Given
+        registry = MetricsRegistry(prefix="bot")
+        registry.register_collector("cache", lambda: {"size": 2})
+        registry.register_collector("broken", lambda: 1 / 0)  # type: ignore[arg-type,return-value]
+        # When
+        lines = registry.render().splitlines()
+        # Then
+        assert lines == ["# TYPE bot_cache_size gauge", "bot_cache_size 2"]
+
+    @pytest.mark.asyncio
+    async def test_timed_observes_duration(self) -> None:
+        """The duration of a coroutine is observed even when it fails."""
+        # Given
+        histogram = MetricsRegistry().histogram("duration", "Duration.", ("name",))
+
+        @timed(histogram, "failing")
+        async def failing() -> None:
+            raise ValueError
+
+        # When
+        with pytest.raises(ValueError):
+            await failing()
+        # Then
+        assert histogram.count("failing") == 1
+
+    @pytest.mark.asyncio
+    async def test_middleware_measures_handlers(self) -> None:
+        """Handler calls are measured per event type and handler."""
+        # Given
+        dp = Dispatcher()
+        dp.message.middleware.register(MetricsMiddleware("message"))
+        in_flight = []
+
+        @dp.message()
+        async def echo_handler(_: object) -> None:
+            in_flight.append(handlers_in_flight.get("message", labels[1]))
+
+        labels = ("message", echo_handler.__qualname__)
+        count = handler_latency.count(*labels)
+        # When
+        await dp.feed_update(Bot(token="42:TEST"), Update.model_validate(UPDATE))
+        # Then
+        assert handler_latency.count(*labels) == count + 1
+        assert in_flight == [1]
+        assert handlers_in_flight.get(*labels) == 0
+
+    @pytest.mark.asyncio
+    async def test_error_handler_counts_errors(self) -> None:
+        """Exceptions reaching the error handler are counted."""
+        # Given
+        dp = Dispatcher()
+        setup_errors(dp)
+
+        @dp.message()
+        async def failing_handler(_: object) -> None:
+            raise KeyError
+
+        errors = handler_errors.get("message", "KeyError")
+        # When
+        await dp.feed_update(Bot(token="42:TEST"), Update.model_validate(UPDATE))
+        # Then
+        assert handler_errors.get("message", "KeyError") == errors + 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self) -> None:
+        """The endpoint serves the metrics in Prometheus text format."""
+        # Given
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        # When
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get("/metrics")
+            body = await response.text()
+        # Then
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "# TYPE bot_handler_duration_seconds histogram" in body
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains long polling tests."""
+
+from typing import Any, AsyncGenerator
+
+import pytest
+from aiogram import Dispatcher
+from aiogram.types import Update
+from aiogram.utils.backoff import BackoffConfig
+from pydantic import ValidationError
+from pytest_mock import MockFixture
+
+from src.runners import polling
+from src.runners.polling import listen_updates, poll, poll_batch_size, poll_latency
+from src.settings import Settings
+
+FAST_BACKOFF = BackoffConfig(min_delay=0.01, max_delay=0.02, factor=1.1, jitter=0.0)
+
+
+class TestPolling:
+    """Long polling tests."""
+
+    @pytest.mark.asyncio
+    async def test_listen_updates_observes_requests(self, mocker: MockFixture) -> None:
+        """Batches are yielded in order, failed requests are retried."""
+        # Given
+        bot = mocker.AsyncMock(
+            side_effect=[
+                [Update(update_id=1), Update(update_id=2)],
+                ConnectionError("network"),
+                [Update(update_id=3)],
+            ],
+        )
+        bot.session.timeout = 60
+        requests = poll_latency.count()
+        batches = poll_batch_size.count()
+        # When
+        updates = listen_updates(
+            bot,
+            allowed_updates=["message"],
+            polling_timeout=5,
+            limit=2,
+            backoff_config=FAST_BACKOFF,
+        )
+        received = [(await anext(updates)).update_id for _ in range(3)]
+        await updates.aclose()
+        # Then
+        assert received == [1, 2, 3]
+        get_updates = bot.await_args.args[0]
+        assert (get_updates.limit, get_updates.timeout) == (2, 5)
+        assert get_updates.allowed_updates == ["message"]
+        assert get_updates.offset == 3
+        assert bot.await_args.kwargs == {"request_timeout": 65}
+        assert poll_latency.count() == requests + 2
+        assert poll_batch_size.count() == batches + 2
+
+    @pytest.mark.asyncio
+    async def test_poll_requests_handled_update_types(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Only the update types with handlers are requested."""
+        # Given
+        dp = Dispatcher()
+
+        async def handler(_: object) -> None:
+            pass
+
+        async def middleware(*_: object) -> None:
+            pass
+
+        dp.message.register(handler)
+        dp.callback_query.middleware.register(middleware)
+        bot = mocker.AsyncMock()
+        sink = mocker.AsyncMock()
+        calls: list[dict[str, Any]] = []
+
+        async def fake_listen(
+            _: object,
+            **kwargs: Any,
+        ) -> AsyncGenerator[Update, None]:
+            calls.append(kwargs)
+            yield Update(update_id=1)
+
+        mocker.patch.object(polling, "listen_updates", fake_listen)
+        mocker.patch.multiple(polling.settings, polling_timeout=20, polling_limit=50)
+        # When
+        await poll(dp, bot, sink)
+        # Then
+        assert calls == [
+            {"allowed_updates": ["message"], "polling_timeout": 20, "limit": 50},
+        ]
+        sink.put.assert_awaited_once_with(Update(update_id=1))
+        sink.stop.assert_awaited_once()
+        bot.session.close.assert_awaited_once()
+
+    @pytest.mark.parametrize(
+        "options",
+        [{"polling_limit": 0}, {"polling_limit": 101}, {"polling_timeout": -1}],
+    )
+    def test_settings_reject_invalid_values(self, options: dict[str, int]) -> None:
+        """Limits outside the Bot API range fail when the settings are read."""
+        with pytest.raises(ValidationError):
+            Settings.model_validate(options)
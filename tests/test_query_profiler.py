@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains query profiler tests."""
+
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import pytest
+import pytest_asyncio
+from aiogram.types import Update
+from loguru import logger
+from pytest_mock import MockFixture
+from tortoise.backends.asyncpg.client import TransactionWrapper
+
+from src.db import profiler
+from src.db.models.user_model import UserModel
+from src.db.pool import MonitoredAsyncpgClient
+from src.db.profiler import (
+    UpdateQueries,
+    create_untracked_task,
+    current_update,
+    install_query_profiler,
+    params_shape,
+    uninstall_query_profiler,
+)
+from src.middlewares.query_profiler_middleware import QueryProfilerMiddleware
+
+UPDATE = Update(update_id=7)
+
+
+@pytest_asyncio.fixture
+async def profiled_database(
+    sqlite_database: None,  # pylint: disable=unused-argument
+) -> AsyncIterator[None]:
+    """In-memory SQLite database with the query profiler installed."""
+    install_query_profiler()
+    yield
+    uninstall_query_profiler()
+
+
+@pytest.fixture(name="asyncpg_client")
+def asyncpg_client_fixture(mocker: MockFixture) -> Iterator[MonitoredAsyncpgClient]:
+    """Monitored asyncpg client with the query profiler installed."""
+    client = MonitoredAsyncpgClient(connection_name="default", database="bot")
+    mocker.patch.object(profiler.connections, "all", return_value=[client])
+    install_query_profiler()
+    yield client
+    uninstall_query_profiler()
+
+
+async def create_users(count: int) -> None:
+    """Create users one query at a time."""
+    for user_id in range(count):
+        await UserModel.create(id=user_id, first_name="A")
+
+
+@pytest.mark.usefixtures("profiled_database")
+class TestQueryProfiler:
+    """Query profiler tests."""
+
+    def test_params_shape(self) -> None:
+        """Parameters are described without their values."""
+        # Then
+        assert params_shape(None) == "no parameters"
+        assert params_shape([1, "secret"]) == "2 parameters"
+        assert params_shape([[1, 2], [3, 4], [5, 6]]) == "3 rows of 2 parameters"
+
+    @pytest.mark.asyncio
+    async def test_queries_are_counted_per_update(self) -> None:
+        """Queries made by the handler are attributed to the update."""
+        # Given
+        middleware = QueryProfilerMiddleware(budget=0)
+        seen: list[Optional[UpdateQueries]] = []
+
+        async def handler(*_: Any) -> None:
+            await create_users(3)
+            seen.append(current_update.get())
+
+        # When
+        await middleware(handler, UPDATE, {})
+        await UserModel.all().count()
+        # Then
+        assert len(seen) == 1
+        update = seen[0]
+        assert update is not None
+        assert update.update_id == 7
+        assert update.count == 3
+        assert update.duration > 0
+        assert update.closed
+        assert current_update.get() is None
+
+    @pytest.mark.asyncio
+    async def test_update_over_budget_is_reported(self) -> None:
+        """An update making more queries than the budget is logged."""
+        # Given
+        middleware = QueryProfilerMiddleware(budget=2)
+        messages: list[str] = []
+        handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+        exceeded = profiler.query_budget_exceeded.get()
+
+        async def handler(*_: Any) -> None:
+            await create_users(3)
+
+        # When
+        await middleware(handler, UPDATE, {})
+        logger.remove(handler_id)
+        # Then
+        assert profiler.query_budget_exceeded.get() == exceeded + 1
+        assert messages[0].startswith("Update 7 made 3 queries in")
+        assert messages[0].endswith("over the budget of 2\n")
+
+    @pytest.mark.asyncio
+    async def test_slow_query_is_logged(self, mocker: MockFixture) -> None:
+        """Queries above the threshold are logged with their parameters shape."""
+        # Given
+        mocker.patch.object(profiler.settings, "db_slow_query", 0.0)
+        messages: list[str] = []
+        handler_id = logger.add(messages.append, level="WARNING", format="{message}")
+        # When
+        await create_users(1)
+        logger.remove(handler_id)
+        # Then
+        assert len(messages) == 1
+        message = messages[0]
+        assert message.startswith("Slow query in update - took")
+        assert "parameters: INSERT INTO" in message
+        assert "'A'" not in message
+
+    @pytest.mark.asyncio
+    async def test_profiler_is_installed_once(self) -> None:
+        """Installing the profiler twice does not count queries twice."""
+        # Given
+        install_query_profiler()
+        middleware = QueryProfilerMiddleware(budget=0)
+        seen: list[Optional[UpdateQueries]] = []
+
+        async def handler(*_: Any) -> None:
+            await create_users(1)
+            seen.append(current_update.get())
+
+        # When
+        await middleware(handler, UPDATE, {})
+        # Then
+        update = seen[0]
+        assert update is not None
+        assert update.count == 1
+
+    @pytest.mark.asyncio
+    async def test_untracked_task_is_not_charged(self) -> None:
+        """Queries of a background task started by a handler are counted apart."""
+        # Given
+        middleware = QueryProfilerMiddleware(budget=0)
+        seen: list[Optional[UpdateQueries]] = []
+        background = profiler.background_queries.get()
+
+        async def handler(*_: Any) -> None:
+            await create_untracked_task(create_users(2))
+            await UserModel.all().count()
+            seen.append(current_update.get())
+
+        # When
+        await middleware(handler, UPDATE, {})
+        # Then
+        update = seen[0]
+        assert update is not None
+        assert update.count == 1
+        assert profiler.background_queries.get() == background + 2
+
+
+class TestAsyncpgProfiler:
+    """Query profiler tests on the default PostgreSQL client."""
+
+    @pytest.mark.asyncio
+    async def test_monitored_client_queries_are_counted(
+        self,
+        mocker: MockFixture,
+        asyncpg_client: MonitoredAsyncpgClient,
+    ) -> None:
+        """Queries of the client and of its transactions are counted."""
+        # Given
+        connection = mocker.Mock(
+            fetch=mocker.AsyncMock(return_value=[]),
+            executemany=mocker.AsyncMock(),
+        )
+        acquire = mocker.MagicMock()
+        acquire.return_value.__aenter__.return_value = connection
+        transaction = TransactionWrapper(asyncpg_client)
+        mocker.patch.object(asyncpg_client, "acquire_connection", acquire)
+        mocker.patch.object(transaction, "acquire_connection", acquire)
+        middleware = QueryProfilerMiddleware(budget=0)
+        seen: list[Optional[UpdateQueries]] = []
+
+        async def handler(*_: Any) -> None:
+            await asyncpg_client.execute_query_dict("SELECT 1")
+            await transaction.execute_many("INSERT INTO t VALUES ($1)", [[1], [2]])
+            seen.append(current_update.get())
+
+        # When
+        await middleware(handler, UPDATE, {})
+        # Then
+        update = seen[0]
+        assert update is not None
+        assert update.count == 2
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains outgoing rate limit tests."""
+
+import asyncio
+from typing import cast
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+from pytest_mock import MockFixture
+
+from src.client import rate_limit
+from src.client.rate_limit import (
+    RateLimiter,
+    SendPriority,
+    TokenBucket,
+    retry_after_errors,
+    send_priority,
+)
+
+
+def create_limiter(**kwargs: float) -> RateLimiter:
+    """Create a rate limiter with fast defaults."""
+    options = {
+        "rate": 1000.0,
+        "chat_rate": 1000.0,
+        "group_rate": 1000.0,
+        "burst": 1,
+        "max_retries": 2,
+        **kwargs,
+    }
+    return RateLimiter(**options)  # type: ignore[arg-type]
+
+
+class TestTokenBucket:
+    """Token bucket tests."""
+
+    def test_reservations_wait_in_turn(self, mocker: MockFixture) -> None:
+        """Reserved tokens make later reservations wait longer."""
+        # Given
+        mocker.patch.object(rate_limit.time, "monotonic", return_value=100.0)
+        bucket = TokenBucket(rate=2.0, capacity=2.0)
+        # When
+        delays = [bucket.reserve() for _ in range(4)]
+        # Then
+        assert delays == [0.0, 0.0, 0.5, 1.0]
+
+    def test_pause_delays_next_token(self, mocker: MockFixture) -> None:
+        """A paused bucket hands out no token for the pause."""
+        # Given
+        monotonic = mocker.patch.object(rate_limit.time, "monotonic")
+        monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=1.0, capacity=5.0)
+        # When
+        bucket.pause(3)
+        # Then
+        assert bucket.delay() == 4.0
+        monotonic.return_value = 104.0
+        assert bucket.delay() == 0.0
+
+
+class TestRateLimiter:
+    """Rate limiter tests."""
+
+    @pytest.mark.asyncio
+    async def test_global_queue_is_served_by_priority(self) -> None:
+        """Queued high priority sends go before earlier low priority ones."""
+        # Given
+        limiter = create_limiter(rate=20.0)
+        limiter.global_bucket.tokens = 0
+        order: list[str] = []
+
+        async def send(name: str, priority: SendPriority) -> None:
+            await limiter.acquire(None, priority)
+            order.append(name)
+
+        # When
+        low = asyncio.create_task(send("low", SendPriority.LOW))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(send("high", SendPriority.HIGH))
+        await asyncio.gather(low, high)
+        # Then
+        assert order == ["high", "low"]
+        assert len(limiter) == 0
+
+    @pytest.mark.asyncio
+    async def test_chat_bucket_spaces_sends(self) -> None:
+        """Sends to the same chat wait for the chat bucket."""
+        # Given
+        limiter = create_limiter(chat_rate=20.0)
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        # When
+        for _ in range(3):
+            await limiter.acquire(42)
+        # Then
+        assert loop.time() - started_at >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_retried(self, mocker: MockFixture) -> None:
+        """A flood control error pauses the chat and retries the send."""
+        # Given
+        limiter = create_limiter()
+        method = SendMessage(chat_id=42, text="Hello")
+        make_request = mocker.AsyncMock(
+            side_effect=[TelegramRetryAfter(method, "Too Many Requests", 0), "sent"],
+        )
+        errors = retry_after_errors.get("sendMessage")
+        # When
+        with send_priority(SendPriority.LOW):
+            result = await limiter(make_request, None, method)  # type: ignore[arg-type]
+        # Then
+        assert cast(object, result) == "sent"
+        assert make_request.await_count == 2
+        assert retry_after_errors.get("sendMessage") == errors + 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_raised_after_max_retries(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """The error is raised once the retries are used up."""
+        # Given
+        limiter = create_limiter(max_retries=1)
+        method = SendMessage(chat_id=42, text="Hello")
+        make_request = mocker.AsyncMock(
+            side_effect=TelegramRetryAfter(method, "Too Many Requests", 0),
+        )
+        # When, Then
+        with pytest.raises(TelegramRetryAfter):
+            await limiter(make_request, None, method)  # type: ignore[arg-type]
+        assert make_request.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_other_methods_are_not_limited(self, mocker: MockFixture) -> None:
+        """Methods that send no message skip the buckets."""
+        # Given
+        limiter = create_limiter()
+        acquire = mocker.spy(limiter, "acquire")
+        make_request = mocker.AsyncMock(return_value="me")
+        # When
+        result = await limiter(make_request, None, GetMe())  # type: ignore[arg-type]
+        # Then
+        assert cast(object, result) == "me"
+        acquire.assert_not_called()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains read replica routing tests."""
+
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockFixture
+from tortoise import Tortoise, connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.utils import get_schema_sql
+
+from tests.conftest import reset_connections
+
+from src.db import routing
+from src.db.config import MODELS_MODULES, REPLICA_CONNECTION, get_replica_connection
+from src.db.models.user_model import UserModel
+from src.db.routing import ReplicaRouter
+from src.services.user_service import UserService
+
+TG_USER = {"id": 42, "is_bot": False, "first_name": "John"}
+
+
+@pytest_asyncio.fixture
+async def replicated_database(
+    tmp_path: Path,
+    mocker: MockFixture,
+) -> AsyncIterator[None]:
+    """Two SQLite databases standing in for the primary and the replica."""
+    reset_connections()
+    await Tortoise.init(
+        config={
+            "connections": {
+                "default": f"sqlite://{tmp_path / 'primary.db'}",
+                REPLICA_CONNECTION: f"sqlite://{tmp_path / 'replica.db'}",
+            },
+            "apps": {
+                "models": {
+                    "models": MODELS_MODULES,
+                    "default_connection": "default",
+                },
+            },
+        },
+    )
+    await Tortoise.generate_schemas()
+    await connections.get(REPLICA_CONNECTION).execute_script(
+        get_schema_sql(connections.get("default"), safe=True),
+    )
+    mocker.patch.object(
+        UserService,
+        "router",
+        ReplicaRouter(replica=REPLICA_CONNECTION, window=5.0),
+    )
+    UserService.cache.clear()
+    yield
+    UserService.cache.clear()
+    await connections.close_all()
+    reset_connections()
+
+
+def replica() -> BaseDBAsyncClient:
+    """Return the replica connection."""
+    return connections.get(REPLICA_CONNECTION)
+
+
+@pytest.mark.usefixtures("replicated_database")
+class TestReplicaRouting:
+    """Read replica routing tests."""
+
+    @pytest.mark.asyncio
+    async def test_user_is_read_from_replica(self) -> None:
+        """A user present on the replica is not looked up on the primary."""
+        # Given
+        await UserModel.create(id=42, first_name="John", using_db=replica())
+        # When
+        user, is_created = await UserService.get_or_create(**TG_USER)
+        # Then
+        assert not is_created
+        assert user.id == 42
+        assert await UserModel.filter(id=42).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_missing_user_is_created_on_primary(self) -> None:
+        """A user missing on the replica is created on the primary."""
+        # When
+        user, is_created = await UserService.get_or_create(**TG_USER)
+        # Then
+        assert is_created
+        assert await UserModel.filter(id=user.id).exists()
+        assert UserService.router.db_for_read(user.id) is None
+
+    @pytest.mark.asyncio
+    async def test_outdated_profile_is_read_from_primary(self) -> None:
+        """A user whose profile changed is got from the primary."""
+        # Given
+        await UserModel.create(id=42, first_name="Old", using_db=replica())
+        await UserModel.create(id=42, first_name="John")
+        # When
+        user, is_created = await UserService.get_or_create(**TG_USER)
+        # Then
+        assert not is_created
+        assert user.first_name == "John"
+
+    @pytest.mark.asyncio
+    async def test_recent_write_is_read_from_primary(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Reads stay on the primary for the window after a write."""
+        # Given
+        monotonic = mocker.patch.object(routing.time, "monotonic", return_value=100.0)
+        await UserModel.create(id=42, first_name="John", using_db=replica())
+        await UserModel.create(id=42, first_name="John")
+        user, _ = await UserService.get_or_create(**TG_USER)
+        user.is_blocked = True
+        await UserService.update(user)
+        # When
+        fresh, _ = await UserService.get_or_create(**TG_USER)
+        UserService.cache.clear()
+        monotonic.return_value = 106.0
+        stale, _ = await UserService.get_or_create(**TG_USER)
+        # Then
+        assert fresh.is_blocked is True
+        assert stale.is_blocked is False
+
+
+class TestReplicaRouter:
+    """Replica router tests."""
+
+    def test_without_replica_reads_go_to_primary(self) -> None:
+        """Nothing is tracked when no replica is configured."""
+        # Given
+        router = ReplicaRouter(replica=None, window=5.0)
+        # When
+        router.mark_written(1)
+        # Then
+        assert router.db_for_read(1) is None
+        assert len(router) == 0
+
+    def test_expired_writes_are_forgotten(self, mocker: MockFixture) -> None:
+        """Writes older than the window are dropped on the next write."""
+        # Given
+        monotonic = mocker.patch.object(routing.time, "monotonic", return_value=0.0)
+        router = ReplicaRouter(replica=REPLICA_CONNECTION, window=5.0)
+        router.mark_written(1)
+        router.mark_written(2)
+        # When
+        monotonic.return_value = 10.0
+        router.mark_written(3)
+        # Then
+        assert len(router) == 1
+
+    def test_postgres_replica_uses_pool_settings(self) -> None:
+        """A PostgreSQL replica uses the monitored client and pool settings."""
+        # When
+        connection = get_replica_connection("postgres://u:p@replica:5432/bot")
+        # Then
+        assert connection["engine"] == "src.db.pool"
+        assert connection["credentials"]["host"] == "replica"
+        assert "maxsize" in connection["credentials"]
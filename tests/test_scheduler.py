@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains update scheduler tests."""
+
+import asyncio
+from typing import Any
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from pytest_mock import MockFixture
+
+from src.runners.scheduler import UpdateScheduler, resolve_chat_id
+
+
+def make_update(update_id: int, chat_id: int) -> dict[str, Any]:
+    """Return a raw message update sent to a chat."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": "hi",
+        },
+    }
+
+
+def make_scheduler(
+    mocker: MockFixture,
+    max_in_flight: int = 4,
+    high_water: int = 100,
+) -> UpdateScheduler:
+    """Return a scheduler in front of a mocked dispatcher."""
+    dispatcher = mocker.AsyncMock(spec=Dispatcher)
+    dispatcher.workflow_data = {}
+    dispatcher.feed_update.return_value = None
+    return UpdateScheduler(
+        dispatcher=dispatcher,
+        bot=Bot(token="42:TEST"),
+        max_in_flight=max_in_flight,
+        high_water=high_water,
+    )
+
+
+class TestUpdateScheduler:
+    """Update scheduler tests."""
+
+    def test_resolve_chat_id(self) -> None:
+        """Parsed and raw updates resolve to the same chat."""
+        # Given
+        raw = make_update(1, 7)
+        inline = {"update_id": 2, "inline_query": {"from": {"id": 9}}}
+        # Then
+        assert resolve_chat_id(raw) == 7
+        assert resolve_chat_id(Update.model_validate(raw)) == 7
+        assert resolve_chat_id(inline) == 9
+        assert resolve_chat_id({"update_id": 3}) == 0
+
+    @pytest.mark.asyncio
+    async def test_chat_order_is_preserved(self, mocker: MockFixture) -> None:
+        """Updates of a chat are handled one at a time in arrival order."""
+        # Given
+        scheduler = make_scheduler(mocker)
+        handled: list[int] = []
+        running: set[int] = set()
+
+        async def feed_update(_: Bot, update: Update) -> None:
+            chat_id = update.message.chat.id  # type: ignore[union-attr]
+            assert chat_id not in running
+            running.add(chat_id)
+            await asyncio.sleep(0.001 * (update.update_id % 3))
+            handled.append(update.update_id)
+            running.discard(chat_id)
+
+        scheduler.dispatcher.feed_update.side_effect = feed_update  # type: ignore[attr-defined]
+        await scheduler.start()
+        # When
+        for update_id in range(12):
+            await scheduler.put(make_update(update_id, chat_id=update_id % 2))
+        await scheduler.stop(timeout=1)
+        # Then
+        assert [i for i in handled if i % 2 == 0] == list(range(0, 12, 2))
+        assert [i for i in handled if i % 2 == 1] == list(range(1, 12, 2))
+
+    @pytest.mark.asyncio
+    async def test_slow_chat_does_not_block_others(self, mocker: MockFixture) -> None:
+        """Updates of other chats are handled while one chat is busy."""
+        # Given
+        scheduler = make_scheduler(mocker, max_in_flight=2)
+        release = asyncio.Event()
+        handled: list[int] = []
+
+        async def feed_update(_: Bot, update: Update) -> None:
+            if update.update_id == 0:
+                await release.wait()
+            handled.append(update.update_id)
+
+        scheduler.dispatcher.feed_update.side_effect = feed_update  # type: ignore[attr-defined]
+        await scheduler.start()
+        # When
+        await scheduler.put(make_update(0, chat_id=1))
+        await scheduler.put(make_update(1, chat_id=1))
+        await scheduler.put(make_update(2, chat_id=2))
+        await asyncio.sleep(0.01)
+        # Then
+        assert handled == [2]
+        release.set()
+        await scheduler.stop(timeout=1)
+        assert handled == [2, 0, 1]
+
+    @pytest.mark.asyncio
+    async def test_in_flight_is_capped(self, mocker: MockFixture) -> None:
+        """No more than max in flight updates are handled at once."""
+        # Given
+        scheduler = make_scheduler(mocker, max_in_flight=3)
+        peak: float = 0
+
+        async def feed_update(*_: Any) -> None:
+            nonlocal peak
+            peak = max(peak, scheduler.stats()["in_flight"])
+            await asyncio.sleep(0.005)
+
+        scheduler.dispatcher.feed_update.side_effect = feed_update  # type: ignore[attr-defined]
+        await scheduler.start()
+        # When
+        for update_id in range(20):
+            await scheduler.put(make_update(update_id, chat_id=update_id))
+        await scheduler.stop(timeout=1)
+        # Then
+        assert peak == 3
+        assert scheduler.stats()["processed"] == 20
+
+    @pytest.mark.asyncio
+    async def test_high_water_applies_backpressure(self, mocker: MockFixture) -> None:
+        """Submit is refused and put waits once the high-water mark is reached."""
+        # Given
+        scheduler = make_scheduler(mocker, max_in_flight=1, high_water=2)
+        release = asyncio.Event()
+
+        async def feed_update(*_: Any) -> None:
+            await release.wait()
+
+        scheduler.dispatcher.feed_update.side_effect = feed_update  # type: ignore[attr-defined]
+        await scheduler.start()
+        # When
+        accepted = [scheduler.submit(make_update(i, chat_id=1)) for i in range(3)]
+        put = asyncio.create_task(scheduler.put(make_update(3, chat_id=1)))
+        await asyncio.sleep(0.01)
+        # Then
+        assert accepted == [True, True, False]
+        assert len(scheduler) == 2
+        assert not put.done()
+        release.set()
+        await asyncio.wait_for(put, timeout=1)
+        await scheduler.stop(timeout=1)
+        assert scheduler.stats()["processed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_update_does_not_stop_workers(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """An exception raised by a handler is logged and the chat goes on."""
+        # Given
+        scheduler = make_scheduler(mocker, max_in_flight=1)
+        scheduler.dispatcher.feed_update.side_effect = [  # type: ignore[attr-defined]
+            ValueError("boom"),
+            None,
+        ]
+        await scheduler.start()
+        # When
+        await scheduler.put(make_update(1, chat_id=1))
+        await scheduler.put(make_update(2, chat_id=1))
+        await scheduler.stop(timeout=1)
+        # Then
+        assert scheduler.stats()["processed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_update_does_not_stop_workers(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """A raw update failing validation is dropped and the workers go on."""
+        # Given
+        scheduler = make_scheduler(mocker, max_in_flight=2)
+        await scheduler.start()
+        # When
+        for update_id in (1, 2):
+            await scheduler.put(
+                {"update_id": update_id, "message": {"chat": {"id": update_id}}},
+            )
+        await scheduler.put(make_update(3, chat_id=3))
+        await scheduler.stop(timeout=1)
+        # Then
+        assert scheduler.stats()["processed"] == 3
+        scheduler.dispatcher.feed_update.assert_awaited_once()  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_put_requires_start(self, mocker: MockFixture) -> None:
+        """Putting an update into a stopped scheduler fails."""
+        # Given
+        scheduler = make_scheduler(mocker)
+        # Then
+        assert not scheduler.submit(make_update(1, chat_id=1))
+        with pytest.raises(RuntimeError):
+            await scheduler.put(make_update(1, chat_id=1))
+
+    @pytest.mark.asyncio
+    async def test_scheduler_runs_dispatcher_lifecycle(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Starting and stopping the scheduler runs the lifecycle handlers."""
+        # Given
+        scheduler = make_scheduler(mocker)
+        # When
+        await scheduler.start()
+        await scheduler.stop(timeout=1)
+        # Then
+        scheduler.dispatcher.emit_startup.assert_awaited_once()  # type: ignore[attr-defined]
+        scheduler.dispatcher.emit_shutdown.assert_awaited_once()  # type: ignore[attr-defined]
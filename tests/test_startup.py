@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains startup profile tests."""
+
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+from loguru import logger
+from pytest_mock import MockFixture
+
+from src import startup
+from src.schemas import user_scheme
+from src.settings import settings
+from src.startup import ImportTimer, StartupProfile
+
+
+class TestStartupProfile:
+    """Startup profile tests."""
+
+    def test_marks_close_phases_once(self, mocker: MockFixture) -> None:
+        """Every mark records the time since the previous one."""
+        # Given
+        perf_counter = mocker.patch.object(startup.time, "perf_counter")
+        perf_counter.return_value = 10.0
+        profile = StartupProfile()
+        # When
+        perf_counter.return_value = 10.5
+        profile.mark("imports")
+        perf_counter.return_value = 10.75
+        profile.mark("dispatcher")
+        perf_counter.return_value = 11.0
+        profile.mark("imports")
+        # Then
+        assert profile.phases == {"imports": 0.5, "dispatcher": 0.25}
+        assert profile.total == 0.75
+
+    def test_finish_logs_report_once(self, mocker: MockFixture) -> None:
+        """The report is logged after the first update when enabled."""
+        # Given
+        mocker.patch.object(settings, "startup_profile", True)
+        messages: list[str] = []
+        handler_id = logger.add(messages.append, format="{message}", level="INFO")
+        profile = StartupProfile()
+        profile.mark("imports")
+        # When
+        profile.finish()
+        profile.finish()
+        profile.mark("late")
+        logger.remove(handler_id)
+        # Then
+        assert profile.done
+        assert list(profile.phases) == ["imports", "first update"]
+        assert len(messages) == 1
+        assert "first update" in messages[0]
+        assert "total" in messages[0]
+
+    def test_finish_is_silent_when_disabled(self, mocker: MockFixture) -> None:
+        """Nothing is logged unless the startup profile is enabled."""
+        # Given
+        mocker.patch.object(settings, "startup_profile", False)
+        messages: list[str] = []
+        handler_id = logger.add(messages.append, format="{message}", level="INFO")
+        # When
+        StartupProfile().finish()
+        logger.remove(handler_id)
+        # Then
+        assert not messages
+
+    def test_import_timer_records_self_times(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Nested imports are excluded from the self time of a module."""
+        # Given
+        package = tmp_path / "timed_package"
+        package.mkdir()
+        (package / "__init__.py").write_text("from timed_package import child\n")
+        (package / "child.py").write_text("VALUE = 1\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+        timer = ImportTimer()
+        # When
+        timer.install()
+        try:
+            importlib.import_module("timed_package")
+        finally:
+            timer.uninstall()
+            sys.modules.pop("timed_package", None)
+            sys.modules.pop("timed_package.child", None)
+        # Then
+        assert set(timer.self_times) == {"timed_package", "timed_package.child"}
+        assert list(timer.by_package()) == ["timed_package"]
+        assert timer not in sys.meta_path
+
+
+class TestLazySchemas:
+    """Lazy schema creation tests."""
+
+    def test_schema_is_created_once(self) -> None:
+        """The schema class is created on first access and reused."""
+        # When
+        create_user_schema = user_scheme.CreateUserSchema
+        # Then
+        assert user_scheme.CreateUserSchema is create_user_schema
+        assert "created_at" not in create_user_schema.model_fields
+
+    def test_unknown_attribute_raises(self) -> None:
+        """Only the schema is created on attribute access."""
+        with pytest.raises(AttributeError):
+            user_scheme.UserSchema  # noqa: B018  # pylint: disable=pointless-statement
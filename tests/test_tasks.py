@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains background task helper tests."""
+
+import asyncio
+
+import pytest
+
+from src.tasks import cancel_task
+
+
+class TestCancelTask:
+    """Background task cancellation tests."""
+
+    @pytest.mark.asyncio
+    async def test_task_is_cancelled_and_awaited(self) -> None:
+        """The task is done when the helper returns."""
+        # Given
+        task = asyncio.create_task(asyncio.Event().wait())
+        # When
+        await cancel_task(task)
+        # Then
+        assert task.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_missing_task_is_ignored(self) -> None:
+        """No task means nothing to cancel."""
+        await cancel_task(None)
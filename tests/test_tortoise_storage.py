@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains database FSM storage tests."""
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from pytest_mock import MockFixture
+
+from src.db.models.fsm_model import FSMStateModel
+from src.storages.tortoise_storage import TortoiseStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+class Form(StatesGroup):
+    """Test states."""
+
+    name = State()
+
+
+@pytest.mark.usefixtures("sqlite_database")
+class TestTortoiseStorage:
+    """Database FSM storage tests."""
+
+    @pytest.mark.asyncio
+    async def test_state_and_data_survive_restart(self) -> None:
+        """Closed storage writes state and data read by a new storage."""
+        # Given
+        storage = TortoiseStorage(flush_interval=60)
+        await storage.set_state(KEY, Form.name)
+        await storage.update_data(KEY, {"name": "John"})
+        # When
+        await storage.close()
+        restarted = TortoiseStorage(flush_interval=60)
+        # Then
+        assert await restarted.get_state(KEY) == Form.name.state
+        assert await restarted.get_data(KEY) == {"name": "John"}
+        await restarted.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_are_coalesced_until_flush(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Hot keys are read from memory and written once per flush."""
+        # Given
+        storage = TortoiseStorage(flush_interval=60)
+        spy_get = mocker.spy(FSMStateModel, "get_or_none")
+        spy_upsert = mocker.spy(TortoiseStorage, "_upsert")
+        # When
+        for step in range(5):
+            await storage.set_data(KEY, {"step": step})
+            await storage.get_state(KEY)
+        assert await FSMStateModel.all().count() == 0
+        await storage.flush()
+        # Then
+        assert spy_get.call_count == 1
+        assert spy_upsert.call_count == 1
+        assert (await FSMStateModel.get()).data == {"step": 4}
+        await storage.close()
+
+    @pytest.mark.asyncio
+    async def test_cleared_key_is_deleted(self) -> None:
+        """A key without state and data is removed from the table."""
+        # Given
+        storage = TortoiseStorage(flush_interval=60)
+        await storage.set_state(KEY, Form.name)
+        await storage.flush()
+        # When
+        await storage.set_state(KEY, None)
+        await storage.close()
+        # Then
+        assert await FSMStateModel.all().count() == 0
+
+    @pytest.mark.asyncio
+    async def test_only_clean_keys_are_evicted(self) -> None:
+        """Keys waiting to be written are never evicted from memory."""
+        # Given
+        storage = TortoiseStorage(flush_interval=60, cache_size=0)
+        # When
+        await storage.set_data(KEY, {"a": 1})
+        # Then
+        assert await storage.get_data(KEY) == {"a": 1}
+        await storage.close()
+        assert await storage.get_data(KEY) == {"a": 1}
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_key_is_evicted(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """A full memory layer drops the clean key used least recently."""
+        # Given
+        storage = TortoiseStorage(flush_interval=60, cache_size=1)
+        other = StorageKey(bot_id=1, chat_id=4, user_id=4)
+        await storage.get_state(KEY)
+        await storage.get_state(other)
+        spy_get = mocker.spy(FSMStateModel, "get_or_none")
+        # When
+        await storage.get_state(other)
+        await storage.get_state(KEY)
+        # Then
+        assert spy_get.call_count == 1
+        await storage.close()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains duplicate update tests."""
+
+from datetime import timedelta
+from typing import cast
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+from pytest_mock import MockFixture
+from tortoise import timezone
+
+from src import middlewares
+from src.db.models.update_mark_model import UpdateMarkModel
+from src.middlewares.dedup_middleware import DedupMiddleware
+from src.services.update_dedup import (
+    UpdateDeduplicator,
+    UpdateWindow,
+    duplicate_updates,
+)
+
+
+def create_dedup(**kwargs: object) -> UpdateDeduplicator:
+    """Create a deduplicator saving its mark."""
+    options: dict[str, object] = {
+        "window_size": 10,
+        "persist": True,
+        "interval": 60.0,
+        "mark_ttl": 3600.0,
+        **kwargs,
+    }
+    return UpdateDeduplicator(**options)  # type: ignore[arg-type]
+
+
+class TestUpdateWindow:
+    """Update window tests."""
+
+    def test_forgets_oldest_ids(self) -> None:
+        """Ids are remembered until the window is full."""
+        # Given
+        window = UpdateWindow(size=3)
+        # When
+        added = [window.add(update_id) for update_id in (1, 2, 1, 3, 4)]
+        # Then
+        assert added == [True, True, False, True, True]
+        assert 1 not in window
+        assert len(window) == 3
+        assert window.add(1)
+
+
+class TestDedupMiddleware:
+    """Duplicate update middleware tests."""
+
+    @pytest.mark.asyncio
+    async def test_drops_duplicates(self, mocker: MockFixture) -> None:
+        """A redelivered update never reaches the handler."""
+        # Given
+        dedup = create_dedup()
+        middleware = DedupMiddleware(dedup)
+        handler = mocker.AsyncMock(return_value="handled")
+        duplicates = duplicate_updates.get()
+        # When
+        results = [
+            await middleware(handler, Update(update_id=update_id), {})
+            for update_id in (7, 8, 7)
+        ]
+        # Then
+        assert results == ["handled", "handled", UNHANDLED]
+        assert handler.await_count == 2
+        assert duplicate_updates.get() == duplicates + 1
+        assert dedup.handled == 8
+
+    @pytest.mark.asyncio
+    async def test_duplicate_never_reads_fsm_state(self, mocker: MockFixture) -> None:
+        """A duplicate is dropped before the FSM storage is read."""
+        # Given
+        mocker.patch.object(middlewares.settings, "dedup_window", 10)
+        mocker.patch.object(middlewares, "update_dedup", create_dedup())
+        storage = MemoryStorage()
+        get_state = mocker.spy(storage, "get_state")
+        dp = Dispatcher(storage=storage)
+        middlewares.setup_middlewares(dp)
+        update = Update.model_validate(
+            {
+                "update_id": 7,
+                "message": {
+                    "message_id": 1,
+                    "date": 0,
+                    "chat": {"id": 1, "type": "private"},
+                    "from": {"id": 1, "is_bot": False, "first_name": "A"},
+                    "text": "hi",
+                },
+            },
+        )
+        bot = Bot(token="42:TEST")
+        # When
+        await dp.feed_update(bot, update)
+        await dp.feed_update(bot, update)
+        # Then
+        assert get_state.await_count == 1
+
+
+@pytest.mark.usefixtures("sqlite_database")
+class TestUpdateDeduplicator:
+    """Update mark persistence tests."""
+
+    @pytest.mark.asyncio
+    async def test_mark_survives_restart(self, mocker: MockFixture) -> None:
+        """Updates handled before a restart are duplicates after it."""
+        # Given
+        bot = mocker.Mock(id=42)
+        dedup = create_dedup()
+        await dedup.start(bot)
+        for update_id in (100, 101):
+            dedup.seen(update_id)
+            dedup.done(update_id)
+        await dedup.stop()
+        # When
+        restarted = create_dedup()
+        await restarted.start(bot)
+        await restarted.stop()
+        # Then
+        assert restarted.seen(100)
+        assert restarted.seen(101)
+        assert not restarted.seen(102)
+        marks = await UpdateMarkModel.all().values_list("update_id", flat=True)
+        assert cast(list[int], marks) == [101]
+
+    @pytest.mark.asyncio
+    async def test_ignores_outdated_mark(self) -> None:
+        """A mark older than its ttl is not used."""
+        # Given
+        await UpdateMarkModel.create(key="42:MainProcess", update_id=500)
+        await UpdateMarkModel.filter(key="42:MainProcess").update(
+            updated_at=timezone.now() - timedelta(hours=2),
+        )
+        dedup = create_dedup()
+        # When
+        await dedup.load("42:MainProcess")
+        # Then
+        assert not dedup.seen(10)
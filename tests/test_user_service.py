@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains user service tests."""
+
+from typing import Iterator
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.db.models.user_model import UserModel
+from src.services.user_service import UserCache, UserService
+
+TG_USER = {
+    "id": 42,
+    "is_bot": False,
+    "first_name": "John",
+    "last_name": "Doe",
+    "username": "johndoe",
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache() -> Iterator[None]:
+    """Start every test with an empty user cache."""
+    UserService.cache.clear()
+    yield
+    UserService.cache.clear()
+
+
+@pytest.mark.usefixtures("sqlite_database")
+class TestUserService:
+    """User service tests."""
+
+    @pytest.mark.asyncio
+    async def test_loaded_user_has_no_changed_fields(self) -> None:
+        """A freshly loaded user is clean."""
+        # When
+        user, is_created = await UserService.get_or_create(**TG_USER)
+        # Then
+        assert is_created
+        assert user.changed_fields == frozenset()
+
+    @pytest.mark.asyncio
+    async def test_assigning_same_value_does_not_mark_field(self) -> None:
+        """Assigning the current value does not mark the field as changed."""
+        # Given
+        user, _ = await UserService.get_or_create(**TG_USER)
+        # When
+        user.first_name = "John"
+        # Then
+        assert user.changed_fields == frozenset()
+
+    @pytest.mark.asyncio
+    async def test_update_skips_database_for_unchanged_user(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Update does not touch the database when nothing changed."""
+        # Given
+        user, _ = await UserService.get_or_create(**TG_USER)
+        mock_filter = mocker.spy(UserModel, "filter")
+        # When
+        await UserService.update(user=user)
+        # Then
+        mock_filter.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_update_writes_only_changed_fields(self) -> None:
+        """Update persists the changed fields and marks the user clean."""
+        # Given
+        user, _ = await UserService.get_or_create(**TG_USER)
+        await UserModel.filter(id=user.id).update(first_name="Jane")
+        user.is_blocked = True
+        # When
+        await UserService.update(user=user)
+        # Then
+        db_user = await UserModel.get(id=user.id)
+        assert db_user.is_blocked is True
+        assert db_user.first_name == "Jane"
+        assert user.changed_fields == frozenset()
+
+    @pytest.mark.asyncio
+    async def test_cached_user_is_served_without_database(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """A known user with an unchanged profile is served from the cache."""
+        # Given
+        await UserService.get_or_create(**TG_USER)
+        mock_get_or_create = mocker.spy(UserService, "_get_or_create_in_db")
+        # When
+        user, is_created = await UserService.get_or_create(**TG_USER)
+        # Then
+        mock_get_or_create.assert_not_called()
+        assert not is_created
+        assert user.username == TG_USER["username"]
+        assert UserService.cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_changed_profile_goes_to_database(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """A profile differing from the cached copy is a cache miss."""
+        # Given
+        await UserService.get_or_create(**TG_USER)
+        mock_get_or_create = mocker.patch.object(
+            UserService,
+            "_get_or_create_in_db",
+            side_effect=RuntimeError("database"),
+        )
+        # When, Then
+        with pytest.raises(RuntimeError):
+            await UserService.get_or_create(**{**TG_USER, "username": "jdoe"})
+        mock_get_or_create.assert_called_once()
+        assert UserService.cache.stats()["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_changed_profile_is_refreshed_and_cached(self) -> None:
+        """A changed profile is written once, then served from the cache."""
+        # Given
+        await UserService.get_or_create(**TG_USER)
+        renamed = {**TG_USER, "first_name": "Johnny"}
+        # When
+        await UserService.get_or_create(**renamed)
+        user, is_created = await UserService.get_or_create(**renamed)
+        # Then
+        assert not is_created
+        assert user.first_name == "Johnny"
+        assert (await UserModel.get(id=user.id)).first_name == "Johnny"
+        assert UserService.cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_invalidates_cached_user(self) -> None:
+        """Writing a user drops it from the cache."""
+        # Given
+        user, _ = await UserService.get_or_create(**TG_USER)
+        user.is_banned = True
+        # When
+        await UserService.update(user=user)
+        # Then
+        assert UserService.cache.get(user.id) is None
+
+
+class TestUserCache:
+    """User cache tests."""
+
+    def test_evicts_least_recently_used_user(self) -> None:
+        """The least recently used user is evicted when the cache is full."""
+        # Given
+        cache = UserCache(max_size=2, ttl=60)
+        cache.set(1, {"id": 1})
+        cache.set(2, {"id": 2})
+        cache.get(1)
+        # When
+        cache.set(3, {"id": 3})
+        # Then
+        assert cache.get(2) is None
+        assert cache.get(1) == {"id": 1}
+        assert cache.stats()["evictions"] == 1
+
+    def test_expired_user_is_dropped(self, mocker: MockFixture) -> None:
+        """An entry older than the ttl is not returned."""
+        # Given
+        mock_time = mocker.patch("time.monotonic", return_value=100.0)
+        cache = UserCache(max_size=2, ttl=60)
+        cache.set(1, {"id": 1})
+        # When
+        mock_time.return_value = 161.0
+        # Then
+        assert cache.get(1) is None
+        assert len(cache) == 0
+
+    def test_zero_size_disables_cache(self) -> None:
+        """A cache without capacity stores nothing."""
+        # Given
+        cache = UserCache(max_size=0, ttl=60)
+        # When
+        cache.set(1, {"id": 1})
+        # Then
+        assert cache.get(1) is None
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains users import and export tests."""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockFixture
+
+from src.db import engine
+from src.db.models.user_model import UserModel
+from src.db.transfer import (
+    TransferFormat,
+    decode_value,
+    export_users,
+    import_users,
+)
+
+
+@pytest.mark.usefixtures("sqlite_database", "users")
+class TestUserTransfer:
+    """Users import and export tests."""
+
+    @pytest_asyncio.fixture
+    async def users(self) -> None:
+        """Five users, one with an empty profile."""
+        await UserModel.bulk_create(
+            [
+                UserModel(id=1),
+                *(
+                    UserModel(
+                        id=user_id,
+                        first_name=f"Имя {user_id}",
+                        username=f"user_{user_id}",
+                        is_banned=user_id == 3,
+                    )
+                    for user_id in range(2, 6)
+                ),
+            ],
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("file_format", list(TransferFormat))
+    async def test_export_import_round_trip(
+        self,
+        tmp_path: Path,
+        file_format: TransferFormat,
+    ) -> None:
+        """Exported users are imported back unchanged."""
+        # Given
+        path = tmp_path / f"users.{file_format.value}"
+        fields = ("id", "first_name", "last_name", "username", "is_banned")
+        expected = await UserModel.all().order_by("id").values_list(*fields)
+        created_at = (
+            await UserModel.all()
+            .order_by("id")
+            .values_list(
+                "created_at",
+                flat=True,
+            )
+        )
+        # When
+        exported = await export_users(path, file_format, chunk_size=2)
+        await UserModel.all().delete()
+        imported = await import_users(path, file_format, chunk_size=2)
+        # Then
+        assert exported == imported == 5
+        assert await UserModel.all().order_by("id").values_list(*fields) == expected
+        assert (
+            await UserModel.all().order_by("id").values_list("created_at", flat=True)
+            == created_at
+        )
+
+    @pytest.mark.asyncio
+    async def test_import_updates_existing_users(self, tmp_path: Path) -> None:
+        """Users already in the table are updated, new ones are created."""
+        # Given
+        path = tmp_path / "users.ndjson"
+        path.write_text(
+            '{"id": 2, "username": "renamed", "is_blocked": true}\n'
+            "\n"
+            '{"id": 9, "first_name": "New"}\n',
+            encoding="utf-8",
+        )
+        # When
+        await import_users(path, TransferFormat.NDJSON)
+        # Then
+        renamed = await UserModel.get(id=2)
+        assert (renamed.username, renamed.is_blocked) == ("renamed", True)
+        assert (await UserModel.get(id=9)).first_name == "New"
+        assert await UserModel.all().count() == 6
+
+    @pytest.mark.asyncio
+    async def test_last_row_of_a_user_wins(self, tmp_path: Path) -> None:
+        """A user listed twice gets the values of its last row."""
+        # Given
+        path = tmp_path / "users.ndjson"
+        path.write_text(
+            '{"id": 9, "first_name": "First"}\n{"id": 9, "first_name": "Last"}\n',
+            encoding="utf-8",
+        )
+        # When
+        await import_users(path, TransferFormat.NDJSON)
+        # Then
+        assert (await UserModel.get(id=9)).first_name == "Last"
+
+
+class TestTransferFormat:
+    """Transfer format tests."""
+
+    def test_decodes_postgres_csv_values(self) -> None:
+        """Values written by PostgreSQL COPY are read back."""
+        assert decode_value("is_banned", "t") is True
+        assert decode_value("is_banned", "f") is False
+        assert decode_value("username", "") is None
+        assert decode_value("created_at", "2024-05-01 10:00:00.5+03") == datetime(
+            2024,
+            5,
+            1,
+            10,
+            0,
+            0,
+            500000,
+            tzinfo=timezone(timedelta(hours=3)),
+        )
+
+    def test_format_from_path(self) -> None:
+        """The format is guessed from the file extension."""
+        assert TransferFormat.from_path(Path("users.CSV")) == TransferFormat.CSV
+        assert TransferFormat.from_path(Path("users.jsonl")) == TransferFormat.NDJSON
+        with pytest.raises(ValueError):
+            TransferFormat.from_path(Path("users.xml"))
+
+    def test_command_line(self, mocker: MockFixture) -> None:
+        """The command line runs the requested transfer."""
+        # Given
+        mock_import = mocker.patch.object(engine, "import_users")
+        # When
+        engine.main(["import", "users.jsonl", "--chunk-size", "10"])
+        # Then
+        mock_import.assert_called_once_with(Path("users.jsonl"), None, 10)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains batched user upsert tests."""
+
+import asyncio
+from typing import Any
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.db.models.user_model import UserModel
+from src.services import user_upsert
+from src.services.user_upsert import (
+    UserUpsertBatcher,
+    build_returning_upsert_query,
+    upsert_user,
+    upsert_users,
+)
+
+
+def user_values(user_id: int) -> dict[str, Any]:
+    """Field values of a test user."""
+    return {
+        "id": user_id,
+        "first_name": f"User {user_id}",
+        "last_name": None,
+        "username": f"user{user_id}",
+    }
+
+
+@pytest.mark.usefixtures("sqlite_database")
+class TestUpsertUsers:
+    """Multi-row upsert tests."""
+
+    @pytest.mark.asyncio
+    async def test_creates_missing_and_returns_existing_users(self) -> None:
+        """Existing users are returned, missing users are created."""
+        # Given
+        await UserModel.create(**user_values(1), is_banned=True)
+        # When
+        results = await upsert_users([user_values(1), user_values(2)])
+        # Then
+        existing, is_existing_created = results[1]
+        created, is_created = results[2]
+        assert not is_existing_created
+        assert existing.is_banned is True
+        assert is_created
+        assert created.username == "user2"
+        assert created.is_blocked is False
+        assert await UserModel.all().count() == 2
+
+    @pytest.mark.asyncio
+    async def test_refreshes_changed_profile(self) -> None:
+        """A changed profile is written, an unchanged one keeps updated_at."""
+        # Given
+        await UserModel.bulk_create(
+            [UserModel(**user_values(1)), UserModel(**user_values(2))],
+        )
+        before = dict(await UserModel.all().values_list("id", "updated_at"))
+        renamed = {**user_values(1), "username": "renamed", "last_name": "Doe"}
+        # When
+        results = await upsert_users([renamed, user_values(2)])
+        # Then
+        user, is_created = results[1]
+        assert not is_created
+        assert (user.username, user.last_name) == ("renamed", "Doe")
+        after = dict(await UserModel.all().values_list("id", "updated_at"))
+        assert after[1] > before[1]
+        assert after[2] == before[2]
+
+    @pytest.mark.asyncio
+    async def test_single_user_fast_path(self, mocker: MockFixture) -> None:
+        """A lone user is upserted without Tortoise get_or_create."""
+        # Given
+        spy_get_or_create = mocker.spy(UserModel, "get_or_create")
+        # When
+        created = await upsert_user(user_values(1))
+        existing = await upsert_user(user_values(1))
+        # Then
+        assert created[1] is True
+        assert existing[1] is False
+        assert existing[0].username == "user1"
+        spy_get_or_create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_users_are_written_in_id_order(self, mocker: MockFixture) -> None:
+        """Rows are sent sorted by id, so batches lock them in the same order."""
+        # Given
+        spy_params = mocker.spy(user_upsert, "prepare_params")
+        # When
+        await upsert_users([user_values(user_id) for user_id in (3, 1, 2)])
+        # Then
+        usernames = [user_values(user_id)["username"] for user_id in (1, 2, 3)]
+        params = spy_params.spy_return
+        assert [value for value in params if value in usernames] == usernames
+
+    def test_postgres_query_refreshes_profile(self) -> None:
+        """The PostgreSQL upsert updates the profile and flags inserted rows."""
+        # When
+        query = build_returning_upsert_query(["id", "username"], 1)
+        # Then
+        assert query.startswith(
+            'INSERT INTO "users" ("id", "username") VALUES ($1, $2)'
+        )
+        assert '"username" = EXCLUDED."username"' in query
+        assert '"users"."username" IS DISTINCT FROM EXCLUDED."username"' in query
+        assert query.endswith('RETURNING *, (xmax = 0) AS "created"')
+
+
+@pytest.mark.usefixtures("sqlite_database")
+class TestUserUpsertBatcher:
+    """Upsert batcher tests."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_upsert(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Requests issued together are written with a single upsert."""
+        # Given
+        batcher = UserUpsertBatcher(window=0.01, max_size=100)
+        spy_upsert = mocker.spy(user_upsert, "upsert_users")
+        # When
+        results = await asyncio.gather(
+            *(batcher.get_or_create(user_values(user_id)) for user_id in range(1, 6)),
+            batcher.get_or_create(user_values(1)),
+        )
+        # Then
+        spy_upsert.assert_called_once()
+        assert [user.id for user, _ in results] == [1, 2, 3, 4, 5, 1]
+        assert all(is_created for _, is_created in results)
+
+    @pytest.mark.asyncio
+    async def test_latest_profile_of_a_user_is_written(self) -> None:
+        """Requests for the same user in a batch write the latest profile."""
+        # Given
+        batcher = UserUpsertBatcher(window=0.01, max_size=100)
+        renamed = {**user_values(1), "username": "renamed"}
+        # When
+        results = await asyncio.gather(
+            batcher.get_or_create(user_values(1)),
+            batcher.get_or_create(renamed),
+        )
+        # Then
+        assert [user.username for user, _ in results] == ["renamed", "renamed"]
+        assert (await UserModel.get(id=1)).username == "renamed"
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_flushed_immediately(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Reaching the max size flushes without waiting for the window."""
+        # Given
+        batcher = UserUpsertBatcher(window=60, max_size=2)
+        spy_upsert = mocker.spy(user_upsert, "upsert_users")
+        # When
+        await asyncio.wait_for(
+            asyncio.gather(*(batcher.get_or_create(user_values(i)) for i in range(4))),
+            timeout=5,
+        )
+        # Then
+        assert spy_upsert.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_upsert_is_raised_to_every_waiter(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """A database error is propagated to all requests of the batch."""
+        # Given
+        batcher = UserUpsertBatcher(window=0.01, max_size=100)
+        mocker.patch.object(
+            user_upsert,
+            "upsert_users",
+            side_effect=ConnectionError("database"),
+        )
+        # When
+        results = await asyncio.gather(
+            batcher.get_or_create(user_values(1)),
+            batcher.get_or_create(user_values(2)),
+            return_exceptions=True,
+        )
+        # Then
+        assert all(isinstance(result, ConnectionError) for result in results)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains user view tests."""
+
+from src.schemas.user_view import USER_FIELDS, UserView
+
+
+class TestUserView:
+    """User view tests."""
+
+    def test_changed_fields_compare_with_snapshot(self) -> None:
+        """Only fields differing from the loaded values are changed."""
+        # Given
+        user = UserView(id=1, first_name="John", username="john")
+        # When
+        user.is_blocked = True
+        user.username = "jdoe"
+        user.username = "john"
+        # Then
+        assert user.changed_fields == frozenset({"is_blocked"})
+
+    def test_mark_clean_takes_new_snapshot(self) -> None:
+        """Saved values are no longer reported as changed."""
+        # Given
+        user = UserView(id=1)
+        user.is_banned = True
+        # When
+        user.mark_clean()
+        # Then
+        assert user.changed_fields == frozenset()
+
+    def test_as_dict_round_trips(self) -> None:
+        """A view built from its values is equal field by field and clean."""
+        # Given
+        user = UserView(id=1, first_name="John", last_name="Doe", is_blocked=True)
+        user.is_banned = True
+        # When
+        copy = UserView(**user.as_dict())
+        # Then
+        assert set(copy.as_dict()) == set(USER_FIELDS)
+        assert copy.as_dict() == user.as_dict()
+        assert copy.changed_fields == frozenset()
+
+    def test_mention_html(self) -> None:
+        """The mention uses the username or falls back to the full name."""
+        # Given
+        with_username = UserView(id=42, first_name="John", username="johndoe")
+        without_username = UserView(id=42, first_name="John", last_name="Doe")
+        # Then
+        assert with_username.mention_html() == (
+            '<a href="tg://user?id=42">@johndoe</a>'
+        )
+        assert without_username.mention_html() == (
+            '<a href="tg://user?id=42">John Doe</a>'
+        )
+        assert without_username.url == "tg://user?id=42"
+
+    def test_has_no_instance_dict(self) -> None:
+        """Views are slotted, unknown attributes cannot be set."""
+        # Given
+        user = UserView(id=1)
+        # Then
+        assert not hasattr(user, "__dict__")
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains write-behind user writer tests."""
+
+import asyncio
+
+import pytest
+from pytest_mock import MockFixture
+
+from src.db.models.user_model import UserModel
+from src.db.routing import ReplicaRouter
+from src.services.user_service import UserService
+from src.services.user_writer import UserWriteBehind
+
+
+@pytest.mark.usefixtures("sqlite_database")
+class TestUserWriteBehind:
+    """User write-behind tests."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_changes_are_merged(self) -> None:
+        """Changes to the same user are merged into one pending entry."""
+        # Given
+        writer = UserWriteBehind(interval=60, max_rows=100)
+        # When
+        writer.add(1, {"is_blocked": True})
+        writer.add(1, {"is_blocked": False, "is_banned": True})
+        # Then
+        assert len(writer) == 1
+        assert writer.pending(1) == {"is_blocked": False, "is_banned": True}
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_pending_changes(self) -> None:
+        """Flush writes every pending user and empties the buffer."""
+        # Given
+        await UserModel.create(id=1, first_name="A")
+        await UserModel.create(id=2, first_name="B")
+        writer = UserWriteBehind(interval=60, max_rows=100)
+        writer.add(1, {"is_blocked": True})
+        writer.add(2, {"is_banned": True, "username": "b"})
+        # When
+        written = await writer.flush()
+        # Then
+        assert written == 2
+        assert len(writer) == 0
+        assert (await UserModel.get(id=1)).is_blocked is True
+        user = await UserModel.get(id=2)
+        assert (user.is_banned, user.username, user.first_name) == (True, "b", "B")
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_changes(self, mocker: MockFixture) -> None:
+        """Changes that failed to be written stay in the buffer."""
+        # Given
+        writer = UserWriteBehind(interval=60, max_rows=100)
+        writer.add(1, {"is_blocked": True})
+        mocker.patch.object(
+            UserModel,
+            "bulk_update",
+            side_effect=ConnectionError("database"),
+        )
+        # When
+        written = await writer.flush()
+        # Then
+        assert written == 0
+        assert writer.pending(1) == {"is_blocked": True}
+
+    @pytest.mark.asyncio
+    async def test_changes_stay_visible_during_flush(
+        self,
+        mocker: MockFixture,
+    ) -> None:
+        """Changes being written are still pending until the write completes."""
+        # Given
+        writer = UserWriteBehind(interval=60, max_rows=100)
+        writer.add(1, {"is_blocked": True})
+        release = asyncio.Event()
+
+        async def slow_bulk_update(*_: object, **__: object) -> None:
+            await release.wait()
+
+        mocker.patch.object(UserModel, "bulk_update", slow_bulk_update)
+        flush = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0)
+        # When
+        writer.add(1, {"is_banned": True})
+        during = writer.pending(1)
+        release.set()
+        await flush
+        # Then
+        assert during == {"is_blocked": True, "is_banned": True}
+        assert writer.pending(1) == {"is_banned": True}
+
+    @pytest.mark.asyncio
+    async def test_written_users_are_reported(self) -> None:
+        """Users are reported once their changes are written, not buffered."""
+        # Given
+        await UserModel.create(id=1)
+        router = ReplicaRouter(replica="replica", window=5.0)
+        writer = UserWriteBehind(
+            interval=60,
+            max_rows=100,
+            on_written=router.mark_written,
+        )
+        writer.add(1, {"is_blocked": True})
+        buffered = len(router)
+        # When
+        await writer.flush()
+        # Then
+        assert buffered == 0
+        assert len(router) == 1
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_triggers_flush(self) -> None:
+        """Reaching max rows wakes the background task up."""
+        # Given
+        await UserModel.create(id=1)
+        writer = UserWriteBehind(interval=60, max_rows=1)
+        writer.start()
+        # When
+        writer.add(1, {"is_blocked": True})
+        await asyncio.sleep(0.1)
+        # Then
+        assert len(writer) == 0
+        assert (await UserModel.get(id=1)).is_blocked is True
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_writes_remaining_changes(self) -> None:
+        """Stopping the writer performs a final flush."""
+        # Given
+        await UserModel.create(id=1)
+        writer = UserWriteBehind(interval=60, max_rows=100)
+        writer.start()
+        writer.add(1, {"is_banned": True})
+        # When
+        await writer.stop()
+        # Then
+        assert (await UserModel.get(id=1)).is_banned is True
+
+    @pytest.mark.asyncio
+    async def test_user_service_buffers_update(self, mocker: MockFixture) -> None:
+        """In write-behind mode updates are buffered and visible on reads."""
+        # Given
+        writer = UserWriteBehind(interval=60, max_rows=100)
+        mocker.patch.object(UserService, "writer", writer)
+        UserService.cache.clear()
+        user, _ = await UserService.get_or_create(id=7, is_bot=False, first_name="X")
+        user.is_blocked = True
+        # When
+        await UserService.update(user=user)
+        reloaded, _ = await UserService.get_or_create(
+            id=7,
+            is_bot=False,
+            first_name="X",
+        )
+        # Then
+        assert (await UserModel.get(id=7)).is_blocked is False
+        assert writer.pending(7) == {"is_blocked": True}
+        assert reloaded.is_blocked is True
+        assert reloaded.changed_fields == frozenset()
+        UserService.cache.clear()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains webhook runner tests."""
+
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from pytest_mock import MockFixture
+
+from src.runners.scheduler import UpdateScheduler
+from src.runners.webhook import QueuedRequestHandler
+
+SECRET = "secret"
+UPDATE = {"update_id": 1}
+
+
+@pytest.fixture(name="bot")
+def bot_fixture() -> Bot:
+    """Bot instance with a fake token."""
+    return Bot(token="42:TEST")
+
+
+@pytest_asyncio.fixture(name="queue")
+async def queue_fixture(
+    bot: Bot,
+    mocker: MockFixture,
+) -> AsyncIterator[UpdateScheduler]:
+    """Started update scheduler with a mocked dispatcher."""
+    dispatcher = mocker.AsyncMock(spec=Dispatcher)
+    dispatcher.workflow_data = {}
+    dispatcher.feed_update.return_value = None
+    scheduler = UpdateScheduler(
+        dispatcher=dispatcher,
+        bot=bot,
+        max_in_flight=2,
+        high_water=1,
+    )
+    await scheduler.start()
+    yield scheduler
+    await scheduler.stop(timeout=1)
+
+
+@pytest_asyncio.fixture(name="client")
+async def client_fixture(bot: Bot, queue: UpdateScheduler) -> AsyncIterator[TestClient]:
+    """Test client of an application serving the webhook route."""
+    app = web.Application()
+    QueuedRequestHandler(
+        dispatcher=queue.dispatcher,
+        bot=bot,
+        queue=queue,
+        secret_token=SECRET,
+    ).register(app, path="/webhook")
+    async with TestClient(TestServer(app)) as test_client:
+        yield test_client
+
+
+class TestWebhook:
+    """Webhook tests."""
+
+    @pytest.mark.asyncio
+    async def test_update_is_acknowledged_and_processed(
+        self,
+        client: TestClient,
+        queue: UpdateScheduler,
+        bot: Bot,
+    ) -> None:
+        """A verified update is acknowledged and fed to the dispatcher."""
+        # When
+        response = await client.post(
+            "/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        )
+        await asyncio.sleep(0.05)
+        # Then
+        assert response.status == 200
+        queue.dispatcher.feed_update.assert_awaited_once()  # type: ignore[attr-defined]
+        fed_bot, update = queue.dispatcher.feed_update.await_args.args  # type: ignore[attr-defined]
+        assert fed_bot is bot
+        assert update.update_id == UPDATE["update_id"]
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_is_rejected(
+        self,
+        client: TestClient,
+        queue: UpdateScheduler,
+    ) -> None:
+        """A request without the secret token is rejected."""
+        # When
+        response = await client.post("/webhook", json=UPDATE)
+        # Then
+        assert response.status == 401
+        queue.dispatcher.feed_update.assert_not_called()  # type: ignore[attr-defined]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_refuses_update(
+        self,
+        client: TestClient,
+        mocker: MockFixture,
+    ) -> None:
+        """An update is refused with 503 when the queue is full."""
+        # Given
+        mocker.patch.object(UpdateScheduler, "submit", return_value=False)
+        # When
+        response = await client.post(
+            "/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+        )
+        # Then
+        assert response.status == 503
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains worker process runner tests."""
+
+import json
+
+import pytest
+from aiogram.types import Update
+from pytest_mock import MockFixture
+
+from src.runners.workers import ShardRouter, resolve_chat_id, run_worker, shard_for
+
+INLINE_QUERY_UPDATE = {
+    "update_id": 3,
+    "inline_query": {
+        "id": "1",
+        "from": {"id": 777, "is_bot": False, "first_name": "A"},
+        "query": "",
+        "offset": "",
+    },
+}
+
+
+def message_update(chat_id: int, user_id: int = 1) -> dict[str, object]:
+    """Raw message update."""
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "group"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "A"},
+            "text": "hi",
+        },
+    }
+
+
+class TestSharding:
+    """Chat sharding tests."""
+
+    def test_message_is_resolved_by_chat(self) -> None:
+        """A message is attributed to its chat, not its sender."""
+        # When, Then
+        assert resolve_chat_id(message_update(chat_id=-100, user_id=7)) == -100
+
+    def test_callback_query_is_resolved_by_message_chat(self) -> None:
+        """A callback query is attributed to the chat of its message."""
+        # Given
+        update = {
+            "update_id": 2,
+            "callback_query": {
+                "id": "1",
+                "from": {"id": 7, "is_bot": False, "first_name": "A"},
+                "chat_instance": "1",
+                "message": message_update(chat_id=55)["message"],
+            },
+        }
+        # When, Then
+        assert resolve_chat_id(update) == 55
+
+    def test_inline_query_is_resolved_by_user(self) -> None:
+        """An update without chat is attributed to its user."""
+        # When, Then
+        assert resolve_chat_id(INLINE_QUERY_UPDATE) == 777
+
+    def test_chat_is_always_routed_to_same_shard(self) -> None:
+        """All updates of a chat go to the same worker."""
+        # When
+        shards = {
+            shard_for(message_update(chat_id=-100, user_id=user_id), 4)
+            for user_id in range(20)
+        }
+        # Then
+        assert len(shards) == 1
+        assert 0 <= shards.pop() < 4
+
+
+class TestShardRouter:
+    """Shard router tests."""
+
+    @pytest.mark.asyncio
+    async def test_submit_routes_to_shard_queue(self, mocker: MockFixture) -> None:
+        """A submitted update is queued for its worker only."""
+        # Given
+        mocker.patch("multiprocessing.context.SpawnContext.Process")
+        router = ShardRouter(workers=2, max_pending=1)
+        await router.start()
+        update = message_update(chat_id=3)
+        # When
+        accepted = [router.submit(update), router.submit(update)]
+        # Then
+        assert accepted == [True, False]
+        queues = router._queues  # pylint: disable=protected-access
+        payload = queues[1].get(timeout=1)
+        assert payload is not None
+        assert json.loads(payload) == update
+        assert queues[0].empty()
+
+    @pytest.mark.asyncio
+    async def test_parsed_update_keeps_its_shard(self, mocker: MockFixture) -> None:
+        """A parsed inline query is routed and serialized like the raw one."""
+        # Given
+        mocker.patch("multiprocessing.context.SpawnContext.Process")
+        router = ShardRouter(workers=4, max_pending=1)
+        await router.start()
+        shard = shard_for(INLINE_QUERY_UPDATE, 4)
+        # When
+        await router.put(Update.model_validate(INLINE_QUERY_UPDATE))
+        # Then
+        queues = router._queues  # pylint: disable=protected-access
+        payload = queues[shard].get(timeout=1)
+        assert payload is not None
+        assert resolve_chat_id(json.loads(payload)) == 777
+
+    @pytest.mark.asyncio
+    async def test_router_serves_supervisor_metrics(self, mocker: MockFixture) -> None:
+        """The receiving process serves its metrics while the workers run."""
+        # Given
+        mocker.patch("multiprocessing.context.SpawnContext.Process")
+        start = mocker.patch("src.runners.workers.start_metrics_server")
+        stop = mocker.patch("src.runners.workers.stop_metrics_server")
+        router = ShardRouter(workers=2, max_pending=1)
+        # When
+        await router.start()
+        await router.stop(timeout=0)
+        # Then
+        start.assert_awaited_once()
+        stop.assert_awaited_once()
+
+    def test_workers_listen_after_supervisor_port(self, mocker: MockFixture) -> None:
+        """Every worker serves its metrics on a port after the supervisor."""
+        # Given
+        mocker.patch("signal.signal")
+        mocker.patch("src.logs.setup_logging")
+        mocker.patch(
+            "src.runners.workers.asyncio.run",
+            side_effect=lambda coro: coro.close(),
+        )
+        settings = mocker.patch("src.runners.workers.settings")
+        settings.metrics_port = 9000
+        settings.worker_processes = 2
+        # When
+        run_worker(1, mocker.MagicMock())
+        # Then
+        assert settings.metrics_port == 9002